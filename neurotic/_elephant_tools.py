@@ -15,6 +15,8 @@ eliminate dependency on that package. Original code that builds on this work
 .. _elephant: https://elephant.readthedocs.io/en/latest
 
 .. autoclass:: CausalAlphaKernel
+
+.. autoclass:: CausalExponentialKernel
 """
 
 # elephant is licensed under BSD-3-Clause:
@@ -608,11 +610,88 @@ class CausalAlphaKernel(AlphaKernel):
         return np.nonzero(t >= 0)[0].min()
     median_index.__doc__ += AlphaKernel.median_index.__doc__
 
+    def iir_coefficients(self, sampling_period, offset=0):
+        """
+        Return the numerator and denominator coefficients ``(b, a)`` of a
+        recursive (infinite impulse response) filter whose impulse response is
+        the kernel, in hertz, sampled at times ``(n + offset) *
+        sampling_period`` for integers ``n >= 0``. Filtering spike counts in
+        bins of width ``sampling_period`` with :func:`scipy.signal.lfilter`
+        then computes the firing rate in a single causal pass, one sample at a
+        time, without truncating the kernel.
+
+        The alpha function is the impulse response of two cascaded exponential
+        decays, so the filter is second order.
+        """
+        tau = (self.sigma / np.sqrt(2)).rescale('s').magnitude
+        dt = sampling_period.rescale('s').magnitude
+        decay = np.exp(-dt / tau)
+        gain = dt / tau**2 * decay**offset
+        b = gain * np.array([offset, (1 - offset) * decay])
+        a = np.array([1, -2 * decay, decay**2])
+        return b, a
+
+class CausalExponentialKernel(ExponentialKernel):
+    """
+    This modified version of :class:`elephant.kernels.ExponentialKernel` shifts
+    time such that convolution of the kernel with spike trains (as in
+    :func:`elephant.statistics.instantaneous_rate`) results in exponential
+    decays that begin at the spike time, in the same way that
+    :class:`CausalAlphaKernel <neurotic._elephant_tools.CausalAlphaKernel>`
+    modifies :class:`elephant.kernels.AlphaKernel`. Consequently,
+    CausalExponentialKernel can be used in causal filters.
+
+    The equation used for CausalExponentialKernel is
+
+    .. math::
+        K(t) = \\left\\{\\begin{array}{ll} (1 / \\tau) \\exp{(-t / \\tau)},
+        & t > 0 \\\\
+        0, & t \\leq 0 \\end{array} \\right.
+
+    with :math:`\\tau = \\sigma`, where :math:`\\sigma` is the parameter
+    passed to the class initializer.
+
+    sigma : Quantity scalar
+        Standard deviation of the kernel.
+    invert: bool, optional
+        If true, asymmetric kernels (e.g., exponential
+        or alpha kernels) are inverted along the time axis.
+        Default: False
+    """
+
+    def median_index(self, t):
+        """
+        As in :class:`CausalAlphaKernel
+        <neurotic._elephant_tools.CausalAlphaKernel>`, returns the index for
+        the first non-negative time, so that, when the kernel is convolved with
+        a spike train, the entire exponential decay is located to the right of
+        each spike time.
+        """
+        return np.nonzero(t >= 0)[0].min()
+
+    def iir_coefficients(self, sampling_period, offset=0):
+        """
+        Return the numerator and denominator coefficients ``(b, a)`` of a
+        recursive (infinite impulse response) filter whose impulse response is
+        the kernel, in hertz, sampled at times ``(n + offset) *
+        sampling_period`` for integers ``n >= 0``, like
+        :meth:`CausalAlphaKernel.iir_coefficients
+        <neurotic._elephant_tools.CausalAlphaKernel.iir_coefficients>`. The
+        filter is first order.
+        """
+        tau = self.sigma.rescale('s').magnitude
+        dt = sampling_period.rescale('s').magnitude
+        decay = np.exp(-dt / tau)
+        b = np.array([decay**offset / tau])
+        a = np.array([1, -decay])
+        return b, a
+
 ###############################################################################
 # elephant.signal_processing
 
 def butter(signal, highpass_freq=None, lowpass_freq=None, order=4,
-           filter_function='filtfilt', fs=1.0, axis=-1):
+           filter_function='filtfilt', fs=1.0, axis=-1, chunk_size=None,
+           out=None):
     """
     Butterworth filtering function for neo.AnalogSignal. Filter type is
     determined according to how values of `highpass_freq` and `lowpass_freq`
@@ -652,6 +731,16 @@ def butter(signal, highpass_freq=None, lowpass_freq=None, order=4,
         frequency and this parameter is ignored. Default is 1.0.
     axis : int
         Axis along which filter is applied. Default is -1.
+    chunk_size : int or None
+        If given, the signal is filtered in overlapping chunks of this many
+        samples using :func:`sosfiltfilt_chunked`, so that memory used while
+        filtering is proportional to the chunk size rather than to the length
+        of the signal. Requires `filter_function='sosfiltfilt'`. Default is
+        None.
+    out : NumPy ndarray or None
+        Preallocated (possibly memory-mapped) array with the same shape as the
+        input that receives the filtered data. Only used when `chunk_size` is
+        given. Default is None.
 
     Returns
     -------
@@ -665,6 +754,8 @@ def butter(signal, highpass_freq=None, lowpass_freq=None, order=4,
         If `filter_function` is not one of 'lfilter', 'filtfilt',
         or 'sosfiltfilt'.
         When both `highpass_freq` and `lowpass_freq` are None.
+        When `chunk_size` is given and `filter_function` is not
+        'sosfiltfilt'.
 
     """
     available_filters = 'lfilter', 'filtfilt', 'sosfiltfilt'
@@ -673,39 +764,18 @@ def butter(signal, highpass_freq=None, lowpass_freq=None, order=4,
                          "Available filters: {available_filters}".format(
                           filter_function=filter_function,
                           available_filters=available_filters))
+    if chunk_size is not None and filter_function != 'sosfiltfilt':
+        raise ValueError("`chunk_size` requires `filter_function` to be "
+                         "'sosfiltfilt': {}".format(filter_function))
     # design filter
     if hasattr(signal, 'sampling_rate'):
         fs = signal.sampling_rate.rescale(pq.Hz).magnitude
-    if isinstance(highpass_freq, pq.quantity.Quantity):
-        highpass_freq = highpass_freq.rescale(pq.Hz).magnitude
-    if isinstance(lowpass_freq, pq.quantity.Quantity):
-        lowpass_freq = lowpass_freq.rescale(pq.Hz).magnitude
-    Fn = fs / 2.
-    # filter type is determined according to the values of cut-off
-    # frequencies
-    if lowpass_freq and highpass_freq:
-        if highpass_freq < lowpass_freq:
-            Wn = (highpass_freq / Fn, lowpass_freq / Fn)
-            btype = 'bandpass'
-        else:
-            Wn = (lowpass_freq / Fn, highpass_freq / Fn)
-            btype = 'bandstop'
-    elif lowpass_freq:
-        Wn = lowpass_freq / Fn
-        btype = 'lowpass'
-    elif highpass_freq:
-        Wn = highpass_freq / Fn
-        btype = 'highpass'
-    else:
-        raise ValueError(
-            "Either highpass_freq or lowpass_freq must be given"
-        )
     if filter_function == 'sosfiltfilt':
         output = 'sos'
     else:
         output = 'ba'
-    designed_filter = scipy.signal.butter(order, Wn, btype=btype,
-                                          output=output)
+    designed_filter = butter_design(highpass_freq, lowpass_freq, order=order,
+                                    fs=fs, output=output)
 
     # When the input is AnalogSignal, the axis for time index (i.e. the
     # first axis) needs to be rolled to the last
@@ -720,6 +790,12 @@ def butter(signal, highpass_freq=None, lowpass_freq=None, order=4,
     elif filter_function == 'filtfilt':
         b, a = designed_filter
         filtered_data = scipy.signal.filtfilt(b=b, a=a, x=data, axis=axis)
+    elif chunk_size is not None:
+        if out is not None and isinstance(signal, neo.AnalogSignal):
+            out = np.rollaxis(out, 0, len(out.shape))
+        filtered_data = sosfiltfilt_chunked(sos=designed_filter, x=data,
+                                            axis=axis, out=out,
+                                            chunk_size=chunk_size)
     else:
         filtered_data = scipy.signal.sosfiltfilt(sos=designed_filter,
                                                  x=data, axis=axis)
@@ -732,6 +808,9 @@ def butter(signal, highpass_freq=None, lowpass_freq=None, order=4,
     else:
         return filtered_data
 
+# number of samples of each channel that rauc processes at a time (neurotic)
+_rauc_chunk_size = 2**20
+
 def rauc(signal, baseline=None, bin_duration=None, t_start=None, t_stop=None):
     '''
     Calculate the rectified area under the curve (RAUC) for an AnalogSignal.
@@ -793,24 +872,35 @@ def rauc(signal, baseline=None, bin_duration=None, t_start=None, t_stop=None):
     if not isinstance(signal, neo.AnalogSignal):
         raise TypeError('Input signal is not a neo.AnalogSignal!')
 
+    # neurotic: the baseline is subtracted and the signal is rectified and
+    # integrated in chunks, in a single pass over all channels at once, so
+    # that no temporary arrays as large as the signal are needed
+    data = signal.magnitude
     if baseline is None:
-        pass
+        offset = np.zeros(signal.shape[1])
     elif baseline == 'mean':
         # subtract mean from each channel
-        signal = signal - signal.mean(axis=0)
+        offset = np.mean(data, axis=0, dtype='float64')
     elif baseline == 'median':
-        # subtract median from each channel
-        signal = signal - np.median(signal.as_quantity(), axis=0)
+        # subtract median from each channel, found without copying the channel
+        offset = np.array([
+            streaming_median(lambda i_start, i_stop: data[i_start:i_stop, i],
+                             len(data), _rauc_chunk_size)
+            for i in range(data.shape[1])])
     elif isinstance(baseline, pq.Quantity):
         # subtract arbitrary baseline
-        signal = signal - baseline
+        offset = np.broadcast_to(
+            baseline.rescale(signal.units).magnitude, signal.shape[1:])
     else:
         raise TypeError(
             'baseline must be None, \'mean\', \'median\', '
             'or a Quantity: {}'.format(baseline))
 
-    # slice the signal after subtracting baseline
-    signal = signal.time_slice(t_start, t_stop)
+    # slice the signal after subtracting baseline; neurotic: slicing copies
+    # the signal, so it is done only if needed
+    if t_start is not None or t_stop is not None:
+        signal = signal.time_slice(t_start, t_stop)
+    data = signal.magnitude
 
     if bin_duration is not None:
         # from bin duration, determine samples per bin and number of bins
@@ -829,14 +919,16 @@ def rauc(signal, baseline=None, bin_duration=None, t_start=None, t_stop=None):
     # store the actual bin duration
     bin_duration = samples_per_bin * signal.sampling_period
 
-    # reshape into equal size bins, padding the end with zeros if necessary
-    n_channels = signal.shape[1]
-    sig_binned = signal.as_quantity().copy()
-    sig_binned.resize(n_bins * samples_per_bin, n_channels, refcheck=False)
-    sig_binned = sig_binned.reshape(n_bins, samples_per_bin, n_channels)
-
-    # rectify and integrate over each bin
-    rauc = np.trapz(np.abs(sig_binned), dx=signal.sampling_period, axis=1)
+    # rectify and integrate over each bin; as before, the final bin is padded
+    # with zeros if the signal does not fill it
+    n_samples, n_channels = data.shape
+    rauc = np.zeros((n_bins, n_channels))
+    bins_per_chunk = max(1, _rauc_chunk_size // max(samples_per_bin, 1))
+    for first_bin in range(0, n_bins if n_samples else 0, bins_per_chunk):
+        last_bin = min(first_bin + bins_per_chunk, n_bins)
+        chunk = np.abs(data[first_bin * samples_per_bin:last_bin * samples_per_bin] - offset)
+        rauc[first_bin:last_bin] = trapezoid_bins(chunk, samples_per_bin)
+    rauc = rauc * signal.units * signal.sampling_period
 
     if n_bins == 1:
         # return a single value for each channel
@@ -850,6 +942,298 @@ def rauc(signal, baseline=None, bin_duration=None, t_start=None, t_stop=None):
             sampling_period=bin_duration)
         return rauc_sig
 
+###############################################################################
+# signal processing unique to neurotic
+
+def butter_design(highpass_freq=None, lowpass_freq=None, order=4, fs=1.0,
+                  output='sos'):
+    """
+    Design the Butterworth filter applied by :func:`butter`.
+
+    The type of filter is determined from the cutoff frequencies as in
+    :func:`butter`, and the filter is returned in the form given by `output`
+    (see :func:`scipy.signal.butter`).
+    """
+    if isinstance(highpass_freq, pq.quantity.Quantity):
+        highpass_freq = highpass_freq.rescale(pq.Hz).magnitude
+    if isinstance(lowpass_freq, pq.quantity.Quantity):
+        lowpass_freq = lowpass_freq.rescale(pq.Hz).magnitude
+    Fn = fs / 2.
+    # filter type is determined according to the values of cut-off
+    # frequencies
+    if lowpass_freq and highpass_freq:
+        if highpass_freq < lowpass_freq:
+            Wn = (highpass_freq / Fn, lowpass_freq / Fn)
+            btype = 'bandpass'
+        else:
+            Wn = (lowpass_freq / Fn, highpass_freq / Fn)
+            btype = 'bandstop'
+    elif lowpass_freq:
+        Wn = lowpass_freq / Fn
+        btype = 'lowpass'
+    elif highpass_freq:
+        Wn = highpass_freq / Fn
+        btype = 'highpass'
+    else:
+        raise ValueError(
+            "Either highpass_freq or lowpass_freq must be given"
+        )
+    return scipy.signal.butter(order, Wn, btype=btype, output=output)
+
+def sos_decay_length(sos, tolerance=1e-12):
+    """
+    Return the number of samples over which transients of the filter `sos`
+    decay below `tolerance` times their initial amplitude, given by its
+    slowest pole.
+    """
+    radius = max(np.abs(np.roots(section[3:])).max() for section in sos)
+    if radius >= 1:
+        raise ValueError('Filter is unstable')
+    return int(np.ceil(np.log(tolerance) / np.log(radius)))
+
+def sosfiltfilt_chunked(sos, x, axis=-1, out=None, chunk_size=2**20,
+                        overlap=None):
+    """
+    Apply a digital filter forward and backward to a signal in chunks.
+
+    This is a bounded-memory alternative to :func:`scipy.signal.sosfiltfilt`
+    for very long signals, such as memory-mapped recordings lasting hours. The
+    signal is read and written `chunk_size` samples at a time, so only a few
+    chunks are ever held in memory, and the result can be written directly
+    into a preallocated or memory-mapped `out` array.
+
+    The forward pass is computed exactly by carrying the filter state from
+    one chunk to the next. The backward pass for each chunk starts `overlap`
+    samples beyond the end of the chunk from a steady-state initial condition,
+    and the transient caused by that approximation decays to below 1e-12 of
+    its initial amplitude before reaching the chunk (see `overlap`). The edges
+    of the signal are padded with odd extensions exactly as in
+    :func:`scipy.signal.sosfiltfilt`. The result is therefore close to, but
+    not exactly equal to, that of :func:`scipy.signal.sosfiltfilt`: the
+    residual transients are limited by that tolerance rather than by machine
+    precision, and differences of up to about 1e-9 times the peak amplitude
+    of the output are typical, so results should be compared with a
+    tolerance.
+
+    Parameters
+    ----------
+    sos : array_like
+        Array of second-order filter coefficients with shape
+        ``(n_sections, 6)``, e.g., from :func:`scipy.signal.butter` with
+        ``output='sos'``.
+    x : array_like
+        The data to be filtered. May be a memory-mapped array.
+    axis : int
+        Axis along which the filter is applied. Default is -1.
+    out : NumPy ndarray or None
+        Array with the same shape as `x` that receives the filtered data. If
+        None, a new floating point array is allocated. Default is None.
+    chunk_size : int
+        Number of samples filtered at a time. Default is 2**20.
+    overlap : int or None
+        Number of samples beyond the end of each chunk at which the backward
+        pass starts. If None, it is computed from the filter's poles as the
+        number of samples needed for transients to decay below 1e-12 of their
+        initial amplitude. Default is None.
+
+    Returns
+    -------
+    out : NumPy ndarray
+        The filtered data.
+
+    Raises
+    ------
+    ValueError
+        If `out` does not have the same shape as `x`.
+    """
+    sos = np.asarray(sos, dtype=float)
+    n_sections = sos.shape[0]
+    x = np.moveaxis(np.asanyarray(x), axis, 0)
+    n_samples = x.shape[0]
+    n_channels = int(np.prod(x.shape[1:], dtype=int))
+
+    if out is None:
+        out = np.empty(np.moveaxis(x, 0, axis).shape, dtype=float)
+    elif out.shape != np.moveaxis(x, 0, axis).shape:
+        raise ValueError('out must have the same shape as x: {} != {}'.format(
+            out.shape, np.moveaxis(x, 0, axis).shape))
+    out_view = np.moveaxis(out, axis, 0)
+
+    def read(start, stop):
+        # read samples into a 2D array with time along the first axis
+        return np.asarray(x[start:stop], dtype=float).reshape(-1, n_channels)
+
+    def write(start, data):
+        out_view[start:start+len(data)] = data.reshape(
+            (len(data),) + out_view.shape[1:])
+
+    # use the same amount of edge padding as scipy.signal.sosfiltfilt
+    padlen = 3 * (2 * n_sections + 1 - min((sos[:, 2] == 0).sum(),
+                                           (sos[:, 5] == 0).sum()))
+
+    if n_samples <= max(chunk_size, padlen):
+        # filter short signals all at once
+        write(0, scipy.signal.sosfiltfilt(sos, read(0, n_samples), axis=0))
+        return out
+
+    if overlap is None:
+        # find the number of samples over which the slowest pole decays
+        overlap = padlen + sos_decay_length(sos, 1e-12)
+
+    # steady-state filter state for a step of unit amplitude
+    zi_unit = scipy.signal.sosfilt_zi(sos)[:, :, np.newaxis]
+
+    # odd extensions of the signal at both edges
+    first, last = read(0, 1)[0], read(n_samples-1, n_samples)[0]
+    left_ext = 2 * first - read(1, padlen+1)[::-1]
+    right_ext = 2 * last - read(n_samples-padlen-1, n_samples-1)[::-1]
+
+    # prime the forward pass with the left extension
+    _, forward_state = scipy.signal.sosfilt(sos, left_ext, axis=0,
+                                            zi=zi_unit*left_ext[0])
+    forward = np.empty((0, n_channels))  # forward-filtered samples from start
+    forward_stop = 0                     # index after last forward-filtered sample
+    right_ext_forward = None
+
+    for start in range(0, n_samples, chunk_size):
+        stop = min(start + chunk_size, n_samples)
+        lookahead = min(stop + overlap, n_samples)
+
+        # discard forward-filtered samples before the current chunk and
+        # continue the forward pass to the end of the lookahead region
+        forward = forward[start-forward_stop+len(forward):]
+        if lookahead > forward_stop:
+            new_forward, forward_state = scipy.signal.sosfilt(
+                sos, read(forward_stop, lookahead), axis=0, zi=forward_state)
+            forward = np.concatenate([forward, new_forward])
+            forward_stop = lookahead
+
+        if lookahead == n_samples:
+            # the backward pass can start exactly at the end of the padded
+            # signal
+            if right_ext_forward is None:
+                right_ext_forward, _ = scipy.signal.sosfilt(
+                    sos, right_ext, axis=0, zi=forward_state)
+            backward_input = np.concatenate([forward, right_ext_forward])[::-1]
+        else:
+            backward_input = forward[::-1]
+
+        # run the backward pass from the end of the lookahead region
+        backward, _ = scipy.signal.sosfilt(sos, backward_input, axis=0,
+                                           zi=zi_unit*backward_input[0])
+        write(start, backward[::-1][:stop-start])
+
+    return out
+
+def trapezoid_bins(x, samples_per_bin):
+    """
+    Integrate ``x`` along its first axis in consecutive bins of
+    ``samples_per_bin`` samples using the trapezoidal rule with unit spacing.
+    If ``x`` does not fill the final bin, it is padded with zeros.
+
+    For each bin, the trapezoidal rule reduces to the sum of the samples minus
+    half of the first and last samples, so all bins are integrated at once
+    without temporary arrays as large as ``x``.
+    """
+
+    bin_starts = np.arange(0, len(x), samples_per_bin)
+    result = np.add.reduceat(x, bin_starts, axis=0, dtype='float64')
+    result -= x[bin_starts] / 2
+    bin_stops = bin_starts + samples_per_bin
+    full = bin_stops <= len(x)
+    result[full] -= x[bin_stops[full] - 1] / 2
+    return result
+
+def streaming_median(read_chunk, n_samples, chunk_size=2**20):
+    """
+    Return the median of a signal that is read in chunks, without reading the
+    whole signal into memory.
+
+    ``read_chunk(i_start, i_stop)`` should return the values of the signal
+    between samples ``i_start`` and ``i_stop`` as a 1D array. The signal is read
+    repeatedly. Each pass counts the values in a histogram and narrows the
+    range of values known to contain the lower middle value, until few enough
+    values remain in the range to keep them in memory and find it exactly, so
+    memory use depends on ``chunk_size`` rather than on the length of the
+    signal. For signals with an even number of samples, one more pass finds
+    the upper middle value. The median of an empty signal is NaN.
+    """
+
+    if n_samples == 0:
+        return np.nan
+
+    rank = (n_samples - 1) // 2
+    lower = _streaming_rank_value(read_chunk, n_samples, rank, chunk_size)
+    if n_samples % 2:
+        return lower
+
+    # the upper middle value is either equal to the lower one or is the
+    # smallest value above it
+    n_not_above, upper = 0, np.inf
+    for i in range(0, n_samples, chunk_size):
+        x = np.asarray(read_chunk(i, min(i + chunk_size, n_samples)), dtype='float64')
+        n_not_above += np.count_nonzero(x <= lower)
+        above = x[x > lower]
+        if len(above):
+            upper = min(upper, above.min())
+    if n_not_above > rank + 1:
+        upper = lower
+    return (lower + upper) / 2
+
+def _streaming_rank_value(read_chunk, n_samples, rank, chunk_size):
+    """
+    Return the value with the given rank in a signal that is read in chunks
+    (see :func:`streaming_median`).
+    """
+
+    n_hist_bins = 2**16
+
+    # each level narrows the range of values to the histogram bin b between
+    # lo and hi, and n_below values fall below the range
+    levels = []
+    n_below = 0
+
+    def selected_chunks():
+        for i in range(0, n_samples, chunk_size):
+            x = np.asarray(read_chunk(i, min(i + chunk_size, n_samples)), dtype='float64')
+            for lo, hi, b in levels:
+                x = x[_histogram_bin_index(x, lo, hi, n_hist_bins) == b]
+            yield x
+
+    while True:
+
+        # find the range and number of the remaining values
+        lo, hi, n_selected = np.inf, -np.inf, 0
+        for x in selected_chunks():
+            if len(x):
+                lo, hi, n_selected = min(lo, x.min()), max(hi, x.max()), n_selected + len(x)
+
+        if lo == hi:
+            # all remaining values are equal
+            return lo
+
+        if n_selected <= chunk_size:
+            # few enough values remain to find the value among them
+            values = np.sort(np.concatenate(list(selected_chunks())))
+            return values[rank - n_below]
+
+        # the minimum falls in the first bin and the maximum in the last, so
+        # selecting a single bin always removes some values
+        counts = np.zeros(n_hist_bins, dtype='int64')
+        for x in selected_chunks():
+            counts += np.bincount(_histogram_bin_index(x, lo, hi, n_hist_bins), minlength=n_hist_bins)
+        b = np.searchsorted(n_below + np.cumsum(counts), rank, side='right')
+        n_below += counts[:b].sum()
+        levels.append((lo, hi, b))
+
+def _histogram_bin_index(x, lo, hi, n_bins):
+    """
+    Return the indexes of the histogram bins of equal width between ``lo`` and
+    ``hi`` that contain the values ``x``.
+    """
+
+    return np.clip(((x - lo) * (n_bins / (hi - lo))).astype('int64'), 0, n_bins - 1)
+
 ###############################################################################
 # elephant.spike_train_generation
 
@@ -971,7 +1355,8 @@ def isi(spiketrain, axis=-1):
     return intervals
 
 def instantaneous_rate(spiketrain, sampling_period, kernel='auto',
-                       cutoff=5.0, t_start=None, t_stop=None, trim=False):
+                       cutoff=5.0, t_start=None, t_stop=None, trim=False,
+                       pool_spike_trains=True):
     """
     Estimates instantaneous firing rate by kernel convolution.
 
@@ -1019,6 +1404,14 @@ def instantaneous_rate(spiketrain, sampling_period, kernel='auto',
         Transformation by a total of two times the size of the kernel, and
         t_start and t_stop are adjusted.
         Default: False
+    pool_spike_trains : bool
+        If True and a list of spike trains is given, the spike trains are
+        merged and a single rate is estimated. If False, the rate of each
+        spike train is estimated separately, sharing one kernel evaluation and
+        one Fast Fourier Transformation, and returned as a separate channel.
+        The 'auto' kernel is not available when the spike trains are not
+        pooled (neurotic).
+        Default: True
 
     Returns
     -------
@@ -1059,12 +1452,21 @@ def instantaneous_rate(spiketrain, sampling_period, kernel='auto',
             t_start = spiketrain[0].t_start
         if t_stop is None:
             t_stop = spiketrain[0].t_stop
-        spikes = np.concatenate([st.magnitude for st in spiketrain])
-        merged_spiketrain = SpikeTrain(np.sort(spikes), units=spiketrain[0].units,
-                                       t_start=t_start, t_stop=t_stop)
-        return instantaneous_rate(merged_spiketrain, sampling_period=sampling_period,
-                                  kernel=kernel, cutoff=cutoff, t_start=t_start,
-                                  t_stop=t_stop, trim=trim)
+        if pool_spike_trains:
+            spikes = np.concatenate([st.magnitude for st in spiketrain])
+            merged_spiketrain = SpikeTrain(np.sort(spikes), units=spiketrain[0].units,
+                                           t_start=t_start, t_stop=t_stop)
+            return instantaneous_rate(merged_spiketrain, sampling_period=sampling_period,
+                                      kernel=kernel, cutoff=cutoff, t_start=t_start,
+                                      t_stop=t_stop, trim=trim)
+        if kernel == 'auto':
+            raise ValueError(
+                "The kernel width cannot be calculated automatically "
+                "unless spike trains are pooled.")
+        spiketrains = spiketrain
+        spiketrain = spiketrains[0]
+    else:
+        spiketrains = [spiketrain]
 
     # Checks of input variables:
     if not isinstance(spiketrain, SpikeTrain):
@@ -1083,18 +1485,11 @@ def instantaneous_rate(spiketrain, sampling_period, kernel='auto',
         raise ValueError("The sampling period must be larger than zero.")
 
     if kernel == 'auto':
-        kernel_width = sskernel(spiketrain.magnitude, tin=None,
-                                bootstrap=True)['optw']
-        if kernel_width is None:
+        kernel = optimal_kernel(spiketrain)
+        if kernel is None:
             raise ValueError(
                 "Unable to calculate optimal kernel width for "
                 "instantaneous rate from input data.")
-        unit = spiketrain.units
-        sigma = 1 / (2.0 * 2.7) * kernel_width * unit
-        # factor 2.0 connects kernel width with its half width,
-        # factor 2.7 connects half width of Gaussian distribution with
-        #             99% probability mass with its standard deviation.
-        kernel = GaussianKernel(sigma)
     elif not isinstance(kernel, Kernel):
         raise TypeError(
             "kernel must be either instance of :class:`Kernel` "
@@ -1120,7 +1515,8 @@ def instantaneous_rate(spiketrain, sampling_period, kernel='auto',
     # main function:
     units = pq.CompoundUnit(
         "%s*s" % str(sampling_period.rescale('s').magnitude))
-    spiketrain = spiketrain.rescale(units)
+    spiketrains = [st.rescale(units) for st in spiketrains]
+    spiketrain = spiketrains[0]
     if t_start is None:
         t_start = spiketrain.t_start
     else:
@@ -1131,14 +1527,14 @@ def instantaneous_rate(spiketrain, sampling_period, kernel='auto',
     else:
         t_stop = t_stop.rescale(spiketrain.units)
 
-    time_vector = np.zeros(int((t_stop - t_start)) + 1)
-
-    spikes_slice = spiketrain.time_slice(t_start, t_stop) \
-        if len(spiketrain) else np.array([])
-
-    for spike in spikes_slice:
-        index = int((spike - t_start))
-        time_vector[index] += 1
+    # count spikes in each sampling period, with one column per spike train
+    # (neurotic: vectorized binning replaces a loop over spikes)
+    time_vector = np.empty((int((t_stop - t_start)) + 1, len(spiketrains)))
+    for i, st in enumerate(spiketrains):
+        spikes_slice = st.time_slice(t_start, t_stop) \
+            if len(st) else np.array([])
+        indexes = (np.asarray(spikes_slice) - t_start.magnitude).astype(int)
+        time_vector[:, i] = np.bincount(indexes, minlength=len(time_vector))
 
     if cutoff < kernel.min_cutoff:
         cutoff = kernel.min_cutoff
@@ -1150,30 +1546,48 @@ def instantaneous_rate(spiketrain, sampling_period, kernel='auto',
                       sampling_period.rescale(units).magnitude,
                       sampling_period.rescale(units).magnitude) * units
 
-    r = scipy.signal.fftconvolve(time_vector,
-                                 kernel(t_arr).rescale(pq.Hz).magnitude, 'full')
+    # evaluate the kernel only once (neurotic)
+    kernel_arr = kernel(t_arr)
+    median_index = kernel.median_index(t_arr)
+
+    recursive = hasattr(kernel, 'iir_coefficients') and not kernel.invert and not trim
+    if recursive:
+        # neurotic: causal kernels are applied recursively in a single pass
+        # over the spike counts, which avoids the large buffers of the Fast
+        # Fourier Transformation and does not truncate the kernel. Like the
+        # convolution, the kernel is sampled at the times in t_arr, and the
+        # output has one sample fewer than time_vector.
+        b, a = kernel.iir_coefficients(
+            sampling_period, offset=t_arr[median_index].magnitude.item())
+        r = scipy.signal.lfilter(b, a, time_vector[:-1], axis=0)
+    else:
+        r = scipy.signal.fftconvolve(time_vector,
+                                     kernel_arr.rescale(pq.Hz).magnitude[:, np.newaxis],
+                                     'full', axes=0)
     if np.any(r < 0):
         # warnings.warn("Instantaneous firing rate approximation contains "
         #               "negative values, possibly caused due to machine "
         #               "precision errors.")
         r = r.clip(0, None)  # replace negative values with 0
 
-    if not trim:
-        r = r[kernel.median_index(t_arr):-(kernel(t_arr).size -
-                                           kernel.median_index(t_arr))]
+    if recursive:
+        pass  # already aligned with the spike counts (neurotic)
+    elif not trim:
+        r = r[median_index:-(kernel_arr.size - median_index)]
     elif trim:
-        r = r[2 * kernel.median_index(t_arr):-2 * (kernel(t_arr).size -
-                                                   kernel.median_index(t_arr))]
-        t_start += kernel.median_index(t_arr) * spiketrain.units
-        t_stop -= (kernel(t_arr).size -
-                   kernel.median_index(t_arr)) * spiketrain.units
+        r = r[2 * median_index:-2 * (kernel_arr.size - median_index)]
+        t_start += median_index * spiketrain.units
+        t_stop -= (kernel_arr.size - median_index) * spiketrain.units
 
-    rate = neo.AnalogSignal(signal=r.reshape(r.size, 1),
+    rate = neo.AnalogSignal(signal=r,
                             sampling_period=sampling_period,
                             units=pq.Hz, t_start=t_start, t_stop=t_stop)
 
     return rate
 
+# number of bootstrap samples that sskernel smooths at a time (neurotic)
+_bootstrap_batch_size = 100
+
 def nextpow2(x):
     """ Return the smallest integral power of 2 that >= x """
     n = 2
@@ -1197,6 +1611,10 @@ def fftkernel(x, w):
     Output argument
     y: 	Smoothed signal.
 
+    neurotic: x may contain multiple signals along its last axis and w may be
+    an array of bandwidths broadcastable to the other axes of x, in which case
+    all signals are smoothed together in one batch of FFTs.
+
     MAY 5/23, 2012 Author Hideaki Shimazaki
     RIKEN Brain Science Insitute
     http://2000.jukuin.keio.ac.jp/shimazaki
@@ -1204,15 +1622,16 @@ def fftkernel(x, w):
     Ported to Python: Subhasis Ray, NCBS. Tue Jun 10 10:42:38 IST 2014
 
     """
-    L = len(x)
-    Lmax = L + 3 * w
+    w = np.asarray(w)
+    L = np.shape(x)[-1]
+    Lmax = L + 3 * np.max(w)
     n = nextpow2(Lmax)
-    X = np.fft.fft(x, n)
+    X = np.fft.fft(x, n, axis=-1)
     f = np.arange(0, n, 1.0) / n
     f = np.concatenate((-f[:int(n / 2)], f[int(n / 2):0:-1]))
-    K = np.exp(-0.5 * (w * 2 * np.pi * f)**2)
-    y = np.fft.ifft(X * K, n)
-    y = y[:L].copy()
+    K = np.exp(-0.5 * (w[..., np.newaxis] * 2 * np.pi * f)**2)
+    y = np.fft.ifft(X * K, n, axis=-1)
+    y = y[..., :L].copy()
     return y
 
 def logexp(x):
@@ -1235,17 +1654,21 @@ def cost_function(x, N, w, dt):
     The cost function
     Cn(w) = sum_{i,j} int k(x - x_i) k(x - x_j) dx - 2 sum_{i~=j} k(x_i - x_j)
 
+    neurotic: w may be an array of bandwidths, which are evaluated together.
+
      """
+    w = np.asarray(w)
     yh = np.abs(fftkernel(x, w / dt))  # density
     # formula for density
-    C = np.sum(yh ** 2) * dt - 2 * np.sum(yh * x) * \
+    C = np.sum(yh ** 2, axis=-1) * dt - 2 * np.sum(yh * x, axis=-1) * \
         dt + 2 / np.sqrt(2 * np.pi) / w / N
     C = C * N * N
     # formula for rate
     # C = dt*sum( yh.^2 - 2*yh.*y_hist + 2/sqrt(2*pi)/w*y_hist )
     return C, yh
 
-def sskernel(spiketimes, tin=None, w=None, bootstrap=False):
+def sskernel(spiketimes, tin=None, w=None, bootstrap=False, n_bootstrap=1000,
+             seed=None):
     """
 
     Calculates optimal fixed kernel bandwidth.
@@ -1260,6 +1683,11 @@ def sskernel(spiketimes, tin=None, w=None, bootstrap=False):
     bootstrap (optional): whether to calculate the 95% confidence
     interval. (default False)
 
+    n_bootstrap (optional): number of bootstrap samples. (default 1000)
+
+    seed (optional): seed for the random number generator used for
+    bootstrapping, for reproducible confidence intervals. (default None)
+
     Returns
 
     A dictionary containing the following key value pairs:
@@ -1305,20 +1733,18 @@ def sskernel(spiketimes, tin=None, w=None, bootstrap=False):
         else:
             t = tin
     dt = np.min(np.diff(tin))
-    yhist, bins = np.histogram(spiketimes, np.r_[t - dt / 2, t[-1] + dt / 2])
-    N = np.sum(yhist)
-    yhist = yhist / (N * dt)  # density
+    counts, bins = np.histogram(spiketimes, np.r_[t - dt / 2, t[-1] + dt / 2])
+    N = np.sum(counts)
+    yhist = counts / (N * dt)  # density
     optw = None
     y = None
     if w is not None:
-        C = np.zeros(len(w))
-        Cmin = np.inf
-        for k, w_ in enumerate(w):
-            C[k], yh = cost_function(yhist, N, w_, dt)
-            if C[k] < Cmin:
-                Cmin = C[k]
-                optw = w_
-                y = yh
+        # neurotic: evaluate all bandwidths in one batch
+        C, yh = cost_function(yhist, N, np.asarray(w, dtype=float), dt)
+        if np.any(C < np.inf):
+            k = np.argmin(np.where(C < np.inf, C, np.inf))
+            optw = w[k]
+            y = yh[k]
     else:
         # Golden section search on a log-exp scale
         wmin = 2 * dt
@@ -1363,16 +1789,20 @@ def sskernel(spiketimes, tin=None, w=None, bootstrap=False):
     yb = None
     # If bootstrap is requested, and an optimal kernel was found
     if bootstrap and optw:
-        nbs = 1000
+        nbs = n_bootstrap
+        rng = np.random.default_rng(seed)
         yb = np.zeros((nbs, len(tin)))
-        for ii in range(nbs):
-            idx = np.floor(np.random.rand(N) * N).astype(int)
-            xb = spiketimes[idx]
-            y_histb, bins = np.histogram(
-                xb, np.r_[t - dt / 2, t[-1] + dt / 2]) / dt / N
+        # neurotic: resampling N spikes with replacement and binning them is
+        # equivalent to drawing the bin counts from a multinomial distribution,
+        # which takes time independent of N, and the resamples are smoothed in
+        # batches of FFTs
+        for start in range(0, nbs, _bootstrap_batch_size):
+            stop = min(start + _bootstrap_batch_size, nbs)
+            y_histb = rng.multinomial(N, counts / N, size=stop - start) / dt / N
             yb_buf = fftkernel(y_histb, optw / dt).real
-            yb_buf = yb_buf / np.sum(yb_buf * dt)
-            yb[ii, :] = np.interp(tin, t, yb_buf)
+            yb_buf = yb_buf / np.sum(yb_buf * dt, axis=-1, keepdims=True)
+            for ii in range(start, stop):
+                yb[ii, :] = np.interp(tin, t, yb_buf[ii - start])
         ybsort = np.sort(yb, axis=0)
         y95b = ybsort[np.floor(0.05 * nbs).astype(int), :]
         y95u = ybsort[np.floor(0.95 * nbs).astype(int), :]
@@ -1404,3 +1834,32 @@ def _check_consistency_of_spiketrainlist(spiketrainlist, t_start=None, t_stop=No
             raise ValueError(
                 "the spike trains must have the same units!")
     return None
+
+###############################################################################
+# statistics unique to neurotic
+
+def optimal_kernel(spiketrain):
+    """
+    Return a :class:`GaussianKernel <elephant.kernels.GaussianKernel>` with the
+    width chosen for ``spiketrain`` by :func:`sskernel`, as used by
+    :func:`instantaneous_rate` when ``kernel='auto'``, or None if no width
+    could be found (e.g., if there are too few spikes).
+
+    Bootstrap confidence intervals are not needed for choosing the width, so
+    they are not computed.
+    """
+
+    try:
+        kernel_width = sskernel(spiketrain.magnitude, tin=None,
+                                bootstrap=False)['optw']
+    except ValueError:
+        # too few distinct spike times
+        return None
+    if kernel_width is None:
+        return None
+    unit = spiketrain.units
+    sigma = 1 / (2.0 * 2.7) * kernel_width * unit
+    # factor 2.0 connects kernel width with its half width,
+    # factor 2.7 connects half width of Gaussian distribution with
+    #             99% probability mass with its standard deviation.
+    return GaussianKernel(sigma)
@@ -4,6 +4,7 @@
 """
 
 from ..datasets.ftpauth import *
+from ..datasets.cache import *
 from ..datasets.download import *
 from ..datasets.metadata import *
 from ..datasets.data import *
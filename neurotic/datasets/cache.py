@@ -0,0 +1,535 @@
+# -*- coding: utf-8 -*-
+"""
+The :mod:`neurotic.datasets.cache` module implements a two-level cache for the
+products of the stages of processing performed by :func:`load_dataset
+<neurotic.datasets.data.load_dataset>`, such as filtered signals, spike trains
+found by amplitude discriminators, firing rates, bursts, and rectified area
+under the curve (RAUC) signals.
+
+Recently used entries are kept in memory for as long as the process runs, and
+all entries are also persisted on disk. Each on-disk entry is stored in its
+own directory as a collection of NumPy ``.npy`` files and a ``manifest.json``
+file describing how to reassemble Neo objects from the arrays. Arrays are
+memory-mapped when an entry is read back, so large signals are paged in from
+disk only as they are needed. The total size of the cache is bounded, and the
+least recently used entries are evicted first when the bound is exceeded.
+
+By default, the cache is located in the ``.neurotic/cache`` directory within
+the user's home directory.
+
+.. autoclass:: DataCache
+   :members:
+
+.. autofunction:: clear_cache
+"""
+
+import os
+import copy
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+import quantities as pq
+import neo
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+_default_cache_dir = os.path.join(os.path.expanduser('~'), '.neurotic', 'cache')
+_default_max_bytes = 10 * 1024**3  # 10 GiB
+_default_max_memory_bytes = 2 * 1024**3  # 2 GiB
+_manifest_file = 'manifest.json'
+_manifest_version = 1
+
+
+class DataCache():
+    """
+    A persistent, size-bounded store of Neo objects produced by processing a
+    dataset.
+
+    Entries are identified by keys produced by :meth:`make_key`, which hashes
+    arbitrary JSON-serializable descriptions of the inputs that determine the
+    contents of the entry. NumPy arrays and Quantities given to
+    :meth:`make_key` are hashed by content. Entries are written with
+    :meth:`put` and read back with :meth:`get`. When the total size of the
+    on-disk entries exceeds ``max_bytes``, or the total size of the arrays held
+    in memory exceeds ``max_memory_bytes``, the least recently used entries
+    are dropped.
+
+    Neo objects read from the cache are new objects that share their data with
+    the stored entry, so they may be annotated freely without altering the
+    entry, but their data should not be modified in place.
+
+    The contents of an entry may be any combination of dictionaries (with
+    string keys), lists, strings, numbers, booleans, ``None``, NumPy arrays,
+    Quantities, and Neo :class:`AnalogSignals <neo.core.AnalogSignal>`,
+    :class:`SpikeTrains <neo.core.SpikeTrain>`, :class:`Epochs
+    <neo.core.Epoch>`, and :class:`Events <neo.core.Event>`, including Neo
+    objects stored in the annotations of other Neo objects.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None, max_memory_bytes=None):
+        """
+        Initialize a new DataCache.
+        """
+
+        if cache_dir is None:
+            cache_dir = _default_cache_dir
+        if max_bytes is None:
+            max_bytes = _default_max_bytes
+        if max_memory_bytes is None:
+            max_memory_bytes = _default_max_memory_bytes
+
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_memory_bytes = max_memory_bytes
+
+        # recently used entries held in memory, ordered from least to most
+        # recently used
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+
+        # allow the cache to be shared by threads
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def make_key(*parts):
+        """
+        Return a hexadecimal hash of the JSON-serializable ``parts``, suitable
+        for identifying a cache entry.
+        """
+
+        text = json.dumps(parts, sort_keys=True, default=_json_default)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """
+        Return the contents of the entry identified by ``key``, or ``None`` if
+        the entry does not exist or cannot be read. Entries that are not held
+        in memory are read from disk, with arrays memory-mapped.
+        """
+
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                logger.debug(f'Read cache entry {key} from memory')
+                return _shallow_copy(self._memory[key][0])
+
+        entry_dir = os.path.join(self.cache_dir, key)
+        manifest_path = os.path.join(entry_dir, _manifest_file)
+        if not os.path.exists(manifest_path):
+            return None
+
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get('version', None) != _manifest_version:
+                return None
+            contents = _decode(manifest['contents'], entry_dir)
+        except Exception as e:
+            logger.warning(f'Ignoring unreadable cache entry {key}: {e}')
+            return None
+
+        # mark the entry as recently used
+        try:
+            os.utime(manifest_path)
+        except OSError:
+            pass
+
+        logger.debug(f'Read cache entry {key} from disk')
+        self._remember(key, contents)
+        return _shallow_copy(contents)
+
+    def put(self, key, contents):
+        """
+        Store ``contents`` in the entry identified by ``key``, replacing any
+        existing entry, and then evict the least recently used entries if the
+        cache has grown too large. Returns ``True`` if the entry was written to
+        disk.
+        """
+
+        self._remember(key, _shallow_copy(contents))
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry_dir = os.path.join(self.cache_dir, key)
+
+        # write the entry to a temporary directory first so that incomplete
+        # entries are never visible to readers
+        temp_dir = tempfile.mkdtemp(prefix=f'.{key}-', dir=self.cache_dir)
+        try:
+            manifest = {
+                'version': _manifest_version,
+                'contents': _encode(contents, temp_dir, [0]),
+            }
+            with open(os.path.join(temp_dir, _manifest_file), 'w') as f:
+                json.dump(manifest, f)
+            if os.path.exists(entry_dir):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(temp_dir, entry_dir)
+        except Exception as e:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            logger.warning(f'Skipping caching of entry {key} because it could not be written: {e}')
+            return False
+
+        logger.debug(f'Wrote cache entry {key}')
+        self.evict(keep=[key])
+        return True
+
+    def evict(self, keep=[]):
+        """
+        Delete the least recently used entries until the total size of the
+        cache does not exceed ``max_bytes``. Entries with keys listed in
+        ``keep`` are never deleted.
+        """
+
+        with self._lock:
+            entries = []
+            total_bytes = 0
+            for key, entry_dir, last_used, n_bytes in self._entries():
+                entries.append((last_used, key, entry_dir, n_bytes))
+                total_bytes += n_bytes
+
+            for last_used, key, entry_dir, n_bytes in sorted(entries):
+                if total_bytes <= self.max_bytes:
+                    break
+                if key in keep:
+                    continue
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                total_bytes -= n_bytes
+                logger.debug(f'Evicted cache entry {key}')
+
+    def clear(self):
+        """
+        Delete every entry in the cache.
+        """
+
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+
+    def size(self):
+        """
+        Return the total size of the on-disk entries in bytes.
+        """
+
+        return sum(n_bytes for _, _, _, n_bytes in self._entries())
+
+    def _remember(self, key, contents):
+        """
+        Hold ``contents`` in memory, forgetting the least recently used entries
+        if too much memory is in use.
+        """
+
+        with self._lock:
+            if key in self._memory:
+                self._memory_bytes -= self._memory.pop(key)[1]
+
+            n_bytes = _nbytes(contents)
+            if n_bytes > self.max_memory_bytes:
+                return
+
+            self._memory[key] = (contents, n_bytes)
+            self._memory_bytes += n_bytes
+            while self._memory_bytes > self.max_memory_bytes:
+                _, (_, n_bytes) = self._memory.popitem(last=False)
+                self._memory_bytes -= n_bytes
+
+    def _entries(self):
+        """
+        Yield the key, directory, last-used time, and size in bytes of every
+        complete entry in the cache.
+        """
+
+        if not os.path.isdir(self.cache_dir):
+            return
+
+        for key in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, key)
+            manifest_path = os.path.join(entry_dir, _manifest_file)
+            if key.startswith('.') or not os.path.exists(manifest_path):
+                continue
+            try:
+                last_used = os.path.getmtime(manifest_path)
+                n_bytes = sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+            except OSError:
+                continue
+            yield key, entry_dir, last_used, n_bytes
+
+def clear_cache(cache_dir=None):
+    """
+    Delete every entry in the cache located at ``cache_dir``, which defaults to
+    ``~/.neurotic/cache``.
+    """
+
+    if cache_dir is None:
+        _get_default_cache().clear()
+    else:
+        DataCache(cache_dir).clear()
+    logger.info('Cleared the cache')
+
+def _get_default_cache():
+    """
+    Return a DataCache located at the default cache directory that persists
+    for the lifetime of the process, so that entries held in memory can be
+    reused by successive calls to :func:`load_dataset
+    <neurotic.datasets.data.load_dataset>`.
+    """
+
+    global _default_cache
+    if _default_cache is None or _default_cache.cache_dir != _default_cache_dir:
+        _default_cache = DataCache()
+    return _default_cache
+
+_default_cache = None
+
+def _file_identity(path):
+    """
+    Return a description of the file at ``path`` that changes whenever the file
+    is modified, or ``None`` if the file does not exist.
+    """
+
+    if path is None or not os.path.exists(path):
+        return None
+
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+def _json_default(obj):
+    """
+    Convert objects that the json module cannot serialize on its own, such as
+    Quantities and NumPy types, when computing cache keys.
+    """
+
+    if isinstance(obj, pq.Quantity):
+        return [_json_default(obj.magnitude), str(obj.dimensionality)]
+    elif isinstance(obj, np.ndarray):
+        # hash array contents rather than listing them, since arrays like
+        # spike times may be long
+        digest = hashlib.sha1(np.ascontiguousarray(obj).tobytes()).hexdigest()
+        return [digest, obj.dtype.str, obj.shape]
+    elif isinstance(obj, np.generic):
+        return obj.item()
+    else:
+        return str(obj)
+
+def _nbytes(obj):
+    """
+    Return the total size of the arrays contained in ``obj``, including those
+    in the annotations of Neo objects.
+    """
+
+    if isinstance(obj, np.ndarray):
+        n_bytes = obj.nbytes
+        if hasattr(obj, 'annotations'):
+            n_bytes += _nbytes(obj.annotations)
+        return n_bytes
+    elif isinstance(obj, dict):
+        return sum(_nbytes(v) for v in obj.values())
+    elif isinstance(obj, (list, tuple)):
+        return sum(_nbytes(v) for v in obj)
+    else:
+        return 0
+
+def _shallow_copy(obj):
+    """
+    Return a copy of ``obj`` in which Neo objects are replaced by new objects
+    that share their data with the originals but have their own annotations.
+    """
+
+    if isinstance(obj, (neo.AnalogSignal, neo.SpikeTrain, neo.Epoch, neo.Event)):
+        new = obj.view(type(obj))
+        new.annotations = _shallow_copy(obj.annotations)
+        new.array_annotations = copy.copy(obj.array_annotations)
+        return new
+    elif isinstance(obj, dict):
+        return {k: _shallow_copy(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [_shallow_copy(v) for v in obj]
+    else:
+        return obj
+
+def _save_array(array, entry_dir, counter):
+    """
+    Save ``array`` as a new ``.npy`` file in ``entry_dir`` and return the file
+    name.
+    """
+
+    array = np.asarray(array)
+    if array.dtype.kind == 'O':
+        # object arrays cannot be memory-mapped, so store strings instead
+        array = array.astype('U')
+    file_name = f'{counter[0]}.npy'
+    counter[0] += 1
+    np.save(os.path.join(entry_dir, file_name), array, allow_pickle=False)
+    return file_name
+
+def _load_array(file_name, entry_dir):
+    """
+    Memory-map the ``.npy`` file named ``file_name`` in ``entry_dir``.
+    """
+
+    return np.load(os.path.join(entry_dir, file_name), mmap_mode='r', allow_pickle=False)
+
+def _encode(obj, entry_dir, counter):
+    """
+    Convert ``obj`` into a JSON-serializable description, saving any arrays it
+    contains into ``entry_dir``.
+    """
+
+    if isinstance(obj, neo.AnalogSignal):
+        return {
+            '__neo__': 'AnalogSignal',
+            'signal': _save_array(obj.magnitude, entry_dir, counter),
+            'units': str(obj.units.dimensionality),
+            'sampling_rate': float(obj.sampling_rate.rescale('Hz').magnitude),
+            't_start': float(obj.t_start.rescale('s').magnitude),
+            'name': obj.name,
+            'file_origin': obj.file_origin,
+            'annotations': _encode(obj.annotations, entry_dir, counter),
+            'array_annotations': _encode(dict(obj.array_annotations), entry_dir, counter),
+        }
+
+    elif isinstance(obj, neo.SpikeTrain):
+        return {
+            '__neo__': 'SpikeTrain',
+            'times': _save_array(obj.magnitude, entry_dir, counter),
+            'units': str(obj.units.dimensionality),
+            't_start': float(obj.t_start.rescale(obj.units).magnitude),
+            't_stop': float(obj.t_stop.rescale(obj.units).magnitude),
+            'name': obj.name,
+            'file_origin': obj.file_origin,
+            'annotations': _encode(obj.annotations, entry_dir, counter),
+            'array_annotations': _encode(dict(obj.array_annotations), entry_dir, counter),
+        }
+
+    elif isinstance(obj, neo.Epoch):
+        return {
+            '__neo__': 'Epoch',
+            'times': _save_array(obj.times.magnitude, entry_dir, counter),
+            'durations': _save_array(obj.durations.rescale(obj.times.units).magnitude, entry_dir, counter),
+            'labels': _save_array(obj.labels, entry_dir, counter),
+            'units': str(obj.times.units.dimensionality),
+            'name': obj.name,
+            'file_origin': obj.file_origin,
+            'annotations': _encode(obj.annotations, entry_dir, counter),
+            'array_annotations': _encode(dict(obj.array_annotations), entry_dir, counter),
+        }
+
+    elif isinstance(obj, neo.Event):
+        return {
+            '__neo__': 'Event',
+            'times': _save_array(obj.times.magnitude, entry_dir, counter),
+            'labels': _save_array(obj.labels, entry_dir, counter),
+            'units': str(obj.times.units.dimensionality),
+            'name': obj.name,
+            'file_origin': obj.file_origin,
+            'annotations': _encode(obj.annotations, entry_dir, counter),
+            'array_annotations': _encode(dict(obj.array_annotations), entry_dir, counter),
+        }
+
+    elif isinstance(obj, pq.Quantity):
+        if obj.ndim == 0:
+            return {'__quantity__': float(obj.magnitude), 'units': str(obj.dimensionality)}
+        else:
+            return {'__quantity__': _save_array(obj.magnitude, entry_dir, counter), 'units': str(obj.dimensionality)}
+
+    elif isinstance(obj, np.ndarray):
+        return {'__array__': _save_array(obj, entry_dir, counter)}
+
+    elif isinstance(obj, np.generic):
+        return obj.item()
+
+    elif isinstance(obj, dict):
+        if not all(isinstance(k, str) for k in obj):
+            raise TypeError(f'dictionary keys must be strings: {list(obj)}')
+        return {'__dict__': {k: _encode(v, entry_dir, counter) for k, v in obj.items()}}
+
+    elif isinstance(obj, (list, tuple)):
+        return [_encode(v, entry_dir, counter) for v in obj]
+
+    elif obj is None or isinstance(obj, (str, bool, int, float)):
+        return obj
+
+    else:
+        raise TypeError(f'objects of type {type(obj).__name__} cannot be cached')
+
+def _decode(desc, entry_dir):
+    """
+    Reconstruct an object from a description produced by :func:`_encode`.
+    """
+
+    if isinstance(desc, list):
+        return [_decode(v, entry_dir) for v in desc]
+
+    elif not isinstance(desc, dict):
+        return desc
+
+    elif '__dict__' in desc:
+        return {k: _decode(v, entry_dir) for k, v in desc['__dict__'].items()}
+
+    elif '__array__' in desc:
+        return _load_array(desc['__array__'], entry_dir)
+
+    elif '__quantity__' in desc:
+        if isinstance(desc['__quantity__'], str):
+            return pq.Quantity(_load_array(desc['__quantity__'], entry_dir), desc['units'])
+        else:
+            return pq.Quantity(desc['__quantity__'], desc['units'])
+
+    elif desc.get('__neo__', None) == 'AnalogSignal':
+        obj = neo.AnalogSignal(
+            _load_array(desc['signal'], entry_dir),
+            units=desc['units'],
+            sampling_rate=desc['sampling_rate']*pq.Hz,
+            t_start=desc['t_start']*pq.s,
+            name=desc['name'],
+            file_origin=desc['file_origin'],
+        )
+
+    elif desc.get('__neo__', None) == 'SpikeTrain':
+        obj = neo.SpikeTrain(
+            _load_array(desc['times'], entry_dir),
+            units=desc['units'],
+            t_start=desc['t_start'],
+            t_stop=desc['t_stop'],
+            name=desc['name'],
+            file_origin=desc['file_origin'],
+        )
+
+    elif desc.get('__neo__', None) == 'Epoch':
+        obj = neo.Epoch(
+            times=_load_array(desc['times'], entry_dir),
+            durations=_load_array(desc['durations'], entry_dir),
+            labels=np.array(_load_array(desc['labels'], entry_dir)),
+            units=desc['units'],
+            name=desc['name'],
+            file_origin=desc['file_origin'],
+        )
+
+    elif desc.get('__neo__', None) == 'Event':
+        obj = neo.Event(
+            times=_load_array(desc['times'], entry_dir),
+            labels=np.array(_load_array(desc['labels'], entry_dir)),
+            units=desc['units'],
+            name=desc['name'],
+            file_origin=desc['file_origin'],
+        )
+
+    else:
+        raise ValueError(f'unrecognized cache entry description: {desc}')
+
+    obj.annotate(**_decode(desc['annotations'], entry_dir))
+    array_annotations = _decode(desc['array_annotations'], entry_dir)
+    if array_annotations:
+        obj.array_annotate(**{k: np.array(v) for k, v in array_annotations.items()})
+    return obj
@@ -8,20 +8,46 @@ dataset from selected metadata.
 
 import datetime
 import inspect
+from concurrent.futures import ThreadPoolExecutor
 from packaging import version
 import numpy as np
 import pandas as pd
 import quantities as pq
 import neo
 
+try:
+    import pyarrow
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
 from ..datasets.metadata import _abs_path
-from .. import _elephant_tools
+from ..datasets.cache import DataCache, _get_default_cache, _file_identity
+from .. import __version__, _elephant_tools
 
 import logging
 logger = logging.getLogger(__name__)
 
+# signals with more samples than this are filtered in chunks of this size to
+# limit memory use
+_filter_chunk_size = 2**22
+
+# number of samples read at a time when detecting spikes or computing RAUC in
+# lazily loaded signals
+_detect_chunk_size = 2**20
+
+# number of samples per sigma of the kernel used for firing rates whose
+# sampling_period is 'auto'
+_rate_samples_per_sigma = 10
+
+# the min/max pyramids used for displaying signals reduce them by factors of
+# _pyramid_base_factor, then _pyramid_base_factor * _pyramid_level_factor, and
+# so on
+_pyramid_base_factor = 16
+_pyramid_level_factor = 4
 
-def load_dataset(metadata, blk=None, lazy=False, signal_group_mode='split-all', filter_events_from_epochs=False):
+
+def load_dataset(metadata, blk=None, lazy=False, signal_group_mode='split-all', filter_events_from_epochs=False, use_cache=False, max_workers=None):
     """
     Load a dataset.
 
@@ -43,13 +69,41 @@ def load_dataset(metadata, blk=None, lazy=False, signal_group_mode='split-all',
     filters to the signals, to detect spikes using amplitude discriminators, to
     calculate smoothed firing rates from spike trains, to detect bursts of
     spikes, and to calculate the rectified area under the curve (RAUC) for each
-    signal.
+    signal. Signals are filtered, firing rates with different kernels are
+    calculated, and RAUCs are computed in parallel using up to ``max_workers``
+    threads (by default, a number based on the number of processors).
+
+    If ``use_cache=True`` and ``lazy=False``, the output of each stage of this
+    processing (reading signals, each filter, each amplitude discriminator,
+    each group of firing rates sharing a kernel, each burst detector, and each
+    RAUC computation) is stored in a :class:`DataCache
+    <neurotic.datasets.cache.DataCache>`, which keeps recently used outputs in
+    memory and persists all of them on disk. Each output is identified by the
+    inputs of its stage, including the outputs of upstream stages, so when the
+    same dataset is loaded again only the stages whose inputs have changed are
+    rerun. If the signals themselves are found in the cache, only the epochs,
+    events, and spike trains of the ``data_file`` are read, and the signals are
+    memory-mapped from the cache. Each signal is given a ``cache_key``
+    annotation identifying it in the cache, so that the min/max pyramids
+    computed for displaying it by :class:`EphyviewerConfigurator
+    <neurotic.gui.config.EphyviewerConfigurator>` are cached as well.
     """
 
+    # stage keys identify the signals and spike trains by how they were
+    # produced, and are used only if caching is enabled
+    cache = None
+    signal_keys = None
+    spiketrain_keys = {}
+    if use_cache and not lazy and blk is None and metadata.get('data_file', None) is not None:
+        cache = _get_default_cache()
+
     if blk is None:
         if metadata.get('data_file', None) is not None:
             # read in the electrophysiology data
-            blk = _read_data_file(metadata, lazy, signal_group_mode)
+            if cache is not None:
+                blk, signal_keys = _read_data_file_cached(metadata, cache, signal_group_mode)
+            else:
+                blk = _read_data_file(metadata, lazy, signal_group_mode)
         else:
             # create an empty Block
             blk = neo.Block()
@@ -69,28 +123,30 @@ def load_dataset(metadata, blk=None, lazy=False, signal_group_mode='split-all',
 
     # apply filters to signals if not using lazy loading of signals
     if not lazy:
-        blk = _apply_filters(metadata, blk)
+        blk = _apply_filters(metadata, blk, cache, signal_keys, max_workers)
 
-    # copy events into epochs and vice versa
-    epochs_from_events = [neo.Epoch(name=ev.name, times=ev.times, labels=ev.labels, durations=np.zeros_like(ev.times)) for ev in blk.segments[0].events]
-    events_from_epochs = [neo.Event(name=ep.name, times=ep.times, labels=ep.labels) for ep in blk.segments[0].epochs]
+    # mirror events as epochs and vice versa, sharing their times and labels
+    epochs_from_events = [_epoch_view_of_event(ev) for ev in blk.segments[0].events]
+    events_from_epochs = [_event_view_of_epoch(ep) for ep in blk.segments[0].epochs]
     if not filter_events_from_epochs:
         blk.segments[0].epochs += epochs_from_events
     blk.segments[0].events += events_from_epochs
 
     # read in annotations
     annotations_dataframe = _read_annotations_file(metadata)
-    blk.segments[0].epochs += _create_neo_epochs_from_dataframe(annotations_dataframe, metadata, _abs_path(metadata, 'annotations_file'), filter_events_from_epochs)
-    blk.segments[0].events += _create_neo_events_from_dataframe(annotations_dataframe, metadata, _abs_path(metadata, 'annotations_file'))
+    epochs, events = _create_neo_epochs_and_events_from_dataframe(annotations_dataframe, metadata, _abs_path(metadata, 'annotations_file'), filter_events_from_epochs)
+    blk.segments[0].epochs += epochs
+    blk.segments[0].events += events
 
     # read in epoch encoder file
     epoch_encoder_dataframe = _read_epoch_encoder_file(metadata)
-    blk.segments[0].epochs += _create_neo_epochs_from_dataframe(epoch_encoder_dataframe, metadata, _abs_path(metadata, 'epoch_encoder_file'), filter_events_from_epochs)
-    blk.segments[0].events += _create_neo_events_from_dataframe(epoch_encoder_dataframe, metadata, _abs_path(metadata, 'epoch_encoder_file'))
+    epochs, events = _create_neo_epochs_and_events_from_dataframe(epoch_encoder_dataframe, metadata, _abs_path(metadata, 'epoch_encoder_file'), filter_events_from_epochs)
+    blk.segments[0].epochs += epochs
+    blk.segments[0].events += events
 
     # classify spikes by amplitude if not using lazy loading of signals
     if not lazy:
-        blk.segments[0].spiketrains += _run_amplitude_discriminators(metadata, blk)
+        blk.segments[0].spiketrains.extend(_run_amplitude_discriminators(metadata, blk, cache, signal_keys, spiketrain_keys))
 
     # read in spikes identified by spike sorting using tridesclous
     spikes_dataframe = _read_spikes_file(metadata, blk)
@@ -106,11 +162,11 @@ def load_dataset(metadata, blk=None, lazy=False, signal_group_mode='split-all',
     # calculate smoothed firing rates from spike trains if not using lazy
     # loading of signals
     if not lazy:
-        blk = _compute_firing_rates(metadata, blk)
+        blk = _compute_firing_rates(metadata, blk, cache, spiketrain_keys, max_workers)
 
     # identify bursts from spike trains if not using lazy loading of signals
     if not lazy:
-        blk.segments[0].epochs += _run_burst_detectors(metadata, blk)
+        blk.segments[0].epochs += _run_burst_detectors(metadata, blk, cache, spiketrain_keys)
 
     # alphabetize epoch and event channels by name
     blk.segments[0].epochs.sort(key=lambda ep: ep.name or '')
@@ -118,22 +174,49 @@ def load_dataset(metadata, blk=None, lazy=False, signal_group_mode='split-all',
 
     # compute rectified area under the curve (RAUC) for each signal if not
     # using lazy loading of signals
-    if not lazy and metadata.get('rauc_bin_duration', None) is not None:
-        for sig in blk.segments[0].analogsignals:
-            rauc_sig = _elephant_tools.rauc(
-                signal=sig,
-                baseline=metadata.get('rauc_baseline', None),
-                bin_duration=metadata['rauc_bin_duration']*pq.s,
-            )
-            rauc_sig.name = sig.name + ' RAUC'
-            sig.annotate(
-                rauc_sig=rauc_sig,
-                rauc_baseline=metadata.get('rauc_baseline', None),
-                rauc_bin_duration=metadata['rauc_bin_duration']*pq.s,
-            )
+    if not lazy:
+        blk = _compute_rauc(metadata, blk, cache, signal_keys, max_workers)
+
+    # identify signals in the cache so that data derived from them later, such
+    # as min/max pyramids for display, can be cached too
+    if cache is not None:
+        for sig, key in zip(blk.segments[0].analogsignals, signal_keys):
+            sig.annotate(cache_key=key)
 
     return blk
 
+def _run_stage(cache, compute, *inputs):
+    """
+    Run one stage of processing and return its output and a key identifying
+    the output. The key is a hash of ``inputs``, which should include the keys
+    of upstream stages as well as the parameters of this stage. If ``cache`` is
+    a :class:`DataCache <neurotic.datasets.cache.DataCache>`, the output is
+    taken from it if possible; otherwise, ``compute`` is called and its output
+    is stored in the cache. If ``cache`` is ``None``, ``compute`` is always
+    called and the returned key is ``None``.
+    """
+
+    if cache is None:
+        return compute(), None
+
+    key = DataCache.make_key(*inputs)
+    output = cache.get(key)
+    if output is None:
+        output = compute()
+        cache.put(key, output)
+    return output, key
+
+def _spiketrain_key(st, spiketrain_keys):
+    """
+    Return the stage key of the Neo :class:`SpikeTrain <neo.core.SpikeTrain>`
+    ``st``. Spike trains not produced by a cached stage, such as those read
+    from files, are identified by their contents.
+    """
+
+    if st.name not in spiketrain_keys:
+        spiketrain_keys[st.name] = DataCache.make_key(__version__, 'spiketrain', st.name, st.times.rescale('s'), st.t_start.rescale('s'), st.t_stop.rescale('s'))
+    return spiketrain_keys[st.name]
+
 def _get_io(metadata):
     """
     Return a :mod:`neo.io` object for reading the ``data_file`` in
@@ -274,6 +357,41 @@ def _read_data_file(metadata, lazy=False, signal_group_mode='split-all'):
 
     return blk
 
+def _read_data_file_cached(metadata, cache, signal_group_mode='split-all'):
+    """
+    Read in the ``data_file`` given in ``metadata`` like :func:`_read_data_file`
+    with ``lazy=False``, but take the signals from ``cache`` if possible, in
+    which case signals are not read from the file if its reader supports lazy
+    loading. The signals are stored in the cache if they were not already
+    there. Returns a Neo :class:`Block <neo.core.Block>` and a list of stage
+    keys, one for each signal.
+    """
+
+    key = DataCache.make_key(
+        __version__,
+        'read',
+        _file_identity(_abs_path(metadata, 'data_file')),
+        metadata.get('io_class', None),
+        metadata.get('io_args', None),
+        signal_group_mode,
+    )
+
+    analogsignals = cache.get(key)
+    if analogsignals is not None:
+        # signals will be replaced by cached copies, so avoid reading them
+        # from the data file if possible
+        blk = _read_data_file(metadata, True, signal_group_mode)
+        blk.segments[0].analogsignals = analogsignals
+        if hasattr(blk, 'rawio'):
+            del blk.rawio
+    else:
+        blk = _read_data_file(metadata, False, signal_group_mode)
+        cache.put(key, list(blk.segments[0].analogsignals))
+
+    signal_keys = [DataCache.make_key(key, i) for i in range(len(blk.segments[0].analogsignals))]
+
+    return blk, signal_keys
+
 def _read_annotations_file(metadata):
     """
     Read in epochs and events from the ``annotations_file`` in ``metadata`` and
@@ -286,59 +404,7 @@ def _read_annotations_file(metadata):
 
     else:
 
-        # data types for each column in the file
-        dtypes = {
-            'Start (s)': float,
-            'End (s)':   float,
-            'Type':      str,
-            'Label':     str,
-        }
-
-        # parse the file and create a dataframe
-        df = pd.read_csv(_abs_path(metadata, 'annotations_file'), dtype = dtypes)
-
-        # increment row labels by 2 so they match the source file
-        # which is 1-indexed and has a header
-        df.index += 2
-
-        # discard entries with missing or negative start times
-        bad_start = df['Start (s)'].isnull() | (df['Start (s)'] < 0)
-        if bad_start.any():
-            logger.warning('These rows will be discarded because their Start '
-                           'times are missing or negative:\n'
-                           f'{df[bad_start]}')
-            df = df[~bad_start]
-
-        # discard entries with end time preceding start time
-        bad_end = df['End (s)'] < df['Start (s)']
-        if bad_end.any():
-            logger.warning('These rows will be discarded because their End '
-                           'times precede their Start times:\n'
-                           f'{df[bad_end]}')
-            df = df[~bad_end]
-
-        # compute durations
-        df.insert(
-            column = 'Duration (s)',
-            value = df['End (s)'] - df['Start (s)'],
-            loc = 2, # insert after 'End (s)'
-        )
-
-        # replace some NaNs
-        df.fillna({
-            'Duration (s)': 0,
-            'Type': 'Other',
-            'Label': '',
-        }, inplace = True)
-
-        # sort entries by time
-        df.sort_values([
-            'Start (s)',
-            'Duration (s)',
-        ], inplace = True)
-
-        # return the dataframe
-        return df
+        return _read_epochs_csv(_abs_path(metadata, 'annotations_file'))
 
 def _read_epoch_encoder_file(metadata):
     """
@@ -352,64 +418,90 @@ def _read_epoch_encoder_file(metadata):
 
     else:
 
-        # data types for each column in the file
-        dtypes = {
-            'Start (s)': float,
-            'End (s)':   float,
-            'Type':      str,
-        }
+        # label the epochs to indicate where they came from
+        return _read_epochs_csv(_abs_path(metadata, 'epoch_encoder_file'),
+                                label='(from epoch encoder file)')
 
-        # parse the file and create a dataframe
-        df = pd.read_csv(_abs_path(metadata, 'epoch_encoder_file'), dtype = dtypes)
-
-        # increment row labels by 2 so they match the source file
-        # which is 1-indexed and has a header
-        df.index += 2
-
-        # discard entries with missing or negative start times
-        bad_start = df['Start (s)'].isnull() | (df['Start (s)'] < 0)
-        if bad_start.any():
-            logger.warning('These rows will be discarded because their Start '
-                           'times are missing or negative:\n'
-                           f'{df[bad_start]}')
-            df = df[~bad_start]
-
-        # discard entries with end time preceding start time
-        bad_end = df['End (s)'] < df['Start (s)']
-        if bad_end.any():
-            logger.warning('These rows will be discarded because their End '
-                           'times precede their Start times:\n'
-                           f'{df[bad_end]}')
-            df = df[~bad_end]
-
-        # compute durations
-        df.insert(
-            column = 'Duration (s)',
-            value = df['End (s)'] - df['Start (s)'],
-            loc = 2, # insert after 'End (s)'
-        )
+def _read_epochs_csv(file, label=None):
+    """
+    Read in epochs and events from a CSV file with ``Start (s)``, ``End (s)``,
+    and ``Type`` columns and return a dataframe sorted by time, with durations
+    added and invalid entries discarded.
+
+    If ``label`` is None, the file must also have a ``Label`` column;
+    otherwise, every entry is given the same ``label``. The ``Type`` and
+    ``Label`` columns of the dataframe are categorical. The file is parsed with
+    pyarrow if it is installed.
+    """
 
-        # replace some NaNs
-        df.fillna({
-            'Duration (s)': 0,
-            'Type': 'Other',
-        }, inplace = True)
-
-        # sort entries by time
-        df.sort_values([
-            'Start (s)',
-            'Duration (s)',
-        ], inplace = True)
-
-        # add 'Label' column to indicate where these epochs came from
-        df.insert(
-            column = 'Label',
-            value = '(from epoch encoder file)',
-            loc = 4, # insert after 'Type'
-        )
+    # data types for each column in the file, parsing strings directly into
+    # categories
+    dtypes = {
+        'Start (s)': float,
+        'End (s)':   float,
+        'Type':      'category',
+    }
+    if label is None:
+        dtypes['Label'] = 'category'
+
+    # parse the file and create a dataframe
+    df = pd.read_csv(file, dtype = dtypes, engine = 'pyarrow' if HAVE_PYARROW else 'c')
+
+    # increment row labels by 2 so they match the source file
+    # which is 1-indexed and has a header
+    df.index += 2
+
+    starts = df['Start (s)'].to_numpy()
+    ends = df['End (s)'].to_numpy()
+
+    # discard entries with missing or negative start times
+    bad_start = np.isnan(starts) | (starts < 0)
+    if bad_start.any():
+        logger.warning('These rows will be discarded because their Start '
+                       'times are missing or negative:\n'
+                       f'{df[bad_start]}')
+
+    # discard entries with end time preceding start time
+    bad_end = ~bad_start & (ends < starts)
+    if bad_end.any():
+        logger.warning('These rows will be discarded because their End '
+                       'times precede their Start times:\n'
+                       f'{df[bad_end]}')
+
+    # compute durations, which are 0 if end times are missing
+    keep = ~(bad_start | bad_end)
+    durations = np.nan_to_num(ends - starts, nan=0)
+
+    columns = {
+        'Start (s)':    starts[keep],
+        'End (s)':      ends[keep],
+        'Duration (s)': durations[keep],
+        'Type':         _categorical_column(df['Type'][keep], 'Other'),
+    }
+    if label is None:
+        columns['Label'] = _categorical_column(df['Label'][keep], '')
+    else:
+        columns['Label'] = pd.Categorical.from_codes(np.zeros(keep.sum(), dtype='int64'), [label])
+    df = pd.DataFrame(columns, index = df.index[keep])
 
-        # return the dataframe
-        return df
+    # sort entries by time
+    return df.iloc[np.lexsort((df['Duration (s)'], df['Start (s)']))]
+
+def _categorical_column(column, missing_value):
+    """
+    Replace missing values and empty strings in a categorical column with
+    ``missing_value``.
+    """
+
+    column = column.astype('category').array
+    if missing_value != '' and '' in column.categories:
+        # some parsers read empty fields as empty strings
+        column = column.remove_categories([''])
+    if column.isna().any():
+        if missing_value not in column.categories:
+            column = column.add_categories([missing_value])
+        column = column.fillna(missing_value)
+    return column
 
 def _read_spikes_file(metadata, blk):
     """
@@ -441,62 +533,97 @@ def _read_spikes_file(metadata, blk):
         # return the dataframe
         return df
 
-def _create_neo_epochs_from_dataframe(dataframe, metadata, file_origin, filter_events_from_epochs=False):
+def _create_neo_epochs_and_events_from_dataframe(dataframe, metadata, file_origin, filter_events_from_epochs=False):
     """
     Convert the contents of a dataframe into Neo :class:`Epochs
-    <neo.core.Epoch>`.
+    <neo.core.Epoch>` and :class:`Events <neo.core.Event>`, one of each for
+    each type of entry, and return the lists of Epochs and Events.
+
+    If ``filter_events_from_epochs=True``, entries without a positive duration
+    are excluded from the Epochs.
     """
 
     epochs_list = []
+    events_list = []
 
     if dataframe is not None:
 
-        if filter_events_from_epochs:
-            # keep only rows with a positive duration
-            dataframe = dataframe[dataframe['Duration (s)'] > 0]
+        starts = dataframe['Start (s)'].to_numpy()
+        durations = dataframe['Duration (s)'].to_numpy()
+        label_column = dataframe['Label'].astype('category')
+        labels = np.asarray(label_column.cat.categories, dtype=str)[label_column.cat.codes.to_numpy()]
 
-        # group epochs by type
-        for type_name, df in dataframe.groupby('Type'):
+        # group entries by type
+        for type_name, indexes in dataframe.groupby('Type', observed=True).indices.items():
 
-            # create a Neo Epoch for each type
-            epoch = neo.Epoch(
+            # create a Neo Event for each type
+            event = neo.Event(
                 name = type_name,
                 file_origin = file_origin,
-                times = df['Start (s)'].values * pq.s,
-                durations = df['Duration (s)'].values * pq.s,
-                labels = df['Label'].values,
+                times = starts[indexes] * pq.s,
+                labels = labels[indexes],
             )
+            events_list.append(event)
 
+            keep = slice(None)
+            if filter_events_from_epochs:
+                # keep only entries with a positive duration
+                keep = durations[indexes] > 0
+                if not keep.any():
+                    continue
+
+            if isinstance(keep, slice) or keep.all():
+                # create a Neo Epoch for each type that shares the times and
+                # labels of the Event
+                epoch = _epoch_view_of_event(event, durations[indexes] * pq.s)
+                epoch.file_origin = file_origin
+            else:
+                # create a Neo Epoch for each type from the kept entries
+                epoch = neo.Epoch(
+                    name = type_name,
+                    file_origin = file_origin,
+                    times = event.times[keep],
+                    durations = durations[indexes[keep]] * pq.s,
+                    labels = event.labels[keep],
+                )
             epochs_list.append(epoch)
 
-    # return the list of Neo Epochs
-    return epochs_list
+    # return the lists of Neo Epochs and Events
+    return epochs_list, events_list
 
-def _create_neo_events_from_dataframe(dataframe, metadata, file_origin):
-    """
-    Convert the contents of a dataframe into Neo :class:`Events
-    <neo.core.Event>`.
+def _epoch_view_of_event(event, durations=None):
     """
+    Return a Neo :class:`Epoch <neo.core.Epoch>` with the name, times, and
+    labels of a Neo :class:`Event <neo.core.Event>` that shares the memory of
+    its times and labels instead of copying them.
 
-    events_list = []
-
-    if dataframe is not None:
-
-        # group events by type
-        for type_name, df in dataframe.groupby('Type'):
-
-            # create a Neo Event for each type
-            event = neo.Event(
-                name = type_name,
-                file_origin = file_origin,
-                times = df['Start (s)'].values * pq.s,
-                labels = df['Label'].values,
-            )
+    If ``durations`` is not given, every duration is zero, and the durations
+    are a read-only view of a single zero.
+    """
 
-            events_list.append(event)
+    epoch = event.view(neo.Epoch)
+    epoch.annotations = {}
+    epoch.file_origin = None
+    epoch.description = None
+    epoch.segment = None
+    if durations is None:
+        durations = pq.Quantity(np.broadcast_to(np.zeros((), dtype=event.dtype), event.shape), event.units)
+    epoch._durations = durations
+    return epoch
+
+def _event_view_of_epoch(epoch):
+    """
+    Return a Neo :class:`Event <neo.core.Event>` with the name, times, and
+    labels of a Neo :class:`Epoch <neo.core.Epoch>` that shares the memory of
+    its times and labels instead of copying them.
+    """
 
-    # return the list of Neo Events
-    return events_list
+    event = epoch.view(neo.Event)
+    event.annotations = {}
+    event.file_origin = None
+    event.description = None
+    event.segment = None
+    return event
 
 def _create_neo_spike_trains_from_dataframe(dataframe, metadata, t_start, t_stop, sampling_period):
     """
@@ -529,15 +656,33 @@ def _create_neo_spike_trains_from_dataframe(dataframe, metadata, t_start, t_stop
 
     return spiketrain_list
 
-def _apply_filters(metadata, blk):
+def _apply_filters(metadata, blk, cache=None, signal_keys=None, max_workers=None):
     """
     Apply filters specified in ``metadata`` to the signals in ``blk``.
+
+    Signals are filtered concurrently in a pool of up to ``max_workers``
+    threads (by default, a number based on the number of processors), which
+    can speed up filtering of recordings with many channels substantially
+    because SciPy releases the global interpreter lock while filtering.
+    Multiple filters applied to the same channel are applied in the order they
+    are listed, so results are identical to applying every filter serially.
+    Filters are applied forward and backward with second-order sections
+    (:func:`scipy.signal.sosfiltfilt`), which remains numerically stable for
+    low cutoff frequencies. Signals longer than ``_filter_chunk_size`` samples
+    are filtered in chunks, with the same result, so that memory use does not
+    grow with the length of the recording.
+
+    If ``cache`` is given, each filtered signal is taken from the cache if
+    possible, and ``signal_keys`` is updated with the stage keys of the
+    filtered signals.
     """
 
     if metadata.get('filters', None) is not None:
 
         signalNameToIndex = {sig.name:i for i, sig in enumerate(blk.segments[0].analogsignals)}
 
+        # group filters by channel, preserving their order
+        filters_by_index = {}
         for sig_filter in metadata['filters']:
 
             index = signalNameToIndex.get(sig_filter['channel'], None)
@@ -547,24 +692,59 @@ def _apply_filters(metadata, blk):
 
             else:
 
+                filters_by_index.setdefault(index, []).append(sig_filter)
+
+        def filter_channel(index):
+            sig = blk.segments[0].analogsignals[index]
+            key = signal_keys and signal_keys[index]
+            for sig_filter in filters_by_index[index]:
                 high = sig_filter.get('highpass', None)
                 low  = sig_filter.get('lowpass',  None)
                 if high:
                     high *= pq.Hz
                 if low:
                     low  *= pq.Hz
-                blk.segments[0].analogsignals[index] = _elephant_tools.butter(
-                    signal = blk.segments[0].analogsignals[index],
-                    highpass_freq = high,
-                    lowpass_freq  = low,
+                # stream long signals through the filter in chunks, which
+                # gives the same result as filtering them all at once
+                chunk_size = _filter_chunk_size if len(sig) > _filter_chunk_size else None
+                sig, key = _run_stage(
+                    cache,
+                    lambda: _elephant_tools.butter(
+                        signal = sig,
+                        highpass_freq = high,
+                        lowpass_freq  = low,
+                        filter_function = 'sosfiltfilt',
+                        chunk_size = chunk_size,
+                    ),
+                    'filter', key, high, low, 'sosfiltfilt',
                 )
+            return sig, key
+
+        if max_workers == 1 or len(filters_by_index) < 2:
+            results = map(filter_channel, filters_by_index)
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(filter_channel, filters_by_index))
+
+        for index, (sig, key) in zip(filters_by_index, results):
+            blk.segments[0].analogsignals[index] = sig
+            if cache is not None:
+                signal_keys[index] = key
 
     return blk
 
-def _run_amplitude_discriminators(metadata, blk):
+def _run_amplitude_discriminators(metadata, blk, cache=None, signal_keys=None, spiketrain_keys=None):
     """
     Run all amplitude discriminators for spike detection given in ``metadata``
     on the signals in ``blk``.
+
+    Each signal is scanned for threshold crossings only once, no matter how
+    many discriminators use it, and each discriminator then selects its spikes
+    from the crossings.
+
+    If ``cache`` is given, each spike train is taken from the cache if
+    possible, and ``spiketrain_keys`` is updated with the stage keys of the
+    spike trains.
     """
 
     spiketrain_list = []
@@ -574,6 +754,19 @@ def _run_amplitude_discriminators(metadata, blk):
         signalNameToIndex = {sig.name:i for i, sig in enumerate(blk.segments[0].analogsignals)}
         epochs = blk.segments[0].epochs
 
+        # group discriminators by channel so that each signal is scanned for
+        # threshold crossings only once, and only if needed
+        discriminators_by_index = {}
+        for discriminator in metadata['amplitude_discriminators']:
+            index = signalNameToIndex.get(discriminator['channel'], None)
+            if index is not None:
+                discriminators_by_index.setdefault(index, []).append(discriminator)
+        crossings_by_index = {}
+        def get_crossings(index):
+            if index not in crossings_by_index:
+                crossings_by_index[index] = _channel_crossings(blk.segments[0].analogsignals[index], discriminators_by_index[index])
+            return crossings_by_index[index]
+
         # classify spikes by amplitude
         for discriminator in metadata['amplitude_discriminators']:
 
@@ -585,19 +778,36 @@ def _run_amplitude_discriminators(metadata, blk):
             else:
 
                 sig = blk.segments[0].analogsignals[index]
-                st = _detect_spikes(sig, discriminator, epochs)
+                st, key = _run_stage(
+                    cache,
+                    lambda: _detect_spikes(sig, discriminator, epochs, get_crossings(index)),
+                    'discriminator', signal_keys and signal_keys[index], discriminator, _epoch_key(discriminator, epochs),
+                )
+                if cache is not None:
+                    spiketrain_keys[st.name] = key
                 spiketrain_list.append(st)
 
     return spiketrain_list
 
 
-def _detect_spikes(sig, discriminator, epochs):
+def _epoch_key(discriminator, epochs):
     """
-    Detect spikes in the amplitude window given by ``discriminator`` and
-    optionally filter them by coincidence with epochs of a given name.
+    Return a description of the contents of the epoch used by ``discriminator``
+    to filter spikes, or ``None`` if it does not use one.
     """
 
-    assert sig.name == discriminator['channel'], 'sig name "{}" does not match amplitude discriminator channel "{}"'.format(sig.name, discriminator['channel'])
+    if isinstance(discriminator.get('epoch', None), str):
+        ep = next((ep for ep in epochs if ep.name == discriminator['epoch']), None)
+        if ep is not None:
+            return [ep.times.rescale('s'), ep.durations.rescale('s')]
+    return None
+
+def _discriminator_thresholds(discriminator, units=None):
+    """
+    Return the minimum and maximum thresholds of ``discriminator`` and the
+    sign (``'above'`` or ``'below'``) of the spikes it detects. If ``units``
+    is given, the thresholds are converted to those units.
+    """
 
     min_threshold = min(discriminator['amplitude'])
     max_threshold = max(discriminator['amplitude'])
@@ -607,15 +817,114 @@ def _detect_spikes(sig, discriminator, epochs):
         sign = 'below'
     else:
         raise ValueError('amplitude discriminator must have two nonnegative thresholds or two nonpositive thresholds: {}'.format(discriminator))
+    if units is not None:
+        min_threshold = pq.Quantity(min_threshold, discriminator['units']).rescale(units).magnitude
+        max_threshold = pq.Quantity(max_threshold, discriminator['units']).rescale(units).magnitude
+    return min_threshold, max_threshold, sign
 
-    spikes_crossing_min = _elephant_tools.peak_detection(sig, pq.Quantity(min_threshold, discriminator['units']), sign, 'raw')
-    spikes_crossing_max = _elephant_tools.peak_detection(sig, pq.Quantity(max_threshold, discriminator['units']), sign, 'raw')
-    if sign == 'above':
-        spikes_between_min_and_max = np.setdiff1d(spikes_crossing_min, spikes_crossing_max)
-    elif sign == 'below':
-        spikes_between_min_and_max = np.setdiff1d(spikes_crossing_max, spikes_crossing_min)
-    else:
-        raise ValueError('sign should be "above" or "below": {}'.format(sign))
+def _channel_crossings(sig, discriminators):
+    """
+    Find the threshold crossings in ``sig`` needed by all of the
+    ``discriminators`` on its channel in one pass per sign, using the loosest
+    threshold of each sign. Returns a dictionary mapping signs to tables of
+    crossings from :func:`_threshold_crossings`, which can be passed to
+    :func:`_detect_spikes` so that each discriminator does not need to scan
+    the signal again.
+    """
+
+    loosest_thresholds = {}
+    for discriminator in discriminators:
+        min_threshold, max_threshold, sign = _discriminator_thresholds(discriminator, sig.units)
+        if sign == 'above':
+            loosest_thresholds['above'] = min(min_threshold, loosest_thresholds.get('above', np.inf))
+        else:
+            loosest_thresholds['below'] = max(max_threshold, loosest_thresholds.get('below', -np.inf))
+
+    return {sign: _threshold_crossings(sig.magnitude[:, 0], threshold, sign) for sign, threshold in loosest_thresholds.items()}
+
+def _detect_spikes_in_chunks(read_chunk, n_samples, t_start, sampling_rate, channel, discriminators, epochs, chunk_size=None):
+    """
+    Detect spikes like :func:`_detect_spikes` for one or more
+    ``discriminators`` on the same ``channel``, reading the signal one chunk at
+    a time so that it never has to be fully loaded into memory.
+
+    ``read_chunk(i_start, i_stop)`` should return a Quantity array containing
+    samples ``i_start`` to ``i_stop`` of the signal, which has ``n_samples``
+    samples in total. The signal is read in windows of ``chunk_size`` samples
+    (by default, ``_detect_chunk_size``). Each window ends where the earliest
+    threshold crossing still in progress at the end of the window begins, and
+    the next window starts there, so that spikes spanning window boundaries are
+    detected exactly as they would be in the whole signal.
+
+    This is a generator that yields a tuple after each window containing the
+    index of the last sample processed and a list of spike trains, one per
+    discriminator, containing the spikes found in the window.
+    """
+
+    if chunk_size is None:
+        chunk_size = _detect_chunk_size
+
+    # for each discriminator, the threshold that a crossing must exceed to be
+    # considered, which is the threshold closer to zero
+    loose_thresholds = []
+    for discriminator in discriminators:
+        min_threshold, max_threshold, sign = _discriminator_thresholds(discriminator)
+        threshold = pq.Quantity(min_threshold if sign == 'above' else max_threshold, discriminator['units'])
+        loose_thresholds.append((threshold, sign))
+
+    i_start = 0
+    window_size = chunk_size
+    while i_start < n_samples:
+
+        i_stop = min(i_start + window_size, n_samples)
+        chunk = read_chunk(i_start, i_stop)
+
+        # move the end of the window back to the start of any crossing in
+        # progress at the end of the chunk
+        i_cut = i_stop
+        if i_stop < n_samples:
+            for threshold, sign in loose_thresholds:
+                if sign == 'above':
+                    crossing = np.asarray(chunk > threshold).ravel()
+                else:
+                    crossing = np.asarray(chunk < threshold).ravel()
+                if crossing[-1]:
+                    not_crossing = np.nonzero(~crossing)[0]
+                    i_cut = min(i_cut, i_start + (not_crossing[-1] + 1 if len(not_crossing) else 0))
+
+        if i_cut == i_start:
+            # a crossing spans the entire window, so try again with a larger
+            # window
+            window_size *= 2
+            continue
+
+        sig = neo.AnalogSignal(
+            chunk[:i_cut - i_start].reshape(-1, 1),
+            name = channel,
+            sampling_rate = sampling_rate,
+            t_start = t_start + i_start / sampling_rate,
+        )
+        crossings = _channel_crossings(sig, discriminators)
+        spiketrains = [_detect_spikes(sig, discriminator, epochs, crossings) for discriminator in discriminators]
+        yield i_cut, spiketrains
+
+        i_start = i_cut
+        window_size = chunk_size
+
+def _detect_spikes(sig, discriminator, epochs, crossings=None):
+    """
+    Detect spikes in the amplitude window given by ``discriminator`` and
+    optionally filter them by coincidence with epochs of a given name.
+
+    If ``crossings`` from :func:`_channel_crossings` is given, spikes are
+    found in it instead of in ``sig``.
+    """
+
+    assert sig.name == discriminator['channel'], 'sig name "{}" does not match amplitude discriminator channel "{}"'.format(sig.name, discriminator['channel'])
+
+    min_threshold, max_threshold, sign = _discriminator_thresholds(discriminator, sig.units)
+    peak_indexes = _find_peaks_between_thresholds(sig.magnitude[:, 0], min_threshold, max_threshold, sign, crossings and crossings[sign])
+    spikes_between_min_and_max = (sig.t_start + peak_indexes / sig.sampling_rate).magnitude
 
     st = neo.SpikeTrain(
         name = discriminator['name'],
@@ -628,18 +937,17 @@ def _detect_spikes(sig, discriminator, epochs):
 
     if 'epoch' in discriminator:
 
-        time_masks = []
         if isinstance(discriminator['epoch'], str):
             # search for matching epochs
             ep = next((ep for ep in epochs if ep.name == discriminator['epoch']), None)
             if ep is not None:
-                # select spike times that fall within each epoch
-                for t_start, duration in zip(ep.times, ep.durations):
-                    t_stop = t_start + duration
-                    time_masks.append((t_start <= st) & (st < t_stop))
+                # select spike times that fall within any epoch
+                ep_starts = ep.times.rescale(st.units).magnitude
+                ep_stops = ep_starts + ep.durations.rescale(st.units).magnitude
+                time_mask = _in_intervals(st.magnitude, ep_starts, ep_stops)
             else:
                 # no matching epochs found
-                time_masks.append([False] * len(st))
+                time_mask = np.zeros(len(st), dtype=bool)
         else:
             # may eventually implement lists of ordered pairs, but
             # for now raise an error
@@ -647,14 +955,128 @@ def _detect_spikes(sig, discriminator, epochs):
 
         # select the subset of spikes that fall within the epoch
         # windows
-        st = st[np.any(time_masks, axis=0)]
+        st = st[time_mask]
 
     return st
 
-def _run_burst_detectors(metadata, blk):
+def _threshold_crossings(data, threshold, sign):
+    """
+    Return the indexes and values of the samples in the 1D array ``data`` that
+    are above (``sign='above'``) or below (``sign='below'``) ``threshold``.
+    Values below the threshold are negated, so that in either case the peaks
+    of crossings are maxima.
+    """
+
+    if sign == 'above':
+        crossing_indexes = np.nonzero(data > threshold)[0]
+        crossing_values = data[crossing_indexes]
+    elif sign == 'below':
+        crossing_indexes = np.nonzero(data < threshold)[0]
+        crossing_values = -data[crossing_indexes]
+    else:
+        raise ValueError('sign should be "above" or "below": {}'.format(sign))
+    return crossing_indexes, crossing_values
+
+def _find_peaks_between_thresholds(data, min_threshold, max_threshold, sign, crossings=None):
+    """
+    Return the indexes of the peaks of threshold crossings in the 1D array
+    ``data`` with amplitudes between ``min_threshold`` and ``max_threshold``.
+
+    This gives the same result as finding peaks crossing each threshold with
+    :func:`peak_detection <neurotic._elephant_tools.peak_detection>` and
+    keeping peaks that cross one threshold but not the other, but it requires
+    only one vectorized pass over the data. If ``sign='above'``, each run of
+    consecutive samples above ``min_threshold`` is a crossing, and its peak is
+    the first occurrence of its maximum value. The peak of a crossing also
+    crosses ``max_threshold`` exactly when its value exceeds
+    ``max_threshold``, so such peaks are discarded. ``sign='below'`` is
+    handled likewise with minima, using ``max_threshold`` to find crossings.
+
+    If ``crossings`` from :func:`_threshold_crossings` is given for a
+    threshold of the same sign that is at least as loose, the crossings are
+    selected from it and ``data`` is not scanned.
+    """
+
+    if sign == 'above':
+        loose_threshold, strict_threshold = min_threshold, max_threshold
+    elif sign == 'below':
+        # crossing values are negated so that troughs become peaks
+        loose_threshold, strict_threshold = -max_threshold, -min_threshold
+    else:
+        raise ValueError('sign should be "above" or "below": {}'.format(sign))
+
+    if crossings is None:
+        crossing_indexes, crossing_values = _threshold_crossings(data, max_threshold if sign == 'below' else min_threshold, sign)
+    else:
+        crossing_indexes, crossing_values = crossings
+        mask = crossing_values > loose_threshold
+        if not mask.all():
+            crossing_indexes, crossing_values = crossing_indexes[mask], crossing_values[mask]
+
+    if len(crossing_indexes) == 0:
+        return np.zeros(0, dtype=int)
+
+    # locate the first sample of each crossing and label samples by crossing
+    is_first = np.empty(len(crossing_indexes), dtype=bool)
+    is_first[0] = True
+    np.greater(np.diff(crossing_indexes), 1, out=is_first[1:])
+    crossing_ids = np.cumsum(is_first) - 1
+
+    # find the first occurrence of the maximum of each crossing
+    maxima = np.maximum.reduceat(crossing_values, np.nonzero(is_first)[0])
+    max_positions = np.nonzero(crossing_values == maxima[crossing_ids])[0]
+    max_ids = crossing_ids[max_positions]
+    is_first_max = np.empty(len(max_positions), dtype=bool)
+    is_first_max[0] = True
+    np.not_equal(max_ids[1:], max_ids[:-1], out=is_first_max[1:])
+    peak_positions = max_positions[is_first_max]
+
+    # discard peaks that also cross the strict threshold
+    keep = ~(maxima > strict_threshold)
+    return crossing_indexes[peak_positions[keep]]
+
+def _in_intervals(times, starts, stops):
+    """
+    Return a boolean array indicating which ``times`` fall within any of the
+    half-open intervals [``starts``, ``stops``). Intervals may overlap and
+    need not be sorted.
+
+    Overlapping and adjacent intervals are merged, and each time is located
+    among the merged intervals by binary search, so this takes O((n+m) log m)
+    time and O(n+m) memory for n times and m intervals.
+    """
+
+    times = np.asarray(times)
+    starts = np.asarray(starts, dtype=float)
+    stops = np.asarray(stops, dtype=float)
+
+    # discard empty intervals and sort the rest by start time
+    nonempty = stops > starts
+    order = np.argsort(starts[nonempty], kind='stable')
+    starts = starts[nonempty][order]
+    stops = stops[nonempty][order]
+    if len(starts) == 0:
+        return np.zeros(times.shape, dtype=bool)
+
+    # merge intervals that overlap or touch the intervals before them
+    max_stops = np.maximum.accumulate(stops)
+    is_first = np.empty(len(starts), dtype=bool)
+    is_first[0] = True
+    np.greater(starts[1:], max_stops[:-1], out=is_first[1:])
+    merged_starts = starts[is_first]
+    merged_stops = max_stops[np.append(np.nonzero(is_first)[0][1:] - 1, len(starts) - 1)]
+
+    # find the last merged interval starting at or before each time
+    i = np.searchsorted(merged_starts, times, side='right') - 1
+    return (i >= 0) & (times < merged_stops[np.maximum(i, 0)])
+
+def _run_burst_detectors(metadata, blk, cache=None, spiketrain_keys=None):
     """
     Run all burst detectors given in ``metadata`` on the spike trains in
     ``blk``.
+
+    If ``cache`` is given, each set of bursts is taken from the cache if
+    possible.
     """
 
     burst_list = []
@@ -663,6 +1085,14 @@ def _run_burst_detectors(metadata, blk):
 
         spikeTrainNameToIndex = {st.name:i for i, st in enumerate(blk.segments[0].spiketrains)}
 
+        # compute the instantaneous firing frequency of each spike train only
+        # once, even if multiple detectors use it
+        iff_by_index = {}
+        def get_iff(index):
+            if index not in iff_by_index:
+                iff_by_index[index] = _spiketrain_iff(blk.segments[0].spiketrains[index])
+            return iff_by_index[index]
+
         # detect bursts of spikes using frequency thresholds
         for detector in metadata['burst_detectors']:
 
@@ -677,13 +1107,17 @@ def _run_burst_detectors(metadata, blk):
 
                 st = blk.segments[0].spiketrains[index]
                 start_freq, stop_freq = detector['thresholds']*pq.Hz
-                burst = _find_bursts(st, start_freq, stop_freq)
+                burst, _ = _run_stage(
+                    cache,
+                    lambda: _find_bursts(st, start_freq, stop_freq, get_iff(index)),
+                    'bursts', cache and _spiketrain_key(st, spiketrain_keys), detector['thresholds'],
+                )
                 burst.name = detector.get('name', detector['spiketrain'] + ' burst')
                 burst_list.append(burst)
 
     return burst_list
 
-def _find_bursts(st, start_freq, stop_freq):
+def _find_bursts(st, start_freq, stop_freq, iff=None):
     """
     Find every period of time during which the instantaneous firing frequency
     (IFF) of the Neo :class:`SpikeTrain <neo.core.SpikeTrain>` ``st`` meets the
@@ -695,55 +1129,230 @@ def _find_bursts(st, start_freq, stop_freq):
     ``start_freq`` and ending when the IFF subsequently drops below the
     ``stop_freq``. Note that in general ``stop_freq`` should not exceed
     ``start_freq``, since otherwise bursts may not be detected.
+
+    The IFF of ``st`` may be given as ``iff`` (in Hz) if it is already known,
+    e.g., when running multiple burst detectors on the same spike train.
+
+    The indexes of all candidate starts and stops are found at once, along
+    with the first stop after each start and the first start after each stop,
+    so that finding each burst takes constant time.
     """
 
-    isi = _elephant_tools.isi(st).rescale('s')
-    iff = 1/isi
+    if iff is None:
+        iff = _spiketrain_iff(st)
+    start_indexes = np.nonzero(iff > start_freq.rescale('Hz').magnitude)[0]
+    stop_indexes = np.nonzero(iff < stop_freq.rescale('Hz').magnitude)[0]
+
+    # for each start, the position in stop_indexes of the first stop after it
+    next_stop = np.searchsorted(stop_indexes, start_indexes, side='right')
+    # for each stop, the position in start_indexes of the first start after it
+    next_start = np.searchsorted(start_indexes, stop_indexes, side='right')
+
+    # follow the chain of alternating starts and stops
+    burst_starts = []
+    burst_stops = []
+    i = 0
+    while i < len(start_indexes):
+        burst_starts.append(start_indexes[i])
+        k = next_stop[i]
+        if k == len(stop_indexes):
+            # no stop after start, so include all spikes after start
+            burst_stops.append(len(st) - 1)
+            break
+        burst_stops.append(stop_indexes[k])
+        i = next_start[k]
 
-    start_mask = iff > start_freq
-    stop_mask = iff < stop_freq
+    burst_starts = np.array(burst_starts, dtype=int)
+    burst_stops = np.array(burst_stops, dtype=int)
+    spike_times = st.times.rescale('s').magnitude
 
-    times = []
-    durations = []
-    n_spikes = []
-    scan_index = -1
-    while scan_index < iff.size:
-        start_index = None
-        stop_index = None
+    bursts = neo.Epoch(
+        times = spike_times[burst_starts]*pq.s,
+        durations = (spike_times[burst_stops] - spike_times[burst_starts])*pq.s,
+        labels = np.full(len(burst_starts), ''),
+        array_annotations = {'spikes': burst_stops - burst_starts + 1},
+    )
 
-        start_mask_indexes = np.where(start_mask)[0]
-        start_mask_indexes = start_mask_indexes[start_mask_indexes > scan_index]
-        if start_mask_indexes.size == 0:
-            break
+    return bursts
 
-        start_index = start_mask_indexes[0] # first time that iff rises above start threshold
+def _spiketrain_iff(st):
+    """
+    Return the instantaneous firing frequency (IFF) in Hz between each pair of
+    consecutive spikes in the Neo :class:`SpikeTrain <neo.core.SpikeTrain>`
+    ``st``.
+    """
 
-        stop_mask_indexes = np.where(stop_mask)[0]
-        stop_mask_indexes = stop_mask_indexes[stop_mask_indexes > start_index]
-        if stop_mask_indexes.size > 0:
-            stop_index = stop_mask_indexes[0] # first time after start that iff drops below stop theshold
-        else:
-            stop_index = -1 # end of spike train (include all spikes after start)
+    return 1/_elephant_tools.isi(st).rescale('s').magnitude
 
-        times.append(st[start_index].rescale('s').magnitude)
-        durations.append((st[stop_index] - st[start_index]).rescale('s').magnitude)
-        n_spikes.append(stop_index-start_index+1 if stop_index > 0 else st.size-start_index)
+def _firing_rate_sampling_period(firing_rate, signal_sampling_period):
+    """
+    Return the sampling period in seconds of the firing rate described by the
+    ``firing_rate`` metadata entry.
+
+    If the entry does not give a ``sampling_period``, the sampling period of
+    the signals is used. If it is ``'auto'``, the sampling period is the
+    largest multiple of that of the signals giving at least
+    ``_rate_samples_per_sigma`` samples per sigma of the kernel, which is
+    plenty to represent the smooth rate.
+    """
 
-        if stop_index == -1:
-            break
+    signal_sampling_period = signal_sampling_period.rescale('s').magnitude.item()
+    sampling_period = firing_rate.get('sampling_period', None)
+    if sampling_period is None:
+        return signal_sampling_period
+    elif sampling_period == 'auto':
+        n = np.floor(firing_rate['sigma'] / _rate_samples_per_sigma / signal_sampling_period)
+        return max(1, int(n)) * signal_sampling_period
+    else:
+        return float(sampling_period)
+
+def _compute_rauc(metadata, blk, cache=None, signal_keys=None, max_workers=None):
+    """
+    Compute the rectified area under the curve (RAUC) of each signal in
+    ``blk`` using parameters given in ``metadata``.
+
+    Signals are processed concurrently in a pool of up to ``max_workers``
+    threads, and each is integrated in a single pass that needs little memory
+    beyond its output (see :func:`rauc <neurotic._elephant_tools.rauc>`).
+
+    If ``cache`` is given, each RAUC signal is taken from the cache if
+    possible.
+    """
+
+    if metadata.get('rauc_bin_duration', None) is not None:
+
+        def compute_rauc(i):
+            sig = blk.segments[0].analogsignals[i]
+            rauc_sig, _ = _run_stage(
+                cache,
+                lambda: _elephant_tools.rauc(
+                    signal=sig,
+                    baseline=metadata.get('rauc_baseline', None),
+                    bin_duration=metadata['rauc_bin_duration']*pq.s,
+                ),
+                'rauc', signal_keys and signal_keys[i], metadata.get('rauc_baseline', None), metadata['rauc_bin_duration'],
+            )
+            return rauc_sig
+
+        indexes = range(len(blk.segments[0].analogsignals))
+        if max_workers == 1 or len(indexes) < 2:
+            results = map(compute_rauc, indexes)
         else:
-            scan_index = stop_index
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(compute_rauc, indexes))
 
-    bursts = neo.Epoch(
-        times = times*pq.s,
-        durations = durations*pq.s,
-        labels = [''] * len(times),
-        array_annotations = {'spikes': n_spikes},
-    )
+        for sig, rauc_sig in zip(blk.segments[0].analogsignals, results):
+            rauc_sig.name = sig.name + ' RAUC'
+            sig.annotate(
+                rauc_sig=rauc_sig,
+                rauc_baseline=metadata.get('rauc_baseline', None),
+                rauc_bin_duration=metadata['rauc_bin_duration']*pq.s,
+            )
 
-    return bursts
+    return blk
 
-def _compute_firing_rates(metadata, blk):
+def _rauc_in_chunks(read_chunk, n_samples, sampling_period, baseline=None, bin_duration=None, chunk_size=None):
+    """
+    Compute the rectified area under the curve (RAUC) of a signal that is read
+    in chunks, like :func:`rauc <neurotic._elephant_tools.rauc>` but without
+    reading the whole signal into memory.
+
+    ``read_chunk(i_start, i_stop)`` should return the values of the signal
+    between samples ``i_start`` and ``i_stop`` as a 1D array. Chunks of about
+    ``chunk_size`` samples, aligned to bin boundaries, are read until the
+    signal is exhausted. This is a generator that yields the index of the first
+    bin in each chunk and the RAUC values of the bins in the chunk, in the
+    signal's units times seconds.
+
+    If ``baseline`` is ``'mean'`` or ``'median'``, the signal is first read in
+    its entirety to compute the baseline (several times for the median, see
+    :func:`streaming_median <neurotic._elephant_tools.streaming_median>`). A
+    numeric ``baseline`` is given in the signal's units.
+    """
+
+    if chunk_size is None:
+        chunk_size = _detect_chunk_size
+    dt = sampling_period.rescale('s').magnitude.item()
+
+    if baseline is None:
+        offset = 0
+    elif baseline == 'mean':
+        offset = sum(read_chunk(i, min(i + chunk_size, n_samples)).sum(dtype='float64')
+                     for i in range(0, n_samples, chunk_size)) / n_samples
+    elif baseline == 'median':
+        offset = _elephant_tools.streaming_median(read_chunk, n_samples, chunk_size)
+    else:
+        offset = baseline
+
+    if bin_duration is not None:
+        samples_per_bin = int(np.round(bin_duration.rescale('s').magnitude.item() / dt))
+    else:
+        samples_per_bin = n_samples
+    samples_per_chunk = max(1, chunk_size // samples_per_bin) * samples_per_bin
+    for i_start in range(0, n_samples, samples_per_chunk):
+        chunk = read_chunk(i_start, min(i_start + samples_per_chunk, n_samples))
+        rauc = _elephant_tools.trapezoid_bins(np.abs(chunk - offset), samples_per_bin) * dt
+        yield i_start // samples_per_bin, rauc
+
+def _compute_minmax_pyramids(sigs, cache=None, max_workers=None):
+    """
+    Compute and return a min/max pyramid for each signal in ``sigs`` (see
+    :func:`_minmax_pyramid`). Pyramids are computed in parallel using up to
+    ``max_workers`` threads.
+
+    If ``cache`` is given, the pyramid of each signal with a ``cache_key``
+    annotation, which :func:`load_dataset` adds when caching is enabled, is
+    taken from the cache if possible.
+    """
+
+    def compute_pyramid(sig):
+        key = sig.annotations.get('cache_key', None)
+        pyramid, _ = _run_stage(
+            cache if key is not None else None,
+            lambda: _minmax_pyramid(sig.magnitude),
+            'minmax_pyramid', key, _pyramid_base_factor, _pyramid_level_factor,
+        )
+        return pyramid
+
+    if max_workers == 1 or len(sigs) < 2:
+        return list(map(compute_pyramid, sigs))
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(compute_pyramid, sigs))
+
+def _minmax_pyramid(data):
+    """
+    Summarize a 2D array of signals at progressively coarser resolutions, like
+    the mipmap levels of an image.
+
+    Each level of the pyramid divides the signals into blocks of consecutive
+    samples, and holds the minimum and maximum of each channel in each block.
+    The first level has blocks of ``_pyramid_base_factor`` samples, and each
+    further level combines ``_pyramid_level_factor`` blocks of the level
+    before it, until a level has a single block. The final block of each level
+    may be shorter than the rest.
+
+    Returns a dictionary with the ``factors``, the number of samples in the
+    blocks of each level, and the ``mins`` and ``maxs`` of each level, as
+    arrays with one row per block and one column per channel.
+    """
+
+    factors, mins, maxs = [], [], []
+    factor, step = _pyramid_base_factor, _pyramid_base_factor
+    level_mins, level_maxs = data, data
+    while len(level_mins) > 1:
+        block_starts = np.arange(0, len(level_mins), step)
+        level_mins = np.minimum.reduceat(level_mins, block_starts, axis=0)
+        level_maxs = np.maximum.reduceat(level_maxs, block_starts, axis=0)
+        factors.append(factor)
+        mins.append(level_mins)
+        maxs.append(level_maxs)
+        factor *= _pyramid_level_factor
+        step = _pyramid_level_factor
+
+    return {'factors': factors, 'mins': mins, 'maxs': maxs}
+
+def _compute_firing_rates(metadata, blk, cache=None, spiketrain_keys=None, max_workers=None):
     """
     Compute instantaneous firing rates using parameters given in ``metadata``
     on spike trains in ``blk``.
@@ -752,18 +1361,44 @@ def _compute_firing_rates(metadata, blk):
     <elephant.statistics.instantaneous_rate>` function is used for calculating
     firing rates. The :mod:`kernel <elephant.kernels>` classes from the
     elephant package, as well as :class:`CausalAlphaKernel
-    <neurotic._elephant_tools.CausalAlphaKernel>`, may be used. The function
+    <neurotic._elephant_tools.CausalAlphaKernel>` and
+    :class:`CausalExponentialKernel
+    <neurotic._elephant_tools.CausalExponentialKernel>`, may be used. The function
     and kernel classes are sourced from :mod:`neurotic._elephant_tools`, rather
     than the elephant package itself, to avoid having elephant as a package
     dependency.
+
+    Firing rates are sampled with the ``sampling_period`` given for each in
+    ``metadata``, or with that of the signals if it is not given. If it is
+    ``'auto'``, it is chosen from the kernel's sigma (see
+    :func:`_firing_rate_sampling_period`).
+
+    Firing rates that use the same kernel, sigma, and sampling period are
+    computed together, so that the kernel is evaluated once and the rates share
+    a single Fast Fourier Transformation. Groups with different kernels are
+    computed concurrently in a pool of up to ``max_workers`` threads. The rates
+    are gathered into one multi-channel signal per sampling period, stored in
+    the ``firing_rates_sigs`` annotation of the segment, and each spike train is
+    annotated with a single-channel view of one of them.
+
+    If the kernel is ``'auto'``, a Gaussian kernel with a width optimized for
+    the spike train is used (see :func:`optimal_kernel
+    <neurotic._elephant_tools.optimal_kernel>`), and ``sigma`` is ignored. The
+    widths of these kernels are chosen concurrently for different spike trains
+    before the firing rates are grouped.
+
+    If ``cache`` is given, the chosen kernel widths and the firing rates of
+    each group are taken from the cache if possible.
     """
 
     if metadata.get('firing_rates', None) is not None:
 
         t_start = blk.segments[0].t_start
         t_stop = blk.segments[0].t_stop
-        sampling_period = blk.segments[0].analogsignals[0].sampling_period
+        signal_sampling_period = blk.segments[0].analogsignals[0].sampling_period
 
+        # find the spike train of each firing rate
+        entries = []
         for firing_rate in metadata['firing_rates']:
 
             spiketrain = next((st for st in blk.segments[0].spiketrains if st.name == firing_rate['name']), None)
@@ -773,29 +1408,121 @@ def _compute_firing_rates(metadata, blk):
 
             else:
 
-                kernel_cls = getattr(_elephant_tools, firing_rate['kernel'], None)
+                entries.append((firing_rate, spiketrain))
+
+        if cache is not None:
+            # compute spike train keys before any threads need them
+            for _, spiketrain in entries:
+                _spiketrain_key(spiketrain, spiketrain_keys)
+
+        def choose_sigma(spiketrain):
+            # the search for the width of the kernel is expensive, so its
+            # result is cached as a stage of its own
+            def compute():
+                kernel = _elephant_tools.optimal_kernel(spiketrain)
+                return {'sigma': None if kernel is None else kernel.sigma.rescale('s').magnitude.item()}
+            output, _ = _run_stage(cache, compute, 'optimal_kernel', cache and _spiketrain_key(spiketrain, spiketrain_keys))
+            return output['sigma']
+
+        # choose kernel widths for 'auto' kernels concurrently
+        auto_spiketrains = [spiketrain for firing_rate, spiketrain in entries if firing_rate['kernel'] == 'auto']
+        if max_workers == 1 or len(auto_spiketrains) < 2:
+            auto_sigmas = list(map(choose_sigma, auto_spiketrains))
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                auto_sigmas = list(executor.map(choose_sigma, auto_spiketrains))
+        auto_sigmas = iter(auto_sigmas)
 
-                if kernel_cls is None or not issubclass(kernel_cls, _elephant_tools.Kernel):
+        # group firing rates by kernel, preserving their order
+        groups = {}
+        for firing_rate, spiketrain in entries:
 
-                    logger.warning('Skipping firing rate computation with name {} because kernel "{}" was not found!'.format(firing_rate['name'], firing_rate['kernel']))
+            if firing_rate['kernel'] == 'auto':
 
-                else:
+                # use a Gaussian kernel with the width chosen for this
+                # spike train, after which it is treated like any other
+                sigma = next(auto_sigmas)
+                if sigma is None:
+                    logger.warning('Skipping firing rate computation with name {} because an optimal kernel width could not be found!'.format(firing_rate['name']))
+                    continue
+                firing_rate = dict(firing_rate, kernel='GaussianKernel', sigma=sigma)
+
+            kernel_cls = getattr(_elephant_tools, firing_rate['kernel'], None)
+
+            if kernel_cls is None or not issubclass(kernel_cls, _elephant_tools.Kernel):
+
+                logger.warning('Skipping firing rate computation with name {} because kernel "{}" was not found!'.format(firing_rate['name'], firing_rate['kernel']))
+
+            else:
+
+                sampling_period = _firing_rate_sampling_period(firing_rate, signal_sampling_period)
+                groups.setdefault((firing_rate['kernel'], firing_rate['sigma'], sampling_period), []).append((firing_rate, spiketrain))
+
+        def compute_group(group):
+            (kernel_name, sigma, sampling_period), members = group
+            kernel = getattr(_elephant_tools, kernel_name)(sigma*pq.s)
+            spiketrains = [spiketrain for _, spiketrain in members]
+            firing_rate_sigs, _ = _run_stage(
+                cache,
+                lambda: _elephant_tools.instantaneous_rate(
+                    spiketrain=spiketrains,
+                    sampling_period=sampling_period*pq.s,
+                    kernel=kernel,
+                    t_start=t_start,
+                    t_stop=t_stop,
+                    pool_spike_trains=False,
+                ),
+                'firing_rates', cache and [_spiketrain_key(st, spiketrain_keys) for st in spiketrains], kernel_name, sigma, sampling_period, t_start, t_stop,
+            )
+            return firing_rate_sigs
+
+        if max_workers == 1 or len(groups) < 2:
+            results = list(map(compute_group, groups.items()))
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(compute_group, groups.items()))
+
+        # gather the rates into one signal per sampling period, ordered like the
+        # spike trains they belong to, copying data only if there are multiple
+        # groups or the order differs
+        columns = {}
+        for ((_, _, sampling_period), members), firing_rate_sigs in zip(groups.items(), results):
+            for i, (firing_rate, spiketrain) in enumerate(members):
+                columns[id(spiketrain)] = (sampling_period, firing_rate, spiketrain, firing_rate_sigs, i)
+        columns_by_period = {}
+        for st in blk.segments[0].spiketrains:
+            if id(st) in columns:
+                columns_by_period.setdefault(columns[id(st)][0], []).append(columns[id(st)][1:])
+
+        firing_rates_sigs = []
+        for period_columns in columns_by_period.values():
+            first_sigs = period_columns[0][2]
+            if all(sigs is first_sigs for _, _, sigs, _ in period_columns) and \
+                    [i for _, _, _, i in period_columns] == list(range(first_sigs.shape[1])):
+                firing_rates_sig = first_sigs
+            else:
+                firing_rates_sig = neo.AnalogSignal(
+                    np.column_stack([sigs.magnitude[:, i] for _, _, sigs, i in period_columns]),
+                    units=first_sigs.units,
+                    sampling_period=first_sigs.sampling_period,
+                    t_start=first_sigs.t_start,
+                    t_stop=first_sigs.annotations['t_stop'],
+                )
+            firing_rates_sig.t_start = firing_rates_sig.t_start.rescale('s')
+            firing_rates_sig.annotations['t_stop'] = firing_rates_sig.annotations['t_stop'].rescale('s')
+            firing_rates_sig.array_annotations['channel_names'] = np.array([firing_rate['name'] for firing_rate, _, _, _ in period_columns])
+            firing_rates_sigs.append(firing_rates_sig)
+
+            for j, (firing_rate, spiketrain, _, _) in enumerate(period_columns):
+                firing_rate_sig = firing_rates_sig[:, j:j+1]
+                firing_rate_sig.name = firing_rate['name']
+                spiketrain.annotate(
+                    firing_rate_sig=firing_rate_sig,
+                    firing_rate_kernel=firing_rate['kernel'],
+                    firing_rate_sigma=firing_rate['sigma']*pq.s,
+                )
 
-                    kernel = kernel_cls(firing_rate['sigma']*pq.s)
-                    firing_rate_sig = _elephant_tools.instantaneous_rate(
-                        spiketrain=spiketrain,
-                        sampling_period=sampling_period,
-                        kernel=kernel,
-                        t_start=t_start,
-                        t_stop=t_stop,
-                    )
-                    firing_rate_sig.t_start = firing_rate_sig.t_start.rescale('s')
-                    firing_rate_sig.name = firing_rate['name']
-                    firing_rate_sig.annotations['t_stop'] = firing_rate_sig.annotations['t_stop'].rescale('s')
-                    spiketrain.annotate(
-                        firing_rate_sig=firing_rate_sig,
-                        firing_rate_kernel=firing_rate['kernel'],
-                        firing_rate_sigma=firing_rate['sigma']*pq.s,
-                    )
+        if firing_rates_sigs:
+            blk.segments[0].annotate(firing_rates_sigs=firing_rates_sigs)
 
     return blk
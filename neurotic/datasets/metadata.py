@@ -410,9 +410,13 @@ def _defaults_for_key(key):
         'tridesclous_merge': None,
 
         # list of dicts giving name of a spiketrain, name of a kernel to be
-        # convolved with the spiketrain, and the sigma parameter of the kernel
-        # in seconds
+        # convolved with the spiketrain (or 'auto' for a Gaussian kernel with an
+        # automatically chosen width), the sigma parameter of the kernel in
+        # seconds (not needed with 'auto'), and optionally the sampling period
+        # of the rate in seconds or 'auto' to choose one based on sigma
         # - e.g. [{'name': 'Unit X', 'kernel': 'CausalAlphaKernel', 'sigma': 0.5}, ...]
+        # - e.g. [{'name': 'Unit X', 'kernel': 'CausalAlphaKernel', 'sigma': 0.5, 'sampling_period': 'auto'}, ...]
+        # - e.g. [{'name': 'Unit X', 'kernel': 'auto'}, ...]
         'firing_rates': None,
 
         # the video file
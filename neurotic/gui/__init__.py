@@ -3,6 +3,7 @@
 
 """
 
+from ..gui.datasources import *
 from ..gui.epochencoder import *
 from ..gui.icons import *
 from ..gui.config import *
@@ -8,6 +8,8 @@ launching ephyviewer for a loaded dataset.
 """
 
 import re
+import queue
+import threading
 
 import numpy as np
 import pandas as pd
@@ -15,7 +17,10 @@ import quantities as pq
 import neo
 import ephyviewer
 
+from ..datasets.cache import _get_default_cache
+from ..datasets.data import _compute_minmax_pyramids, _detect_spikes_in_chunks, _rauc_in_chunks
 from ..datasets.metadata import _abs_path
+from ..gui.datasources import FilteredAnalogSignalFromNeoRawIOSource, MinMaxPyramidSourceWithScatter, MinMaxPyramidTraceViewer, NeoEpochSourceWithDensity
 from ..gui.epochencoder import NeuroticWritableEpochSource
 
 import logging
@@ -29,6 +34,17 @@ logging.getLogger('libav').setLevel(logging.CRITICAL)
 
 pq.mN = pq.UnitQuantity('millinewton', pq.N/1e3, symbol = 'mN');  # define millinewton
 
+# spikes are marked on signals only if they fall within this fraction of a
+# sampling period of a sample
+_spike_time_tolerance = 1e-3
+
+# epoch and event channels with more than this many entries are displayed as a
+# density trace, binned in seconds, unless the epoch viewer is zoomed in to a
+# time span shorter than this many seconds
+_event_density_threshold = 10000
+_event_density_bin_duration = 0.1
+_event_density_span = 10
+
 
 available_themes = ['light', 'dark', 'original', 'printer-friendly']
 available_ui_scales = ['tiny', 'small', 'medium', 'large', 'huge']
@@ -49,6 +65,7 @@ class EphyviewerConfigurator():
         * ``spike_trains``
         * ``traces_rates``
         * ``epochs``
+        * ``event_density``
         * ``epoch_encoder``
         * ``video``
         * ``event_list``
@@ -76,6 +93,7 @@ class EphyviewerConfigurator():
             'spike_trains':  {'show': True, 'disabled': False, 'reason': ''},
             'traces_rates':  {'show': True, 'disabled': False, 'reason': ''},
             'epochs':        {'show': True, 'disabled': False, 'reason': ''},
+            'event_density': {'show': True, 'disabled': False, 'reason': ''},
             'epoch_encoder': {'show': True, 'disabled': False, 'reason': ''},
             'video':         {'show': True, 'disabled': False, 'reason': ''},
             'event_list':    {'show': True, 'disabled': False, 'reason': ''},
@@ -108,11 +126,13 @@ class EphyviewerConfigurator():
             self.viewer_settings['traces']['show'] = False
             self.viewer_settings['traces']['disabled'] = True
             self.viewer_settings['traces']['reason'] = 'Cannot enable because there are no signals'
-        if not [sig.annotations['rauc_sig'] for sig in blk.segments[0].analogsignals if 'rauc_sig' in sig.annotations]:
+        if not [sig.annotations['rauc_sig'] for sig in blk.segments[0].analogsignals if 'rauc_sig' in sig.annotations] and not (self.lazy and self.blk.segments[0].analogsignals and self.metadata.get('rauc_bin_duration', None)):
+            # with lazy loading, RAUC may be calculated after launch
             self.viewer_settings['traces_rauc']['show'] = False
             self.viewer_settings['traces_rauc']['disabled'] = True
             self.viewer_settings['traces_rauc']['reason'] = 'Cannot enable because there are no RAUC signals'
-        if not self.blk.segments[0].spiketrains:
+        if not self.blk.segments[0].spiketrains and not (self.lazy and self.metadata.get('amplitude_discriminators', None)):
+            # with lazy loading, spike trains may be detected after launch
             self.viewer_settings['spike_trains']['show'] = False
             self.viewer_settings['spike_trains']['disabled'] = True
             self.viewer_settings['spike_trains']['reason'] = 'Cannot enable because there are no spike trains'
@@ -120,6 +140,10 @@ class EphyviewerConfigurator():
             self.viewer_settings['traces_rates']['show'] = False
             self.viewer_settings['traces_rates']['disabled'] = True
             self.viewer_settings['traces_rates']['reason'] = 'Cannot enable because there are no firing rate signals'
+        if not [ep for ep in self.blk.segments[0].epochs if ep.size > _event_density_threshold and '(from epoch encoder file)' not in ep.labels]:
+            self.viewer_settings['event_density']['show'] = False
+            self.viewer_settings['event_density']['disabled'] = True
+            self.viewer_settings['event_density']['reason'] = 'Cannot enable because there are no epochs or events with more than {} entries in one channel'.format(_event_density_threshold)
         if not [ep for ep in self.blk.segments[0].epochs if ep.size > 0 and '(from epoch encoder file)' not in ep.labels]:
             self.viewer_settings['epochs']['show'] = False
             self.viewer_settings['epochs']['disabled'] = True
@@ -259,13 +283,38 @@ class EphyviewerConfigurator():
         sigs = seg.analogsignals
 
         sources = {'signal': [], 'epoch': [], 'event': [], 'spike': []}
-        sources['epoch'].append(ephyviewer.NeoEpochSource(seg.epochs))
         sources['event'].append(ephyviewer.NeoEventSource(seg.events))
         sources['spike'].append(ephyviewer.NeoSpikeTrainSource(seg.spiketrains))
 
+        lazy_load_signals = False
+        if self.lazy:
+            # check whether blk contains a rawio, which would have been put
+            # there by _read_data_file if lazy=True and if Neo has a RawIO
+            # that supports the file format
+            if hasattr(self.blk, 'rawio') and isinstance(self.blk.rawio, neo.rawio.baserawio.BaseRawIO):
+                io = self.blk.rawio
+                if io.support_lazy:
+                    lazy_load_signals = True
+
+        # with lazy loading, load_dataset could not run amplitude
+        # discriminators, so prepare to run them in the background and add
+        # empty spike trains that will be filled in as spikes are found
+        spike_detector = None
+        rauc_calculator = None
+        if lazy_load_signals and self.metadata.get('amplitude_discriminators', None) is not None:
+            spike_detector = _LazySpikeDetector(self.metadata, self.blk)
+            for discriminator in spike_detector.discriminators:
+                sources['spike'][0].all.append({'time': np.array([]), 'name': discriminator['name']})
+
         # filter epoch encoder data out of read-only epoch and event lists
-        # so they are not presented multiple times, and remove empty channels
-        sources['epoch'][0].all = [ep for ep in sources['epoch'][0].all if len(ep['time']) > 0 and '(from epoch encoder file)' not in ep['label']]
+        # so they are not presented multiple times, and remove empty channels;
+        # if the event density viewer is shown, channels with many epochs are
+        # drawn individually only when zoomed in
+        sources['epoch'].append(NeoEpochSourceWithDensity(
+            neo_epochs = [ep for ep in seg.epochs if len(ep) > 0 and '(from epoch encoder file)' not in ep.labels],
+            density_threshold = _event_density_threshold if self.is_shown('event_density') else np.inf,
+            density_span = _event_density_span,
+        ))
         sources['event'][0].all = [ev for ev in sources['event'][0].all if len(ev['time']) > 0 and '(from epoch encoder file)' not in ev['label']]
 
         ########################################################################
@@ -332,16 +381,6 @@ class EphyviewerConfigurator():
 
         if self.is_shown('traces') and self.metadata['plots']:
 
-            lazy_load_signals = False
-            if self.lazy:
-                # check whether blk contains a rawio, which would have been put
-                # there by _read_data_file if lazy=True and if Neo has a RawIO
-                # that supports the file format
-                if hasattr(self.blk, 'rawio') and isinstance(self.blk.rawio, neo.rawio.baserawio.BaseRawIO):
-                    io = self.blk.rawio
-                    if io.support_lazy:
-                        lazy_load_signals = True
-
             if lazy_load_signals:
 
                 # Intan-specific tricks
@@ -352,8 +391,26 @@ class EphyviewerConfigurator():
                     # prepare to append custom channel names stored in data file to ylabels
                     custom_channel_names = {c['native_channel_name']: c['custom_channel_name'] for c in io._ordered_channels}
 
+                # filter signals as they are read, since load_dataset could not
+                # filter them in advance
                 channel_indexes = [p['index'] for p in self.metadata['plots']]
-                sources['signal'].append(ephyviewer.AnalogSignalFromNeoRawIOSource(io, channel_indexes))
+                filters = {}
+                if self.metadata.get('filters', None) is not None:
+                    for i, p in enumerate(self.metadata['plots']):
+                        filters[i] = [f for f in self.metadata['filters'] if f['channel'] == p['channel']]
+
+                # mark spikes found in the background with scatter markers
+                scatter_channels = {}
+                if spike_detector is not None:
+                    plotNameToIndex = {p['channel']:i for i, p in enumerate(self.metadata['plots'])}
+                    for discriminator in spike_detector.discriminators:
+                        index = plotNameToIndex.get(discriminator['channel'], None)
+                        if index is None:
+                            logger.warning('Spike train {} will not be plotted on channel {} because that channel isn\'t being plotted'.format(discriminator['name'], discriminator['channel']))
+                        else:
+                            scatter_channels[discriminator['name']] = [index]
+
+                sources['signal'].append(FilteredAnalogSignalFromNeoRawIOSource(io, channel_indexes, filters, scatter_channels=scatter_channels, scatter_colors=unit_colors))
 
                 # modify loaded channel names to use ylabels
                 for i, p in enumerate(self.metadata['plots']):
@@ -379,7 +436,6 @@ class EphyviewerConfigurator():
 
                 # prepare scatter plot parameters
                 plotNameToIndex = {p['channel']:i for i, p in enumerate(self.metadata['plots'])}
-                all_times = sigs[0].times.rescale('s').magnitude # assuming all AnalogSignals have the same sampling rate and start time
                 spike_indices = {}
                 spike_channels = {}
                 for st in seg.spiketrains:
@@ -393,15 +449,34 @@ class EphyviewerConfigurator():
                                 c.append(index)
                         if c:
                             spike_channels[st.name] = c
-                            spike_indices[st.name] = np.where(np.isin(all_times, st.times.magnitude))[0]
-
-                sources['signal'].append(ephyviewer.AnalogSignalSourceWithScatter(
-                    signals = np.concatenate([sigs[p['index']].magnitude for p in self.metadata['plots']], axis = 1),
+                            spike_indices[st.name] = _spike_sample_indexes(st, sigs[0]) # assuming all AnalogSignals have the same sampling rate and start time
+
+                # summarize the plotted signals with min/max pyramids so that
+                # zoomed out views need not read every sample, reusing cached
+                # pyramids if load_dataset used the cache
+                plot_indexes = list(dict.fromkeys(p['index'] for p in self.metadata['plots']))
+                plot_sigs = [sigs[i] for i in plot_indexes]
+                use_cache = any('cache_key' in sig.annotations for sig in plot_sigs)
+                pyramids = dict(zip(plot_indexes, _compute_minmax_pyramids(plot_sigs, _get_default_cache() if use_cache else None)))
+                plot_pyramids = [pyramids[p['index']] for p in self.metadata['plots']]
+                pyramid = None
+                if plot_pyramids:
+                    pyramid = {
+                        'factors': plot_pyramids[0]['factors'], # assuming all AnalogSignals have the same length
+                        'mins': [list(mins) for mins in zip(*[pyr['mins'] for pyr in plot_pyramids])],
+                        'maxs': [list(maxs) for maxs in zip(*[pyr['maxs'] for pyr in plot_pyramids])],
+                    }
+
+                # signals are read directly from the AnalogSignals rather than
+                # copied into one array
+                sources['signal'].append(MinMaxPyramidSourceWithScatter(
+                    signals = [sigs[p['index']].magnitude for p in self.metadata['plots']],
                     sample_rate = sigs[0].sampling_rate.rescale('Hz'), # assuming all AnalogSignals have the same sampling rate
                     t_start = sigs[0].t_start.rescale('s'),            # assuming all AnalogSignals start at the same time
                     channel_names = [p['ylabel'] for p in self.metadata['plots']],
                     scatter_indexes = spike_indices,
                     scatter_channels = spike_channels,
+                    pyramid = pyramid,
                 ))
 
                 # instead of passing colors into AnalogSignalSourceWithScatter
@@ -421,7 +496,10 @@ class EphyviewerConfigurator():
                 useOpenGL = None
                 line_width = 1.0
 
-            trace_view = ephyviewer.TraceViewer(source = sources['signal'][0], name = 'Signals', useOpenGL = useOpenGL)
+            if isinstance(sources['signal'][0], MinMaxPyramidSourceWithScatter):
+                trace_view = MinMaxPyramidTraceViewer(source = sources['signal'][0], name = 'Signals', useOpenGL = useOpenGL)
+            else:
+                trace_view = ephyviewer.TraceViewer(source = sources['signal'][0], name = 'Signals', useOpenGL = useOpenGL)
 
             win.add_view(trace_view)
 
@@ -470,7 +548,21 @@ class EphyviewerConfigurator():
 
             rauc_sigs = [sig.annotations['rauc_sig'] for sig in sigs if 'rauc_sig' in sig.annotations]
 
-            if rauc_sigs:
+            # with lazy loading, load_dataset could not calculate RAUC, so
+            # prepare to calculate it in the background and display bins as
+            # they are filled in
+            if not rauc_sigs and lazy_load_signals and self.metadata.get('rauc_bin_duration', None) is not None and self.metadata['plots']:
+                rauc_calculator = _LazyRaucCalculator(self.metadata, self.blk)
+
+                sig_rauc_source = ephyviewer.InMemoryAnalogSignalSource(
+                    signals = rauc_calculator.rauc,
+                    sample_rate = rauc_calculator.sample_rate,
+                    t_start = rauc_calculator.t_start,
+                    channel_names = [p['ylabel'] + ' RAUC' for p in self.metadata['plots']],
+                )
+                sources['signal_rauc'] = [sig_rauc_source]
+
+            elif rauc_sigs:
 
                 sig_rauc_source = ephyviewer.InMemoryAnalogSignalSource(
                     signals = np.concatenate([rauc_sigs[p['index']].as_array() for p in self.metadata['plots']], axis = 1),
@@ -480,6 +572,8 @@ class EphyviewerConfigurator():
                 )
                 sources['signal_rauc'] = [sig_rauc_source]
 
+            if 'signal_rauc' in sources:
+
                 trace_rauc_view = ephyviewer.TraceViewer(source = sources['signal_rauc'][0], name = 'Integrated signals (RAUC)')
 
                 if 'Signals' in win.viewers:
@@ -515,11 +609,17 @@ class EphyviewerConfigurator():
                 trace_rauc_view.params['ylim_max'] = 0.5
                 trace_rauc_view.params['ylim_min'] = -trace_rauc_view.source.nb_channel + 0.5
                 trace_rauc_view.params['scale_mode'] = 'by_channel'
-                for i, p in enumerate(self.metadata['plots']):
-                    ylim_span = np.median(rauc_sigs[p['index']].magnitude) * 10
+                def set_rauc_ylim(i, rauc):
+                    ylim_span = np.nanmedian(rauc) * 10
                     ylim_center = ylim_span / 2
                     trace_rauc_view.by_channel_params['ch{}'.format(i), 'gain'] = 1/ylim_span # rescale [ymin,ymax] across a unit
                     trace_rauc_view.by_channel_params['ch{}'.format(i), 'offset'] = -i - ylim_center/ylim_span # center [ymin,ymax] within the unit
+                for i, p in enumerate(self.metadata['plots']):
+                    if rauc_sigs:
+                        set_rauc_ylim(i, rauc_sigs[p['index']].magnitude)
+                    else:
+                        # the plot range is set once the RAUC is calculated
+                        trace_rauc_view.by_channel_params['ch{}'.format(i), 'offset'] = -i - 0.5
 
         ########################################################################
         # FREQUENCY (EXPERIMENTAL AND COMPUTATIONALLY EXPENSIVE!)
@@ -573,7 +673,7 @@ class EphyviewerConfigurator():
             # set explicitly assigned unit colors
             for name, color in unit_colors.items():
                 try:
-                    index = [st.name for st in seg.spiketrains].index(name)
+                    index = [st['name'] for st in sources['spike'][0].all].index(name)
                     spike_train_view.by_channel_params['ch{}'.format(index), 'color'] = color
                 except ValueError:
                     # unit name may not have been found in the spike train list
@@ -591,54 +691,77 @@ class EphyviewerConfigurator():
 
             if firing_rate_sigs:
 
-                sig_rates_source = ephyviewer.InMemoryAnalogSignalSource(
-                    signals = np.concatenate([sig.as_array() for sig in firing_rate_sigs], axis = 1),
-                    sample_rate = firing_rate_sigs[0].sampling_rate.rescale('Hz'), # assuming all AnalogSignals have the same sampling rate
-                    t_start = firing_rate_sigs[0].t_start.rescale('s'),            # assuming all AnalogSignals start at the same time
-                    channel_names = [sig.name for sig in firing_rate_sigs],
-                )
-                sources['signal_rates'] = [sig_rates_source]
-
-                trace_rates_view = ephyviewer.TraceViewer(source = sources['signal_rates'][0], name = 'Firing rates')
-
-                if 'Spike trains' in win.viewers:
-                    win.add_view(trace_rates_view, tabify_with = 'Spike trains')
+                # firing rates with different sampling rates need separate
+                # viewers
+                firing_rates_sigs = seg.annotations.get('firing_rates_sigs', [])
+                if sum(sig.shape[1] for sig in firing_rates_sigs) == len(firing_rate_sigs):
+                    # use the multi-channel signals from which the firing rate
+                    # sigs are taken, avoiding copies
+                    rate_groups = [(sig.magnitude, sig.sampling_rate, sig.t_start, list(sig.array_annotations['channel_names'])) for sig in firing_rates_sigs]
                 else:
-                    win.add_view(trace_rates_view)
-
-                trace_rates_view.params['xratio'] = self.metadata.get('past_fraction', 0.3)
-                trace_rates_view.params['line_width'] = line_width
-                trace_rates_view.params['label_size'] = ui_scales[ui_scale]['channel_label_size']
-                trace_rates_view.params['display_labels'] = True
-                trace_rates_view.params['display_offset'] = True
-                trace_rates_view.params['antialias'] = True
-
-                # set the theme
-                if theme != 'original':
-                    trace_rates_view.params['background_color'] = self.themes[theme]['background_color']
-                    trace_rates_view.params['vline_color'] = self.themes[theme]['vline_color']
-                    trace_rates_view.params['label_fill_color'] = self.themes[theme]['label_fill_color']
-                    trace_rates_view.params_controller.combo_cmap.setCurrentText(self.themes[theme]['cmap'])
-                    trace_rates_view.params_controller.on_automatic_color()
-
-                # set explicitly assigned firing rate sig colors
-                for name, color in unit_colors.items():
-                    try:
-                        index = [sig.name for sig in firing_rate_sigs].index(name)
-                        trace_rates_view.by_channel_params['ch{}'.format(index), 'color'] = color
-                    except ValueError:
-                        # unit name may not have been found in the firing rate sig list
-                        pass
-
-                # adjust plot range
-                trace_rates_view.params['ylim_max'] = 0.5
-                trace_rates_view.params['ylim_min'] = -trace_rates_view.source.nb_channel + 0.5
-                trace_rates_view.params['scale_mode'] = 'by_channel'
-                for i, sig in enumerate(firing_rate_sigs):
-                    ylim_span = 10
-                    ylim_center = ylim_span / 2
-                    trace_rates_view.by_channel_params['ch{}'.format(i), 'gain'] = 1/ylim_span # rescale [ymin,ymax] across a unit
-                    trace_rates_view.by_channel_params['ch{}'.format(i), 'offset'] = -i - ylim_center/ylim_span # center [ymin,ymax] within the unit
+                    sigs_by_rate = {}
+                    for sig in firing_rate_sigs:
+                        sigs_by_rate.setdefault(float(sig.sampling_rate.rescale('Hz')), []).append(sig)
+                    rate_groups = [(np.concatenate([sig.as_array() for sig in sigs], axis = 1), sigs[0].sampling_rate, sigs[0].t_start, [sig.name for sig in sigs]) for sigs in sigs_by_rate.values()]
+
+                sources['signal_rates'] = []
+                tabify_with = 'Spike trains' if 'Spike trains' in win.viewers else None
+
+                for signals, sampling_rate, t_start, channel_names in rate_groups:
+
+                    sig_rates_source = ephyviewer.InMemoryAnalogSignalSource(
+                        signals = signals,
+                        sample_rate = sampling_rate.rescale('Hz'),
+                        t_start = t_start.rescale('s'), # assuming all AnalogSignals start at the same time
+                        channel_names = channel_names,
+                    )
+                    sources['signal_rates'].append(sig_rates_source)
+
+                    if len(rate_groups) == 1:
+                        view_name = 'Firing rates'
+                    else:
+                        view_name = 'Firing rates ({:g} Hz)'.format(float(sampling_rate.rescale('Hz')))
+                    trace_rates_view = ephyviewer.TraceViewer(source = sig_rates_source, name = view_name)
+
+                    if tabify_with is not None:
+                        win.add_view(trace_rates_view, tabify_with = tabify_with)
+                    else:
+                        win.add_view(trace_rates_view)
+                    tabify_with = view_name
+
+                    trace_rates_view.params['xratio'] = self.metadata.get('past_fraction', 0.3)
+                    trace_rates_view.params['line_width'] = line_width
+                    trace_rates_view.params['label_size'] = ui_scales[ui_scale]['channel_label_size']
+                    trace_rates_view.params['display_labels'] = True
+                    trace_rates_view.params['display_offset'] = True
+                    trace_rates_view.params['antialias'] = True
+
+                    # set the theme
+                    if theme != 'original':
+                        trace_rates_view.params['background_color'] = self.themes[theme]['background_color']
+                        trace_rates_view.params['vline_color'] = self.themes[theme]['vline_color']
+                        trace_rates_view.params['label_fill_color'] = self.themes[theme]['label_fill_color']
+                        trace_rates_view.params_controller.combo_cmap.setCurrentText(self.themes[theme]['cmap'])
+                        trace_rates_view.params_controller.on_automatic_color()
+
+                    # set explicitly assigned firing rate sig colors
+                    for name, color in unit_colors.items():
+                        try:
+                            index = channel_names.index(name)
+                            trace_rates_view.by_channel_params['ch{}'.format(index), 'color'] = color
+                        except ValueError:
+                            # unit name may not have been found in the firing rate sig list
+                            pass
+
+                    # adjust plot range
+                    trace_rates_view.params['ylim_max'] = 0.5
+                    trace_rates_view.params['ylim_min'] = -trace_rates_view.source.nb_channel + 0.5
+                    trace_rates_view.params['scale_mode'] = 'by_channel'
+                    for i in range(len(channel_names)):
+                        ylim_span = 10
+                        ylim_center = ylim_span / 2
+                        trace_rates_view.by_channel_params['ch{}'.format(i), 'gain'] = 1/ylim_span # rescale [ymin,ymax] across a unit
+                        trace_rates_view.by_channel_params['ch{}'.format(i), 'offset'] = -i - ylim_center/ylim_span # center [ymin,ymax] within the unit
 
         ########################################################################
         # EPOCHS
@@ -668,6 +791,49 @@ class EphyviewerConfigurator():
             epoch_view.params['xratio'] = self.metadata.get('past_fraction', 0.3)
             epoch_view.params['label_size'] = ui_scales[ui_scale]['channel_label_size']
 
+        ########################################################################
+        # EVENT DENSITY
+
+        dense_channels = sources['epoch'][0].dense_channels()
+        if self.is_shown('event_density') and dense_channels:
+
+            # epoch and event channels with too many entries to draw each of
+            # them at once are summarized by their density in bins
+            sources['event_density'] = [ephyviewer.InMemoryAnalogSignalSource(
+                signals = sources['epoch'][0].get_density(_event_density_bin_duration),
+                sample_rate = 1/_event_density_bin_duration,
+                t_start = sources['epoch'][0].t_start,
+                channel_names = [sources['epoch'][0].get_channel_name(chan) for chan in dense_channels],
+            )]
+
+            event_density_view = ephyviewer.TraceViewer(source = sources['event_density'][0], name = 'Event density')
+            win.add_view(event_density_view)
+
+            event_density_view.params['xratio'] = self.metadata.get('past_fraction', 0.3)
+            event_density_view.params['label_size'] = ui_scales[ui_scale]['channel_label_size']
+            event_density_view.params['display_labels'] = True
+            event_density_view.params['display_offset'] = True
+            event_density_view.params['antialias'] = True
+
+            # set the theme
+            if theme != 'original':
+                event_density_view.params['background_color'] = self.themes[theme]['background_color']
+                event_density_view.params['vline_color'] = self.themes[theme]['vline_color']
+                event_density_view.params['label_fill_color'] = self.themes[theme]['label_fill_color']
+                event_density_view.params_controller.combo_cmap.setCurrentText(self.themes[theme]['cmap'])
+                event_density_view.params_controller.on_automatic_color()
+
+            # adjust plot range so that each channel spans from zero to its
+            # maximum density
+            event_density_view.params['ylim_max'] = 0.5
+            event_density_view.params['ylim_min'] = -event_density_view.source.nb_channel + 0.5
+            event_density_view.params['scale_mode'] = 'by_channel'
+            for i, ylim_span in enumerate(event_density_view.source.get_chunk().max(axis=0)):
+                ylim_span = ylim_span or 1
+                ylim_center = ylim_span / 2
+                event_density_view.by_channel_params['ch{}'.format(i), 'gain'] = 1/ylim_span # rescale [ymin,ymax] across a unit
+                event_density_view.by_channel_params['ch{}'.format(i), 'offset'] = -i - ylim_center/ylim_span # center [ymin,ymax] within the unit
+
         ########################################################################
         # EPOCH ENCODER
 
@@ -764,7 +930,7 @@ class EphyviewerConfigurator():
 
         if self.is_shown('event_list') and sources['event'][0].nb_channel > 0:
 
-            event_list = ephyviewer.EventList(source = sources['event'][0], name = 'Events')
+            event_list = _LazyEventList(source = sources['event'][0], name = 'Events')
             if 'Video' in win.viewers:
                 win.add_view(event_list, split_with = 'Video')
             else:
@@ -773,10 +939,13 @@ class EphyviewerConfigurator():
         ########################################################################
         # DATAFRAME
 
-        annotations_dataframe = _neo_epoch_to_dataframe(seg.epochs, exclude_epoch_encoder_epochs=True)
-        if self.is_shown('data_frame') and len(annotations_dataframe) > 0:
+        if self.is_shown('data_frame'):
 
-            data_frame_view = ephyviewer.DataFrameView(source = annotations_dataframe, name = 'Table')
+            # the table is filled only once it is first shown
+            data_frame_view = _LazyDataFrameView(
+                make_dataframe = lambda: _neo_epoch_to_dataframe(seg.epochs, exclude_epoch_encoder_epochs=True),
+                name = 'Table',
+            )
             if 'Events' in win.viewers:
                 win.add_view(data_frame_view, tabify_with = 'Events')
             elif 'Video' in win.viewers:
@@ -795,8 +964,359 @@ class EphyviewerConfigurator():
         # set amount of time shown initially
         win.set_xsize(self.metadata.get('t_width', 40)) # seconds
 
+        if spike_detector is not None:
+
+            # periodically add spikes found in the background to the spike
+            # trains and scatter markers
+            first_spike_index = len(sources['spike'][0].all) - len(spike_detector.discriminators)
+            def add_detected_spikes():
+                spikes = spike_detector.collect()
+                for i, times in spikes.items():
+                    spike_source = sources['spike'][0]
+                    spike_source.all[first_spike_index + i]['time'] = np.concatenate([spike_source.all[first_spike_index + i]['time'], times])
+                    name = spike_detector.discriminators[i]['name']
+                    for signal_source in sources['signal']:
+                        if name in getattr(signal_source, 'scatter_indexes', {}):
+                            indexes = np.round((times - signal_source.t_start) * signal_source.sample_rate).astype('int64')
+                            signal_source.add_scatter(name, indexes)
+                if spikes:
+                    for name in ('Signals', 'Spike trains'):
+                        if name in win.viewers:
+                            win.viewers[name]['widget'].refresh()
+                if not spike_detector.is_alive() and not spikes:
+                    spike_detection_timer.stop()
+
+            spike_detection_timer = ephyviewer.QT.QTimer(win)
+            spike_detection_timer.timeout.connect(add_detected_spikes)
+            spike_detection_timer.start(500) # milliseconds
+
+            # stop detecting spikes when the window is closed
+            win.destroyed.connect(spike_detector.stopped.set)
+            spike_detector.start()
+
+        if rauc_calculator is not None:
+
+            # periodically redraw RAUC bins calculated in the background, and
+            # set the plot range of each channel once its RAUC is complete
+            def add_calculated_rauc():
+                finished = rauc_calculator.collect()
+                for i in finished:
+                    set_rauc_ylim(i, rauc_calculator.rauc[:, i])
+                win.viewers['Integrated signals (RAUC)']['widget'].refresh()
+                if not rauc_calculator.is_alive() and not finished:
+                    rauc_calculation_timer.stop()
+
+            rauc_calculation_timer = ephyviewer.QT.QTimer(win)
+            rauc_calculation_timer.timeout.connect(add_calculated_rauc)
+            rauc_calculation_timer.start(500) # milliseconds
+
+            # stop calculating RAUC when the window is closed
+            win.destroyed.connect(rauc_calculator.stopped.set)
+            rauc_calculator.start()
+
         return win
 
+class _LazySpikeDetector(threading.Thread):
+    """
+    A background thread that runs the amplitude discriminators given in
+    ``metadata`` on lazily loaded signals, reading them from the RawIO of
+    ``blk`` one chunk at a time.
+    """
+
+    def __init__(self, metadata, blk):
+        """
+        Initialize a new _LazySpikeDetector.
+        """
+
+        threading.Thread.__init__(self, daemon=True)
+
+        self.stopped = threading.Event()
+        self._spikes = queue.Queue()
+        self._epochs = blk.segments[0].epochs
+
+        sigs = blk.segments[0].analogsignals
+        signalNameToIndex = {sig.name:i for i, sig in enumerate(sigs)}
+
+        # group discriminators by channel so that each channel is read only
+        # once
+        self.discriminators = []
+        discriminators_by_index = {}
+        for discriminator in metadata['amplitude_discriminators']:
+            index = signalNameToIndex.get(discriminator['channel'], None)
+            if index is None:
+                logger.warning('Skipping amplitude discriminator with channel name {} because channel was not found!'.format(discriminator['channel']))
+            else:
+                discriminators_by_index.setdefault(index, []).append((len(self.discriminators), discriminator))
+                self.discriminators.append(discriminator)
+
+        # read signals with the same filters used when not lazy loading
+        self._jobs = []
+        for index, discriminators in discriminators_by_index.items():
+            filters = [f for f in metadata.get('filters', None) or [] if f['channel'] == sigs[index].name]
+            source = FilteredAnalogSignalFromNeoRawIOSource(blk.rawio, [index], {0: filters}, max_blocks=1)
+            self._jobs.append((sigs[index], source, discriminators))
+
+    def run(self):
+        """
+        Detect spikes, stopping early if :attr:`stopped` is set.
+        """
+
+        try:
+            for sig, source, discriminators in self._jobs:
+                gain, offset = source.get_gains()[0], source.get_offsets()[0]
+                def read_chunk(i_start, i_stop):
+                    return pq.Quantity(source.get_chunk(i_start, i_stop)[:, 0] * gain + offset, sig.units)
+
+                for _, spiketrains in _detect_spikes_in_chunks(
+                        read_chunk, source.get_length(), sig.t_start, sig.sampling_rate,
+                        sig.name, [d for _, d in discriminators], self._epochs):
+                    if self.stopped.is_set():
+                        return
+                    for (i, _), st in zip(discriminators, spiketrains):
+                        if len(st) > 0:
+                            self._spikes.put((i, st.times.rescale('s').magnitude))
+
+        except Exception:
+            logger.exception('Encountered an error while detecting spikes')
+
+    def collect(self):
+        """
+        Return a dictionary mapping discriminator indexes to arrays of spike
+        times found since the last call.
+        """
+
+        spikes = {}
+        while True:
+            try:
+                i, times = self._spikes.get_nowait()
+            except queue.Empty:
+                break
+            spikes.setdefault(i, []).append(times)
+        return {i: np.concatenate(times) for i, times in spikes.items()}
+
+class _LazyRaucCalculator(threading.Thread):
+    """
+    A background thread that calculates the rectified area under the curve
+    (RAUC) of the signals given in the ``plots`` of ``metadata`` from lazily
+    loaded signals, reading them from the RawIO of ``blk`` one chunk at a time.
+
+    The RAUC of each plot is written into a column of :attr:`rauc`, which is
+    filled with NaN until it is calculated.
+    """
+
+    def __init__(self, metadata, blk):
+        """
+        Initialize a new _LazyRaucCalculator.
+        """
+
+        threading.Thread.__init__(self, daemon=True)
+
+        self.stopped = threading.Event()
+        self._finished = queue.Queue()
+        self._baseline = metadata.get('rauc_baseline', None)
+        self._bin_duration = metadata['rauc_bin_duration']*pq.s
+
+        # read signals with the same filters used when not lazy loading
+        sigs = blk.segments[0].analogsignals
+        self._jobs = []
+        for p in metadata['plots']:
+            sig = sigs[p['index']]
+            filters = [f for f in metadata.get('filters', None) or [] if f['channel'] == sig.name]
+            source = FilteredAnalogSignalFromNeoRawIOSource(blk.rawio, [p['index']], {0: filters}, max_blocks=1)
+            self._jobs.append((sig, source))
+
+        # assuming all signals have the same length, sampling rate, and start
+        # time
+        sig, source = self._jobs[0]
+        samples_per_bin = int(np.round((self._bin_duration / sig.sampling_period).simplified.magnitude.item()))
+        n_bins = int(np.ceil(source.get_length() / samples_per_bin))
+        bin_duration = (samples_per_bin * sig.sampling_period).rescale('s')
+        self.rauc = np.full((n_bins, len(self._jobs)), np.nan)
+        self.sample_rate = 1 / bin_duration.magnitude.item()
+        self.t_start = (sig.t_start + bin_duration/2).rescale('s').magnitude.item()
+
+    def run(self):
+        """
+        Calculate RAUC, stopping early if :attr:`stopped` is set.
+        """
+
+        try:
+            for i, (sig, source) in enumerate(self._jobs):
+                gain, offset = source.get_gains()[0], source.get_offsets()[0]
+                def read_chunk(i_start, i_stop):
+                    return source.get_chunk(i_start, i_stop)[:, 0] * gain + offset
+
+                for first_bin, rauc in _rauc_in_chunks(
+                        read_chunk, source.get_length(), sig.sampling_period,
+                        self._baseline, self._bin_duration):
+                    if self.stopped.is_set():
+                        return
+                    self.rauc[first_bin:first_bin + len(rauc), i] = rauc[:len(self.rauc) - first_bin]
+                self._finished.put(i)
+
+        except Exception:
+            logger.exception('Encountered an error while calculating RAUC')
+
+    def collect(self):
+        """
+        Return the indexes of columns of :attr:`rauc` completed since the last
+        call.
+        """
+
+        finished = []
+        while True:
+            try:
+                finished.append(self._finished.get_nowait())
+            except queue.Empty:
+                break
+        return finished
+
+def _spike_sample_indexes(st, sig):
+    """
+    Return the indexes of the samples of ``sig`` at the times of the spikes in
+    ``st``. Spikes that do not fall on a sample, within a tolerance of
+    ``_spike_time_tolerance`` sampling periods, are omitted.
+    """
+
+    samples = ((st.times - sig.t_start) * sig.sampling_rate).simplified.magnitude
+    indexes = np.round(samples).astype('int64')
+    on_sample = (np.abs(samples - indexes) <= _spike_time_tolerance) & (indexes >= 0) & (indexes < len(sig))
+    return np.unique(indexes[on_sample])
+
+class _LazyDataFrameView(ephyviewer.DataFrameView):
+    """
+    A :class:`ephyviewer.dataframeview.DataFrameView` whose dataframe is made
+    by calling ``make_dataframe`` only when the view is first shown, so that
+    creating a window does not take longer for larger tables that are never
+    viewed.
+    """
+
+    def __init__(self, make_dataframe, **kargs):
+        """
+        Initialize a new _LazyDataFrameView.
+        """
+
+        self._make_dataframe = make_dataframe
+        ephyviewer.DataFrameView.__init__(self, source=pd.DataFrame(), **kargs)
+
+    def showEvent(self, event):
+        """
+        Make the dataframe and fill the table the first time the view is
+        shown.
+        """
+
+        if self._make_dataframe is not None:
+            self.source = self._make_dataframe()
+            self._make_dataframe = None
+
+            # format whole columns at once rather than looking up each cell
+            self.qtable.setColumnCount(len(self.source.columns))
+            self.qtable.setRowCount(len(self.source.index))
+            self.qtable.setHorizontalHeaderLabels(['{}'.format(c) for c in self.source.columns])
+            self.qtable.setVerticalHeaderLabels(['{}'.format(r) for r in self.source.index])
+            for c, col in enumerate(self.source.columns):
+                for r, value in enumerate(self.source[col].tolist()):
+                    self.qtable.setItem(r, c, ephyviewer.QT.QTableWidgetItem('{}'.format(value)))
+
+        ephyviewer.DataFrameView.showEvent(self, event)
+
+class _LazyEventList(ephyviewer.EventList):
+    """
+    A :class:`ephyviewer.eventlist.EventList` that formats the entries of
+    the list only when they are displayed, so that showing a channel with
+    many events does not require creating an item for each of them.
+    """
+
+    def __init__(self, **kargs):
+        """
+        Initialize a new _LazyEventList.
+        """
+
+        self._model = None
+        ephyviewer.EventList.__init__(self, **kargs)
+
+        # replace the list widget created by the superclass with a view of a
+        # single model whose contents are replaced for each channel
+        list_view = ephyviewer.QT.QListView()
+        list_view.setUniformItemSizes(True)
+        list_view.setLayoutMode(ephyviewer.QT.QListView.Batched)
+        self.mainlayout.replaceWidget(self.list_widget, list_view)
+        self.list_widget.deleteLater()
+        self.list_widget = list_view
+
+        self._model = _EventListModel(parent=self)
+        self.list_widget.setModel(self._model)
+        self.list_widget.clicked.connect(self.select_event)
+        self.refresh_list(self.combo.currentIndex())
+
+    def refresh_list(self, ind):
+        """
+        Display the events of channel ``ind``.
+        """
+
+        self.ind = ind
+        if self._model is None:
+            # called by the superclass before the model exists
+            return
+        self._model.set_events(*self._times_and_labels(ind))
+
+    def select_event(self, index=None):
+        """
+        Jump to the time of the selected event.
+        """
+
+        i = self.list_widget.currentIndex().row()
+        if 0 <= i < len(self._model.times):
+            self.time_changed.emit(float(self._model.times[i]))
+
+    def _times_and_labels(self, ind):
+        if ind < 0:
+            # no channel is selected
+            return np.array([]), None
+        data = self.source.get_chunk(chan=ind, i_start=None, i_stop=None)
+        if len(data) == 2:
+            return data
+        else:
+            # epoch sources also return durations and possibly ids
+            return data[0], data[2]
+
+class _EventListModel(ephyviewer.QT.QAbstractListModel):
+    """
+    A list model that formats the time and label of each event when it is
+    displayed, like the entries of :class:`ephyviewer.eventlist.EventList`.
+    """
+
+    def __init__(self, parent=None):
+        """
+        Initialize a new _EventListModel.
+        """
+
+        ephyviewer.QT.QAbstractListModel.__init__(self, parent)
+        self.times = np.array([])
+        self.labels = None
+
+    def set_events(self, times, labels):
+        """
+        Replace the events in the list.
+        """
+
+        self.beginResetModel()
+        self.times = times
+        self.labels = labels
+        self.endResetModel()
+
+    def rowCount(self, parent=ephyviewer.QT.QModelIndex()):
+        return 0 if parent.isValid() else len(self.times)
+
+    def data(self, index, role=ephyviewer.QT.Qt.DisplayRole):
+        if role != ephyviewer.QT.Qt.DisplayRole or not index.isValid():
+            return None
+        i = index.row()
+        if self.labels is None:
+            return '{} : {:.3f}'.format(i, self.times[i])
+        else:
+            return '{} : {:.3f} {}'.format(i, self.times[i], self.labels[i])
+
 def _set_defaults_for_plots(metadata, blk):
     """
     Set defaults for plot channels, units, ylim, and ylabel if these
@@ -862,20 +1382,25 @@ def _neo_epoch_to_dataframe(neo_epochs, exclude_epoch_encoder_epochs=False):
     Convert a list of Neo Epochs into a dataframe.
     """
 
-    dtypes = {
-        'Start (s)':    float,
-        'End (s)':      float,
-        'Duration (s)': float,
-        'Type':         str,
-        'Label':        str,
-    }
-    columns = list(dtypes.keys())
-    df = pd.DataFrame(columns=columns)
-    for ep in neo_epochs:
-        if len(ep.times) > 0 and (not exclude_epoch_encoder_epochs or '(from epoch encoder file)' not in ep.labels):
-            data = np.array([ep.times, ep.times+ep.durations, ep.durations, [ep.name]*len(ep), ep.labels]).T
-            df = df.append(pd.DataFrame(data, columns=columns), ignore_index=True)
-    return df.astype(dtype=dtypes).sort_values(['Start (s)', 'End (s)', 'Type', 'Label']).reset_index(drop=True)
+    neo_epochs = [ep for ep in neo_epochs if len(ep.times) > 0 and (not exclude_epoch_encoder_epochs or '(from epoch encoder file)' not in ep.labels)]
+
+    # gather each column from all epochs at once, and encode the epoch names
+    # as categories so that they are not repeated for every row
+    starts = np.concatenate([[]] + [ep.times.rescale('s').magnitude for ep in neo_epochs])
+    durations = np.concatenate([[]] + [ep.durations.rescale('s').magnitude for ep in neo_epochs])
+    labels = np.concatenate([np.array([], dtype=str)] + [ep.labels.astype(str) for ep in neo_epochs])
+    names = [str(ep.name) for ep in neo_epochs]
+    categories = sorted(set(names))
+    codes = np.repeat([categories.index(name) for name in names], [len(ep) for ep in neo_epochs]).astype('int64')
+
+    df = pd.DataFrame({
+        'Start (s)':    starts,
+        'End (s)':      starts + durations,
+        'Duration (s)': durations,
+        'Type':         pd.Categorical.from_codes(codes, categories),
+        'Label':        pd.Series(labels, dtype=str),
+    })
+    return df.sort_values(['Start (s)', 'End (s)', 'Type', 'Label']).reset_index(drop=True)
 
 def _estimate_video_jump_times(blk):
     """
@@ -0,0 +1,498 @@
+# -*- coding: utf-8 -*-
+"""
+The :mod:`neurotic.gui.datasources` module implements subclasses of
+ephyviewer's data sources, and a subclass of ephyviewer's trace viewer that
+reads from them efficiently.
+
+.. autoclass:: FilteredAnalogSignalFromNeoRawIOSource
+
+.. autoclass:: MinMaxPyramidSourceWithScatter
+   :members: get_minmax
+
+.. autoclass:: MinMaxPyramidTraceViewer
+
+.. autoclass:: NeoEpochSourceWithDensity
+   :members: dense_channels, get_density
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import matplotlib.cm
+import matplotlib.colors
+import quantities as pq
+from ephyviewer import AnalogSignalFromNeoRawIOSource, AnalogSignalSourceWithScatter, InMemoryEpochSource, TraceViewer
+from ephyviewer.traceviewer import DataGrabber
+
+from .. import _elephant_tools
+
+import logging
+logger = logging.getLogger(__name__)
+
+# fraction of their initial amplitude to which filter transients decay within
+# the padding, small enough for them to become invisible
+_transient_tolerance = 1e-6
+
+# maximum number of samples of padding, so that filters with very low cutoff
+# frequencies do not require reading far more data than is displayed
+_max_pad = 2**19
+
+
+class FilteredAnalogSignalFromNeoRawIOSource(AnalogSignalFromNeoRawIOSource):
+    """
+    A subclass of
+    :class:`ephyviewer.datasource.neosource.AnalogSignalFromNeoRawIOSource`
+    that filters signals as they are read from a Neo RawIO.
+
+    Only the data needed for display are read and filtered. Signals are
+    divided into blocks of ``block_size`` samples, and each block is filtered
+    along with enough data before and after it to allow filter transients to
+    decay, determined from the poles of the filters, but no more than
+    ``_max_pad`` samples. The most recently used ``max_blocks`` filtered blocks are kept in
+    memory, so scrolling back and forth through a recording does not require
+    filtering the same data repeatedly.
+
+    ``filters`` is a dictionary mapping positions in ``channel_indexes`` to
+    lists of filters, given as dictionaries with ``highpass`` and/or
+    ``lowpass`` cutoff frequencies in Hz like those in the ``filters`` metadata
+    parameter. Multiple filters for a channel are applied in order.
+
+    If ``scatter_channels``, a dictionary mapping labels to lists of positions
+    in ``channel_indexes``, is given, markers can be plotted on the signals at
+    sample indexes that are added with :meth:`add_scatter`, such as spikes
+    detected while the signals are displayed.
+    """
+
+    def __init__(self, neorawio, channel_indexes=None, filters=None, block_size=2**16, max_blocks=32, scatter_channels=None, scatter_colors=None, **kwargs):
+        """
+        Initialize a new FilteredAnalogSignalFromNeoRawIOSource.
+        """
+
+        AnalogSignalFromNeoRawIOSource.__init__(self, neorawio, channel_indexes, **kwargs)
+
+        self.scatter_channels = scatter_channels or {}
+        self.scatter_indexes = {k: np.array([], dtype='int64') for k in self.scatter_channels}
+        self.scatter_colors = {}
+        colors = matplotlib.cm.Accent(np.linspace(0, 1, max(len(self.scatter_channels), 1)))
+        for k, color in zip(self.scatter_channels, colors):
+            self.scatter_colors[k] = matplotlib.colors.to_hex(color)
+        self.scatter_colors.update(scatter_colors or {})
+        self.with_scatter = bool(self.scatter_channels)
+
+        self.filters = {i: f for i, f in (filters or {}).items() if f}
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+
+        # pad each block with enough data for the slowest filter to settle
+        decay_lengths = [
+            _elephant_tools.sos_decay_length(_elephant_tools.butter_design(
+                highpass_freq = sig_filter.get('highpass', None),
+                lowpass_freq  = sig_filter.get('lowpass',  None),
+                fs = self.sample_rate,
+            ), _transient_tolerance)
+            for f in self.filters.values() for sig_filter in f]
+        self.pad = min(max(decay_lengths, default=0), _max_pad)
+
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_chunk(self, i_start=None, i_stop=None):
+        """
+        Return filtered signals between samples ``i_start`` and ``i_stop``.
+
+        Like the superclass, values are returned in the raw units of the
+        RawIO, so that the gains and offsets of the channels apply.
+        """
+
+        if not self.filters:
+            return AnalogSignalFromNeoRawIOSource.get_chunk(self, i_start, i_stop)
+
+        length = self.get_length()
+        i_start = 0 if i_start is None else max(0, min(i_start, length))
+        i_stop = length if i_stop is None else max(i_start, min(i_stop, length))
+        if i_start == i_stop:
+            return np.empty((0, self.nb_channel), dtype='float32')
+
+        first_block = i_start // self.block_size
+        last_block = (i_stop - 1) // self.block_size
+
+        with self._lock:
+            blocks = [self._blocks.get(k, None) for k in range(first_block, last_block + 1)]
+            for k, block in zip(range(first_block, last_block + 1), blocks):
+                if block is not None:
+                    self._blocks.move_to_end(k)
+
+        # filter consecutive missing blocks all at once so that padding is
+        # read only once
+        missing = [k for k, block in zip(range(first_block, last_block + 1), blocks) if block is None]
+        if missing:
+            computed = self._filter_blocks(missing[0], missing[-1])
+            for k in missing:
+                blocks[k - first_block] = computed[k]
+            with self._lock:
+                for k in missing:
+                    self._blocks[k] = computed[k]
+                while len(self._blocks) > max(self.max_blocks, len(blocks)):
+                    self._blocks.popitem(last=False)
+
+        offset = first_block * self.block_size
+        return np.concatenate(blocks)[i_start - offset:i_stop - offset]
+
+    def get_scatter_babels(self):
+        """
+        Return the labels of the scatter markers.
+        """
+
+        return list(self.scatter_channels)
+
+    def get_scatter(self, i_start=None, i_stop=None, chan=None, label=None):
+        """
+        Return the sample indexes of scatter markers with ``label`` on channel
+        ``chan`` between samples ``i_start`` and ``i_stop``.
+        """
+
+        if chan not in self.scatter_channels[label]:
+            return None
+
+        inds = self.scatter_indexes[label]
+        i1 = np.searchsorted(inds, i_start, side='left')
+        i2 = np.searchsorted(inds, i_stop, side='left')
+        return inds[i1:i2]
+
+    def add_scatter(self, label, indexes):
+        """
+        Add sample indexes to the scatter markers with ``label``. The indexes
+        must come after all indexes added previously.
+        """
+
+        self.scatter_indexes[label] = np.concatenate([self.scatter_indexes[label], indexes])
+
+    def _filter_blocks(self, first_block, last_block):
+        """
+        Read and filter a range of blocks, returning them in a dictionary.
+        """
+
+        length = self.get_length()
+        start = first_block * self.block_size
+        stop = min((last_block + 1) * self.block_size, length)
+        padded_start = max(0, start - self.pad)
+        padded_stop = min(length, stop + self.pad)
+
+        raw = AnalogSignalFromNeoRawIOSource.get_chunk(self, padded_start, padded_stop)
+        sigs = raw.astype('float32')
+        gains, offsets = self.get_gains(), self.get_offsets()
+        for i, chan_filters in self.filters.items():
+            # filter in physical units and convert back to raw units
+            data = raw[:, i] * gains[i] + offsets[i]
+            for sig_filter in chan_filters:
+                high = sig_filter.get('highpass', None)
+                low  = sig_filter.get('lowpass',  None)
+                data = _elephant_tools.butter(
+                    signal = data,
+                    highpass_freq = high and high*pq.Hz,
+                    lowpass_freq  = low and low*pq.Hz,
+                    filter_function = 'sosfiltfilt',
+                    fs = self.sample_rate,
+                )
+            sigs[:, i] = (data - offsets[i]) / gains[i]
+
+        sigs = sigs[start - padded_start:stop - padded_start]
+        return {k: sigs[(k - first_block) * self.block_size:(k - first_block + 1) * self.block_size]
+                for k in range(first_block, last_block + 1)}
+
+
+class MinMaxPyramidSourceWithScatter(AnalogSignalSourceWithScatter):
+    """
+    A subclass of
+    :class:`ephyviewer.datasource.signals.AnalogSignalSourceWithScatter` that
+    also provides a min/max pyramid of the signals, which summarizes them at
+    progressively coarser resolutions so that long stretches of the signals
+    can be displayed without reading every sample. Use it with a
+    :class:`MinMaxPyramidTraceViewer`.
+
+    ``signals`` may be a single 2D array or a list of 2D arrays with the same
+    number of samples, such as the magnitudes of several AnalogSignals, whose
+    channels are displayed side by side. The arrays in a list are not copied
+    into one array; only the samples that are read are copied.
+
+    ``pyramid`` is a dictionary with the ``factors`` of the levels of the
+    pyramid, which are the numbers of samples in their blocks, and the
+    ``mins`` and ``maxs`` of each level, each given as an array with one row
+    per block and one column per channel, or as a list of arrays like
+    ``signals``.
+    """
+
+    def __init__(self, signals, sample_rate, t_start, scatter_indexes, scatter_channels, scatter_colors=None, channel_names=None, pyramid=None):
+        """
+        Initialize a new MinMaxPyramidSourceWithScatter.
+        """
+
+        if isinstance(signals, list):
+            signals = _ChannelStack(signals)
+
+        AnalogSignalSourceWithScatter.__init__(self, signals, sample_rate, t_start, scatter_indexes, scatter_channels, scatter_colors, channel_names)
+
+        self.pyramid = {'factors': [], 'mins': [], 'maxs': []}
+        if pyramid is not None:
+            self.pyramid['factors'] = pyramid['factors']
+            for k in ('mins', 'maxs'):
+                self.pyramid[k] = [_ChannelStack(level) if isinstance(level, list) else level for level in pyramid[k]]
+
+    def get_minmax(self, i_start, i_stop, ds_ratio):
+        """
+        Return the maxima and minima of the signals in blocks of ``ds_ratio``
+        samples between samples ``i_start`` and ``i_stop``, which must be
+        multiples of ``ds_ratio``.
+
+        The coarsest level of the pyramid whose factor is no greater than
+        ``ds_ratio`` is used, or the signals themselves if there is no such
+        level. If the factor does not divide ``ds_ratio``, each block combines
+        the blocks of the level that start within it, so its boundaries are
+        shifted by less than the factor.
+        """
+
+        level_mins, level_maxs, factor = self.signals, self.signals, 1
+        for f, mins, maxs in zip(self.pyramid['factors'], self.pyramid['mins'], self.pyramid['maxs']):
+            if f <= ds_ratio:
+                level_mins, level_maxs, factor = mins, maxs, f
+
+        n_blocks = (i_stop - i_start) // ds_ratio
+        if n_blocks == 0:
+            empty = np.empty((0, self.nb_channel), dtype=self.signals.dtype)
+            return empty, empty
+
+        # index of the first block of the level starting in each block
+        starts = -(-(i_start + ds_ratio * np.arange(n_blocks)) // factor)
+        level_slice = slice(starts[0], -(-i_stop // factor))
+        maxs = np.maximum.reduceat(level_maxs[level_slice], starts - starts[0], axis=0)
+        mins = np.minimum.reduceat(level_mins[level_slice], starts - starts[0], axis=0)
+        return maxs, mins
+
+
+class _ChannelStack():
+    """
+    A read-only 2D array-like object that places the columns of several 2D
+    arrays with the same number of rows side by side without copying them.
+    Indexing it with rows and columns, like a NumPy array, returns a new array
+    containing only the selected elements.
+    """
+
+    def __init__(self, arrays):
+        """
+        Initialize a new _ChannelStack.
+        """
+
+        self.arrays = arrays
+        self.shape = (len(arrays[0]), sum(a.shape[1] for a in arrays))
+        self.dtype = np.result_type(*arrays)
+        self._columns = [(a, j) for a in arrays for j in range(a.shape[1])]
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        rows, cols = key if isinstance(key, tuple) else (key, slice(None))
+        if isinstance(cols, (int, np.integer)):
+            a, j = self._columns[cols]
+            return a[rows, j]
+        elif isinstance(cols, slice):
+            columns = self._columns[cols]
+        else:
+            columns = [self._columns[c] for c in cols]
+        return np.stack([a[rows, j] for a, j in columns], axis=-1).astype(self.dtype, copy=False)
+
+
+class _MinMaxPyramidDataGrabber(DataGrabber):
+    """
+    A :class:`ephyviewer.traceviewer.DataGrabber` that decimates signals with
+    the min/max pyramid of a :class:`MinMaxPyramidSourceWithScatter`.
+    """
+
+    def get_data(self, t, t_start, t_stop, total_gains, total_offsets, visibles, decimation_method):
+        """
+        Return decimated signals between times ``t_start`` and ``t_stop``,
+        like the superclass.
+
+        With the default ``min_max`` decimation method, if the time range is
+        wide enough for a level of the pyramid to be used, the signals are
+        decimated by the same ratio as the superclass, reading the extrema of
+        each decimated block from the coarsest level of the pyramid that is no
+        coarser than the decimation ratio (see
+        :meth:`MinMaxPyramidSourceWithScatter.get_minmax`). Otherwise, the
+        signals are read and decimated by the superclass.
+        """
+
+        i_start, i_stop = self.source.time_to_index(t_start), self.source.time_to_index(t_stop) + 2
+        ds_ratio = (i_stop - i_start)//self._max_point + 1
+
+        factors = [f for f in self.source.pyramid['factors'] if f <= ds_ratio]
+        if decimation_method != 'min_max' or not factors:
+            return DataGrabber.get_data(self, t, t_start, t_stop, total_gains, total_offsets, visibles, decimation_method)
+
+        # clip and align to the decimation ratio
+        length = self.source.get_length()
+        i_start = max(0, min(i_start, length))
+        i_start -= i_start % ds_ratio
+        i_stop = max(0, min(i_stop, length))
+        i_stop -= i_stop % ds_ratio
+
+        # interleave maxima and minima like the superclass
+        maxs, mins = self.source.get_minmax(i_start, i_stop, ds_ratio)
+        data_curves = np.empty((len(visibles), 2 * len(maxs)), dtype='float32')
+        data_curves[:, ::2] = maxs[:, visibles].T
+        data_curves[:, 1::2] = mins[:, visibles].T
+
+        data_curves *= total_gains[visibles, None]
+        data_curves += total_offsets[visibles, None]
+        dict_curves = {c: data_curves[i, :] for i, c in enumerate(visibles)}
+
+        t_start2 = self.source.index_to_time(i_start)
+        times_curves = np.arange(data_curves.shape[1], dtype='float64')
+        times_curves /= 2 * self.source.sample_rate / ds_ratio
+        times_curves += t_start2
+
+        # a sparse sample of the signals is used for automatic scaling in
+        # place of every sample
+        sigs_chunk = self.source.signals[i_start:i_stop:ds_ratio]
+
+        dict_scatter = None
+        if self.source.with_scatter:
+            dict_scatter = {}
+            for k in self.source.get_scatter_babels():
+                x, y = [[]], [[]]
+                for c in visibles:
+                    scatter_inds = self.source.get_scatter(i_start=i_start, i_stop=i_stop, chan=c, label=k)
+                    if scatter_inds is None: continue
+                    x.append((scatter_inds-i_start)/self.source.sample_rate+t_start2)
+                    y.append(self.source.signals[scatter_inds, c]*total_gains[c]+total_offsets[c])
+
+                dict_scatter[k] = (np.concatenate(x), np.concatenate(y))
+
+        return t, t_start, t_stop, visibles, dict_curves, times_curves, sigs_chunk, dict_scatter
+
+
+class MinMaxPyramidTraceViewer(TraceViewer):
+    """
+    A subclass of :class:`ephyviewer.traceviewer.TraceViewer` that displays
+    signals from a :class:`MinMaxPyramidSourceWithScatter`.
+
+    When a wide time range is displayed, the extrema of the signals are read
+    from the coarsest level of the min/max pyramid of the source that is fine
+    enough for the display, so that the time needed to draw the signals does
+    not grow with the width of the time range.
+    """
+
+    def __init__(self, **kargs):
+        """
+        Initialize a new MinMaxPyramidTraceViewer.
+        """
+
+        TraceViewer.__init__(self, **kargs)
+
+        # replace the data grabber created by the superclass
+        self.request_data.disconnect(self.datagrabber.on_request_data)
+        self.datagrabber.data_ready.disconnect(self.on_data_ready)
+        self.datagrabber.deleteLater()
+        self.datagrabber = _MinMaxPyramidDataGrabber(source=self.source, viewer=self)
+        self.datagrabber.moveToThread(self.thread)
+        self.datagrabber.data_ready.connect(self.on_data_ready)
+        self.request_data.connect(self.datagrabber.on_request_data)
+
+
+class NeoEpochSourceWithDensity(InMemoryEpochSource):
+    """
+    A subclass of :class:`ephyviewer.datasource.epochs.InMemoryEpochSource`
+    for Neo :class:`Epochs <neo.core.Epoch>` that finds the epochs within a
+    time range by binary search, and that summarizes channels with many
+    epochs by their density.
+
+    Channels with more than ``density_threshold`` epochs are dense. When the
+    requested time range is at least ``density_span`` seconds wide, no epochs
+    are returned for dense channels, since drawing each of them would be
+    slow; :meth:`get_density` provides a binned density of their epochs that
+    can be displayed as a trace instead.
+
+    The epochs of each channel are sorted by start time.
+    """
+
+    def __init__(self, neo_epochs=[], density_threshold=np.inf, density_span=np.inf):
+        """
+        Initialize a new NeoEpochSourceWithDensity.
+        """
+
+        all_epochs = []
+        for neo_epoch in neo_epochs:
+            times = neo_epoch.times.rescale('s').magnitude
+            durations = neo_epoch.durations.rescale('s').magnitude
+            labels = np.asarray(neo_epoch.labels)
+            if np.any(times[1:] < times[:-1]):
+                order = np.argsort(times, kind='stable')
+                times, durations, labels = times[order], durations[order], labels[order]
+            all_epochs.append({
+                'name': neo_epoch.name,
+                'time': times,
+                'duration': durations,
+                'label': labels,
+            })
+
+        InMemoryEpochSource.__init__(self, all_epochs=all_epochs)
+
+        self.density_threshold = density_threshold
+        self.density_span = density_span
+
+        # the latest stop time of each epoch and all epochs before it, which
+        # is sorted even if epochs overlap, so that the first epoch that
+        # stops after a given time can be found by binary search
+        self._stops_max = [np.maximum.accumulate(ep['time'] + ep['duration']) for ep in self.all]
+
+    def dense_channels(self):
+        """
+        Return the indexes of the channels with more than
+        ``density_threshold`` epochs.
+        """
+
+        return [chan for chan in range(self.nb_channel) if self.get_size(chan) > self.density_threshold]
+
+    def get_chunk_by_time(self, chan=0, t_start=None, t_stop=None):
+        """
+        Return the times, durations, and labels of the epochs that overlap the
+        time range from ``t_start`` to ``t_stop``, like the superclass, or no
+        epochs if the channel is dense and the time range is at least
+        ``density_span`` seconds wide.
+        """
+
+        ep = self.all[chan]
+        if self.get_size(chan) > self.density_threshold and t_stop - t_start >= self.density_span:
+            return ep['time'][:0], ep['duration'][:0], ep['label'][:0]
+
+        # epochs that start before t_stop, excluding those before the first
+        # epoch that stops after t_start
+        i_start = np.searchsorted(self._stops_max[chan], t_start, side='left')
+        i_stop = np.searchsorted(ep['time'], t_stop, side='right')
+        times = ep['time'][i_start:i_stop]
+        durations = ep['duration'][i_start:i_stop]
+        labels = ep['label'][i_start:i_stop]
+
+        # exclude epochs that stop before t_start but follow one that does not
+        keep = times + durations >= t_start
+        return times[keep], durations[keep], labels[keep]
+
+    def get_density(self, bin_duration):
+        """
+        Return the density of the epochs of each dense channel, in epochs per
+        second, as an array with one column per channel in the order given by
+        :meth:`dense_channels` and one row for each bin of ``bin_duration``
+        seconds from ``t_start`` to ``t_stop``. Each epoch is counted in the
+        bin containing its start time.
+        """
+
+        chans = self.dense_channels()
+        n_bins = int((self.t_stop - self.t_start) // bin_duration) + 1
+        density = np.zeros((n_bins, len(chans)))
+        for j, chan in enumerate(chans):
+            bins = ((self.all[chan]['time'] - self.t_start) // bin_duration).astype('int64')
+            np.clip(bins, 0, n_bins - 1, out=bins)
+            density[:, j] = np.bincount(bins, minlength=n_bins)
+        density /= bin_duration
+        return density
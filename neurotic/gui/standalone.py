@@ -19,7 +19,7 @@ import neo
 from ephyviewer import QT, QT_MODE
 
 from .. import __version__, _elephant_tools, default_log_level, log_file
-from ..datasets import MetadataSelector, load_dataset
+from ..datasets import MetadataSelector, load_dataset, clear_cache
 from ..datasets.metadata import _selector_labels
 from ..gui.config import EphyviewerConfigurator, available_themes, available_ui_scales
 
@@ -66,7 +66,7 @@ class MainWindow(QT.QMainWindow):
     request_download = QT.pyqtSignal()
     request_load_dataset = QT.pyqtSignal()
 
-    def __init__(self, file=None, initial_selection=None, lazy=True, theme='light', ui_scale='medium', support_increased_line_width=False, show_datetime=False):
+    def __init__(self, file=None, initial_selection=None, lazy=True, use_cache=True, theme='light', ui_scale='medium', support_increased_line_width=False, show_datetime=False):
         """
         Initialize a new MainWindow.
         """
@@ -82,6 +82,9 @@ class MainWindow(QT.QMainWindow):
         # lazy loading using Neo RawIO
         self.lazy = lazy
 
+        # persistent cache of processed data, used only if lazy=False
+        self.use_cache = use_cache
+
         if theme not in available_themes:
             logger.error(f'theme "{theme}" is unrecognized')
             raise ValueError(f'theme "{theme}" is unrecognized')
@@ -215,6 +218,16 @@ class MainWindow(QT.QMainWindow):
         do_toggle_lazy.setChecked(self.lazy)
         do_toggle_lazy.triggered.connect(self.toggle_lazy)
 
+        do_toggle_use_cache = options_menu.addAction('&Cache processed data')
+        do_toggle_use_cache.setStatusTip('Speeds up repeated loading when fast loading is off by storing filtered signals, detected spikes, etc. on disk')
+        do_toggle_use_cache.setCheckable(True)
+        do_toggle_use_cache.setChecked(self.use_cache)
+        do_toggle_use_cache.triggered.connect(self.toggle_use_cache)
+
+        do_clear_cache = options_menu.addAction('C&lear cache')
+        do_clear_cache.setStatusTip('Delete all processed data stored on disk')
+        do_clear_cache.triggered.connect(self.clear_cache)
+
         do_toggle_show_datetime = options_menu.addAction('&Display date and time')
         do_toggle_show_datetime.setStatusTip('May be inaccurate for some data files unless manually set with rec_datetime')
         do_toggle_show_datetime.setCheckable(True)
@@ -563,6 +576,17 @@ class MainWindow(QT.QMainWindow):
     def toggle_lazy(self, checked):
         self.lazy = checked
 
+    def toggle_use_cache(self, checked):
+        self.use_cache = checked
+
+    def clear_cache(self):
+        """
+        Delete all processed data stored in the cache.
+        """
+
+        clear_cache()
+        self.statusBar().showMessage('Cleared the cache', msecs=5000)
+
     def toggle_show_datetime(self, checked):
         self.show_datetime = checked
 
@@ -732,10 +756,11 @@ class _LoadDatasetWorker(QT.QObject):
 
         metadata = self.mainwindow.metadata_selector.selected_metadata
         lazy = self.mainwindow.lazy
+        use_cache = self.mainwindow.use_cache
 
         try:
 
-            self.mainwindow.blk = load_dataset(metadata, lazy=lazy)
+            self.mainwindow.blk = load_dataset(metadata, lazy=lazy, use_cache=use_cache)
 
         except FileNotFoundError as e:
 
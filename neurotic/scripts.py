@@ -18,6 +18,7 @@ import pkg_resources
 from ephyviewer import QT, mkQApp
 
 from . import __version__
+from .datasets.cache import clear_cache
 from .datasets.data import load_dataset
 from .gui.config import EphyviewerConfigurator, available_themes, available_ui_scales
 from .gui.standalone import MainWindow
@@ -52,6 +53,14 @@ def parse_args(argv):
     parser.add_argument('--no-lazy', action='store_false', dest='lazy',
                         help='do not use fast loading (default: use fast ' \
                              'loading)')
+    parser.add_argument('--no-cache', action='store_false', dest='use_cache',
+                        help='do not read or write the cache of processed ' \
+                             'data, which speeds up repeated loading when ' \
+                             'fast loading is off (default: use the cache)')
+    parser.add_argument('--clear-cache', action='store_true',
+                        dest='clear_cache',
+                        help='delete the cache of processed data before ' \
+                             'starting (default: keep the cache)')
     parser.add_argument('--thick-traces', action='store_true', dest='thick',
                         help='enable support for traces with thick lines, ' \
                              'which has a performance cost (default: ' \
@@ -94,7 +103,8 @@ def win_from_args(args):
     """
 
     win = MainWindow(file=args.file, initial_selection=args.dataset,
-                     lazy=args.lazy, theme=args.theme, ui_scale=args.ui_scale,
+                     lazy=args.lazy, use_cache=args.use_cache,
+                     theme=args.theme, ui_scale=args.ui_scale,
                      support_increased_line_width=args.thick,
                      show_datetime=args.datetime)
     return win
@@ -130,6 +140,8 @@ def main():
     """
 
     args = parse_args(sys.argv)
+    if args.clear_cache:
+        clear_cache()
     if args.launch_example_notebook:
         launch_example_notebook()
     else:
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the persistent cache of processed data
+"""
+
+import os
+import shutil
+import tempfile
+import numpy as np
+import quantities as pq
+import neo
+import unittest
+from unittest import mock
+
+import neurotic
+from neurotic.datasets import cache
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class CacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='neurotic-')
+        self.cache_dir = os.path.join(self.temp_dir, 'cache')
+
+        # create a data file containing noisy signals with large spikes
+        rng = np.random.RandomState(0)
+        n_samples = 50000
+        data = rng.normal(0, 100, (n_samples, 2))
+        spike_indexes = np.arange(500, n_samples, 700)
+        data[spike_indexes, 0] += 3000
+        data[spike_indexes, 1] -= 3000
+        self.data_file = os.path.join(self.temp_dir, 'data.raw')
+        data.astype('int16').tofile(self.data_file)
+
+        self.metadata = {
+            'data_file': self.data_file,
+            'io_class': 'RawBinarySignalIO',
+            'io_args': {
+                'dtype': 'int16',
+                'sampling_rate': 10000,
+                'nb_channel': 2,
+                'signal_gain': 0.01,
+            },
+            'filters': [
+                {'channel': 'ch0', 'highpass': 10},
+            ],
+            'amplitude_discriminators': [
+                {'name': 'Unit 1', 'channel': 'ch0', 'units': 'dimensionless', 'amplitude': [10, 50]},
+            ],
+            'firing_rates': [
+                {'name': 'Unit 1', 'kernel': 'CausalAlphaKernel', 'sigma': 0.1},
+            ],
+            'burst_detectors': [
+                {'spiketrain': 'Unit 1', 'thresholds': [10, 8]},
+            ],
+            'rauc_baseline': 'median',
+            'rauc_bin_duration': 0.1,
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+        cache._default_cache = None
+
+    def test_put_and_get(self):
+        """Test that cached Neo objects are restored with their annotations"""
+        data_cache = cache.DataCache(self.cache_dir)
+        sig = neo.AnalogSignal(np.arange(10.).reshape(-1, 1), units='mV',
+                               sampling_rate=1*pq.kHz, name='sig')
+        rauc_sig = neo.AnalogSignal(np.ones((5, 1)), units='mV*s',
+                                    sampling_rate=0.5*pq.kHz)
+        sig.annotate(rauc_sig=rauc_sig, rauc_bin_duration=0.1*pq.s)
+        st = neo.SpikeTrain([1, 2, 3]*pq.s, t_stop=4*pq.s, name='st')
+        ep = neo.Epoch([1, 2]*pq.s, durations=[0.5, 0.5]*pq.s,
+                       labels=['a', 'b'], array_annotations={'spikes': [3, 4]})
+        key = data_cache.make_key('test', {'param': 1})
+        self.assertTrue(data_cache.put(key, {'sigs': [sig], 'st': st, 'ep': ep}))
+
+        # read from disk using a new cache with nothing held in memory
+        contents = cache.DataCache(self.cache_dir).get(key)
+        self.assertIsInstance(contents['sigs'][0], neo.AnalogSignal)
+        base = contents['sigs'][0]
+        while not isinstance(base, np.memmap) and base.base is not None:
+            base = base.base
+        self.assertIsInstance(base, np.memmap, 'signal is not memory-mapped')
+        np.testing.assert_array_equal(contents['sigs'][0].magnitude, sig.magnitude)
+        self.assertEqual(contents['sigs'][0].sampling_rate, sig.sampling_rate)
+        self.assertEqual(contents['sigs'][0].annotations['rauc_bin_duration'], 0.1*pq.s)
+        np.testing.assert_array_equal(contents['sigs'][0].annotations['rauc_sig'].magnitude, rauc_sig.magnitude)
+        np.testing.assert_array_equal(contents['st'].magnitude, st.magnitude)
+        np.testing.assert_array_equal(contents['ep'].labels, ep.labels)
+        np.testing.assert_array_equal(contents['ep'].array_annotations['spikes'], [3, 4])
+
+    def test_memory(self):
+        """Test that entries held in memory are protected from annotation"""
+        data_cache = cache.DataCache(self.cache_dir)
+        st = neo.SpikeTrain([1, 2, 3]*pq.s, t_stop=4*pq.s, name='st')
+        data_cache.put('key', st)
+        shutil.rmtree(self.cache_dir)
+
+        st1 = data_cache.get('key')
+        st1.annotate(firing_rate_sig=None)
+        st2 = data_cache.get('key')
+        np.testing.assert_array_equal(st2.magnitude, st.magnitude)
+        self.assertNotIn('firing_rate_sig', st2.annotations)
+        self.assertTrue(np.shares_memory(st1, st2))
+
+    def test_missing_key(self):
+        """Test that a missing entry is reported as None"""
+        data_cache = cache.DataCache(self.cache_dir)
+        self.assertIsNone(data_cache.get(data_cache.make_key('missing')))
+
+    def test_eviction(self):
+        """Test that the least recently used entries are evicted first"""
+        data_cache = cache.DataCache(self.cache_dir, max_memory_bytes=0)
+        for i in range(3):
+            data_cache.put(str(i), {'array': np.zeros(100)})
+            os.utime(os.path.join(self.cache_dir, str(i), 'manifest.json'), (i, i))
+        data_cache.max_bytes = data_cache.size()  # room for 3 entries
+        data_cache.get('0')  # mark the oldest entry as recently used
+        data_cache.put('3', {'array': np.zeros(100)})
+        self.assertIsNotNone(data_cache.get('0'))
+        self.assertIsNone(data_cache.get('1'))
+        self.assertIsNotNone(data_cache.get('2'))
+        self.assertLessEqual(data_cache.size(), data_cache.max_bytes)
+
+    def test_clear(self):
+        """Test that clearing the cache deletes every entry"""
+        data_cache = cache.DataCache(self.cache_dir)
+        data_cache.put('key', {'array': np.zeros(100)})
+        cache.clear_cache(self.cache_dir)
+        self.assertIsNone(cache.DataCache(self.cache_dir).get('key'))
+        self.assertEqual(data_cache.size(), 0)
+
+        data_cache.clear()
+        self.assertIsNone(data_cache.get('key'))
+
+    def test_load_dataset_with_cache(self):
+        """Test that load_dataset restores identical outputs from the cache"""
+        blk1 = neurotic.load_dataset(self.metadata)
+
+        with mock.patch.object(cache, '_default_cache_dir', self.cache_dir):
+            neurotic.load_dataset(self.metadata, use_cache=True)
+            self.assertGreater(cache.DataCache().size(), 0)
+
+            # simulate a new process with nothing held in memory
+            with mock.patch.object(cache, '_default_cache', None):
+                with mock.patch.object(neurotic._elephant_tools, 'butter') as butter:
+                    blk2 = neurotic.load_dataset(self.metadata, use_cache=True)
+                    butter.assert_not_called()
+
+        for sig1, sig2 in zip(blk1.segments[0].analogsignals, blk2.segments[0].analogsignals):
+            np.testing.assert_array_equal(sig1.magnitude, sig2.magnitude)
+            np.testing.assert_array_equal(sig1.annotations['rauc_sig'].magnitude,
+                                          sig2.annotations['rauc_sig'].magnitude)
+
+        st1, st2 = blk1.segments[0].spiketrains[0], blk2.segments[0].spiketrains[0]
+        self.assertGreater(len(st1), 0)
+        np.testing.assert_array_equal(st1.magnitude, st2.magnitude)
+        np.testing.assert_array_equal(st1.annotations['firing_rate_sig'].magnitude,
+                                      st2.annotations['firing_rate_sig'].magnitude)
+
+        ep1 = next(ep for ep in blk1.segments[0].epochs if ep.name == 'Unit 1 burst')
+        ep2 = next(ep for ep in blk2.segments[0].epochs if ep.name == 'Unit 1 burst')
+        np.testing.assert_array_equal(ep1.times.magnitude, ep2.times.magnitude)
+
+    def test_minmax_pyramids_cached(self):
+        """Test that min/max pyramids are computed only when requested and are cached"""
+        blk = neurotic.load_dataset(self.metadata)
+        self.assertNotIn('minmax_pyramid', blk.segments[0].analogsignals[0].annotations)
+        self.assertNotIn('cache_key', blk.segments[0].analogsignals[0].annotations)
+
+        with mock.patch.object(cache, '_default_cache_dir', self.cache_dir):
+            blk = neurotic.load_dataset(self.metadata, use_cache=True)
+            sigs = blk.segments[0].analogsignals
+            self.assertNotIn('minmax_pyramid', sigs[0].annotations)
+            pyramids1 = neurotic.datasets.data._compute_minmax_pyramids(sigs, cache._get_default_cache())
+
+            # simulate a new process with nothing held in memory
+            with mock.patch.object(cache, '_default_cache', None):
+                blk = neurotic.load_dataset(self.metadata, use_cache=True)
+                with mock.patch.object(neurotic.datasets.data, '_minmax_pyramid') as minmax_pyramid:
+                    pyramids2 = neurotic.datasets.data._compute_minmax_pyramids(blk.segments[0].analogsignals, cache._get_default_cache())
+                    minmax_pyramid.assert_not_called()
+
+        for pyramid1, pyramid2 in zip(pyramids1, pyramids2):
+            self.assertEqual(pyramid1['factors'], pyramid2['factors'])
+            np.testing.assert_array_equal(pyramid1['maxs'][-1], pyramid2['maxs'][-1])
+            np.testing.assert_array_equal(pyramid1['mins'][0], pyramid2['mins'][0])
+
+    def test_auto_kernel_cached(self):
+        """Test that automatically chosen kernel widths are taken from the cache"""
+        self.metadata['firing_rates'] = [
+            {'name': 'Unit 1', 'kernel': 'auto'},
+        ]
+        with mock.patch.object(cache, '_default_cache_dir', self.cache_dir):
+            blk1 = neurotic.load_dataset(self.metadata, use_cache=True)
+
+            # simulate a new process with nothing held in memory
+            with mock.patch.object(cache, '_default_cache', None):
+                with mock.patch.object(neurotic._elephant_tools, 'optimal_kernel') as optimal_kernel:
+                    blk2 = neurotic.load_dataset(self.metadata, use_cache=True)
+                    optimal_kernel.assert_not_called()
+
+        st1, st2 = blk1.segments[0].spiketrains[0], blk2.segments[0].spiketrains[0]
+        self.assertEqual(st1.annotations['firing_rate_kernel'], 'GaussianKernel')
+        self.assertEqual(st1.annotations['firing_rate_sigma'], st2.annotations['firing_rate_sigma'])
+        np.testing.assert_array_equal(st1.annotations['firing_rate_sig'].magnitude,
+                                      st2.annotations['firing_rate_sig'].magnitude)
+
+    def test_incremental_recompute(self):
+        """Test that only stages with changed inputs are rerun"""
+        with mock.patch.object(cache, '_default_cache_dir', self.cache_dir):
+            neurotic.load_dataset(self.metadata, use_cache=True)
+
+            # changing a discriminator should rerun spike detection and the
+            # stages that depend on it, but not filtering
+            self.metadata['amplitude_discriminators'][0]['amplitude'] = [10, 20]
+            with mock.patch.object(neurotic._elephant_tools, 'butter') as butter, \
+                 mock.patch.object(neurotic._elephant_tools, 'instantaneous_rate', wraps=neurotic._elephant_tools.instantaneous_rate) as instantaneous_rate:
+                neurotic.load_dataset(self.metadata, use_cache=True)
+                butter.assert_not_called()
+                instantaneous_rate.assert_called_once()
+
+            # changing a filter should rerun filtering
+            self.metadata['filters'][0]['highpass'] = 100
+            with mock.patch.object(neurotic._elephant_tools, 'butter', wraps=neurotic._elephant_tools.butter) as butter:
+                blk = neurotic.load_dataset(self.metadata, use_cache=True)
+                butter.assert_called_once()
+
+        blk_uncached = neurotic.load_dataset(self.metadata)
+        np.testing.assert_array_equal(blk.segments[0].analogsignals[0].magnitude,
+                                      blk_uncached.segments[0].analogsignals[0].magnitude)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -71,6 +71,8 @@ class CLITestCase(unittest.TestCase):
         self.assertFalse(win.do_toggle_debug_logging.isChecked(),
                          'debug logging enabled without --debug')
         self.assertTrue(win.lazy, 'lazy loading disabled without --no-lazy')
+        self.assertTrue(win.use_cache, 'cache disabled without --no-cache')
+        self.assertFalse(args.clear_cache, 'cache cleared without --clear-cache')
         self.assertFalse(win.support_increased_line_width,
                          'thick traces enabled without --thick-traces')
         self.assertFalse(win.show_datetime,
@@ -101,6 +103,20 @@ class CLITestCase(unittest.TestCase):
         win = neurotic.win_from_args(args)
         self.assertFalse(win.lazy, 'lazy loading enabled with --no-lazy')
 
+    def test_no_cache(self):
+        """Test that --no-cache disables the cache of processed data"""
+        argv = ['neurotic', '--no-cache']
+        args = neurotic.parse_args(argv)
+        app = mkQApp()
+        win = neurotic.win_from_args(args)
+        self.assertFalse(win.use_cache, 'cache enabled with --no-cache')
+
+    def test_clear_cache(self):
+        """Test that --clear-cache requests clearing the cache"""
+        argv = ['neurotic', '--clear-cache']
+        args = neurotic.parse_args(argv)
+        self.assertTrue(args.clear_cache, 'cache not cleared with --clear-cache')
+
     def test_thick_traces(self):
         """Test that --thick-traces enables support for thick traces"""
         argv = ['neurotic', '--thick-traces']
@@ -0,0 +1,507 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for loading and processing datasets
+"""
+
+import os
+import shutil
+import tempfile
+import numpy as np
+import quantities as pq
+import neo
+import unittest
+from unittest import mock
+import scipy.integrate
+import scipy.signal
+
+import neurotic
+from neurotic.datasets import data
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class DataTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='neurotic-')
+
+        # create a data file containing noisy signals with large spikes
+        rng = np.random.RandomState(0)
+        n_samples = 50000
+        n_channels = 4
+        data = rng.normal(0, 100, (n_samples, n_channels))
+        spike_indexes = np.arange(500, n_samples, 700)
+        data[spike_indexes, 0] += 3000
+        data[spike_indexes, 1] -= 3000
+        self.data_file = os.path.join(self.temp_dir, 'data.raw')
+        data.astype('int16').tofile(self.data_file)
+
+        self.metadata = {
+            'data_file': self.data_file,
+            'io_class': 'RawBinarySignalIO',
+            'io_args': {
+                'dtype': 'int16',
+                'sampling_rate': 10000,
+                'nb_channel': n_channels,
+                'signal_gain': 0.01,
+            },
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_parallel_filters(self):
+        """Test that filtering in parallel matches filtering serially"""
+        self.metadata['filters'] = [
+            {'channel': 'ch0', 'highpass': 10},
+            {'channel': 'ch1', 'lowpass': 1000},
+            {'channel': 'ch2', 'highpass': 10, 'lowpass': 1000},
+            {'channel': 'ch0', 'lowpass': 2000},
+        ]
+        blk_serial = neurotic.load_dataset(self.metadata, max_workers=1)
+        blk_parallel = neurotic.load_dataset(self.metadata, max_workers=4)
+        blk_unfiltered = neurotic.load_dataset({k: v for k, v in self.metadata.items() if k != 'filters'})
+
+        for sig_serial, sig_parallel in zip(blk_serial.segments[0].analogsignals,
+                                            blk_parallel.segments[0].analogsignals):
+            np.testing.assert_array_equal(sig_serial.magnitude, sig_parallel.magnitude)
+
+        # both filters on ch0 should have been applied in order
+        expected = neurotic._elephant_tools.butter(
+            neurotic._elephant_tools.butter(
+                blk_unfiltered.segments[0].analogsignals[0], highpass_freq=10*pq.Hz,
+                filter_function='sosfiltfilt'),
+            lowpass_freq=2000*pq.Hz, filter_function='sosfiltfilt')
+        np.testing.assert_array_equal(blk_parallel.segments[0].analogsignals[0].magnitude,
+                                      expected.magnitude)
+
+        # unfiltered channels should be untouched
+        np.testing.assert_array_equal(blk_parallel.segments[0].analogsignals[3].magnitude,
+                                      blk_unfiltered.segments[0].analogsignals[3].magnitude)
+
+    def test_chunked_filter(self):
+        """Test that filtering in chunks matches filtering all at once"""
+        rng = np.random.RandomState(0)
+        x = rng.normal(0, 1, (30000, 2)).cumsum(axis=0)
+        sos = scipy.signal.butter(4, [0.001, 0.2], btype='bandpass', output='sos')
+        expected = scipy.signal.sosfiltfilt(sos, x, axis=0)
+
+        # write into a memory-mapped output
+        out = np.lib.format.open_memmap(os.path.join(self.temp_dir, 'out.npy'),
+                                        mode='w+', dtype='float64', shape=x.shape)
+        result = neurotic._elephant_tools.sosfiltfilt_chunked(sos, x, axis=0, out=out, chunk_size=1000)
+        self.assertIs(result, out)
+        np.testing.assert_allclose(out, expected, rtol=0, atol=1e-10*np.abs(expected).max())
+
+        # filter along the last axis
+        result = neurotic._elephant_tools.sosfiltfilt_chunked(sos, x.T, chunk_size=777)
+        np.testing.assert_allclose(result.T, expected, rtol=0, atol=1e-10*np.abs(expected).max())
+
+    def test_load_dataset_chunked_filter(self):
+        """Test that load_dataset filters long signals in chunks"""
+        self.metadata['filters'] = [
+            {'channel': 'ch0', 'highpass': 10, 'lowpass': 1000},
+        ]
+        blk_unfiltered = neurotic.load_dataset({k: v for k, v in self.metadata.items() if k != 'filters'})
+        with mock.patch.object(data, '_filter_chunk_size', 4096):
+            blk = neurotic.load_dataset(self.metadata)
+
+        expected = neurotic._elephant_tools.butter(
+            blk_unfiltered.segments[0].analogsignals[0], highpass_freq=10*pq.Hz,
+            lowpass_freq=1000*pq.Hz, filter_function='sosfiltfilt')
+        # signals are single precision, so filtering them all at once is less
+        # precise than filtering them in chunks, which uses double precision
+        np.testing.assert_allclose(blk.segments[0].analogsignals[0].magnitude, expected.magnitude,
+                                   rtol=0, atol=1e-6*np.abs(expected.magnitude).max())
+
+    def test_filter_independent_of_length(self):
+        """Test that signals are filtered the same way whether or not they are long enough to be filtered in chunks"""
+        self.metadata['filters'] = [
+            {'channel': 'ch0', 'highpass': 1},
+            {'channel': 'ch1', 'highpass': 10, 'lowpass': 3000},
+            {'channel': 'ch2', 'highpass': 300},
+        ]
+        blk = neurotic.load_dataset(self.metadata)
+        with mock.patch.object(data, '_filter_chunk_size', 4096):
+            blk_chunked = neurotic.load_dataset(self.metadata)
+
+        for i in range(3):
+            sig = blk.segments[0].analogsignals[i].magnitude
+            sig_chunked = blk_chunked.segments[0].analogsignals[i].magnitude
+            self.assertTrue(np.all(np.isfinite(sig)))
+            np.testing.assert_allclose(sig_chunked, sig, rtol=0, atol=1e-6*np.abs(sig).max())
+
+    def test_rauc(self):
+        """Test that RAUC matches integrating each bin with the trapezoidal rule"""
+        rng = np.random.RandomState(0)
+        sig = neo.AnalogSignal(rng.normal(1, 1, (10007, 3)), units='mV', sampling_rate=10*pq.kHz)
+        baseline = np.median(sig.magnitude, axis=0)
+        for bin_duration in [0.01*pq.s, 0.0123*pq.s, None]:
+            with mock.patch.object(neurotic._elephant_tools, '_rauc_chunk_size', 1000):
+                rauc = neurotic._elephant_tools.rauc(sig, baseline='median', bin_duration=bin_duration)
+
+            samples_per_bin = 100 if bin_duration == 0.01*pq.s else 123 if bin_duration is not None else len(sig)
+            expected = []
+            for i in range(0, len(sig), samples_per_bin):
+                x = np.zeros((samples_per_bin, 3))  # the final bin is padded with zeros
+                x[:len(sig) - i] = np.abs(sig.magnitude[i:i+samples_per_bin] - baseline)
+                expected.append(scipy.integrate.trapezoid(x, dx=1e-4, axis=0))
+            if bin_duration is not None:
+                self.assertEqual(rauc.sampling_period, samples_per_bin*sig.sampling_period)
+            else:
+                expected = expected[0]
+            np.testing.assert_allclose(rauc.rescale('mV*s').magnitude, np.squeeze(expected), rtol=1e-12)
+
+    def test_rauc_in_chunks(self):
+        """Test that RAUC calculated from chunks matches RAUC of the whole signal"""
+        rng = np.random.RandomState(0)
+        sig = neo.AnalogSignal(rng.normal(1, 1, (10007, 1)), units='mV', sampling_rate=10*pq.kHz)
+        for baseline in [None, 'mean', 'median']:
+            expected = neurotic._elephant_tools.rauc(sig, baseline=baseline, bin_duration=0.0123*pq.s)
+            rauc = np.full(len(expected), np.nan)
+            for first_bin, values in data._rauc_in_chunks(
+                    lambda i_start, i_stop: sig.magnitude[i_start:i_stop, 0], len(sig),
+                    sig.sampling_period, baseline, 0.0123*pq.s, chunk_size=1000):
+                rauc[first_bin:first_bin + len(values)] = values
+            np.testing.assert_allclose(rauc, expected.rescale('mV*s').magnitude[:, 0], rtol=1e-12)
+
+    def test_rauc_in_chunks_quantized(self):
+        """Test that RAUC calculated from chunks of a quantized signal finds the median baseline"""
+        x = np.r_[np.zeros(5000), np.ones(5000)]
+        values = [values for _, values in data._rauc_in_chunks(
+            lambda i_start, i_stop: x[i_start:i_stop], len(x),
+            0.001*pq.s, 'median', None, chunk_size=1000)]
+        np.testing.assert_allclose(np.concatenate(values), [0.5 * (len(x) - 1) * 0.001], rtol=1e-12)
+
+    def test_streaming_median(self):
+        """Test that the median of a signal read in chunks is exact"""
+        rng = np.random.RandomState(0)
+        for x in [rng.normal(0, 1, 10001),          # odd length
+                  rng.normal(0, 1, 10000),          # even length
+                  np.round(rng.normal(0, 3, 10000)), # many ties
+                  np.ones(5000),                    # all equal
+                  rng.standard_cauchy(12345)*1e10,  # long tails
+                  np.r_[np.zeros(5000), np.ones(5000)],   # two levels, middle values at the extremes
+                  np.r_[np.zeros(5000), np.ones(5001)],   # two levels, odd length
+                  rng.randint(0, 2, 10000)*2**12,   # quantized
+                  rng.randint(-3, 4, 10000)]:       # integers
+            median = neurotic._elephant_tools.streaming_median(lambda i_start, i_stop: x[i_start:i_stop], len(x), chunk_size=100)
+            self.assertEqual(median, np.median(x))
+
+    def test_minmax_pyramid(self):
+        """Test that each level of a min/max pyramid holds the extrema of its blocks"""
+        rng = np.random.RandomState(0)
+        x = rng.normal(0, 1, (10007, 2))
+        pyramid = data._minmax_pyramid(x)
+        self.assertEqual(pyramid['factors'], [16, 64, 256, 1024, 4096, 16384])
+        for factor, mins, maxs in zip(pyramid['factors'], pyramid['mins'], pyramid['maxs']):
+            blocks = [x[i:i+factor] for i in range(0, len(x), factor)]
+            np.testing.assert_array_equal(mins, [block.min(axis=0) for block in blocks])
+            np.testing.assert_array_equal(maxs, [block.max(axis=0) for block in blocks])
+
+    def test_read_annotations(self):
+        """Test that annotations are read into epochs and events by type"""
+        annotations_file = os.path.join(self.temp_dir, 'annotations.csv')
+        with open(annotations_file, 'w') as f:
+            f.write('Start (s),End (s),Type,Label\n'
+                    '3,4,A,c\n'
+                    '1,1,A,a\n'
+                    '-1,2,A,negative start\n'
+                    '5,2,B,end before start\n'
+                    '2,,,\n'
+                    '0.5,1.5,B,"b,d"\n')
+        epoch_encoder_file = os.path.join(self.temp_dir, 'epoch-encoder.csv')
+        with open(epoch_encoder_file, 'w') as f:
+            f.write('Start (s),End (s),Type\n'
+                    '1,2,B\n')
+        metadata = {'annotations_file': annotations_file, 'epoch_encoder_file': epoch_encoder_file}
+
+        blk = neurotic.load_dataset(metadata, filter_events_from_epochs=True)
+        epochs = {(ep.name, ep.file_origin): ep for ep in blk.segments[0].epochs}
+        events = {(ev.name, ev.file_origin): ev for ev in blk.segments[0].events}
+        self.assertEqual(set(events), {('A', annotations_file), ('B', annotations_file),
+                                       ('Other', annotations_file), ('B', epoch_encoder_file)})
+        np.testing.assert_array_equal(events['A', annotations_file].times, [1, 3]*pq.s)
+        np.testing.assert_array_equal(events['A', annotations_file].labels, ['a', 'c'])
+        np.testing.assert_array_equal(events['Other', annotations_file].labels, [''])
+        np.testing.assert_array_equal(events['B', epoch_encoder_file].labels, ['(from epoch encoder file)'])
+
+        # entries without positive durations are not epochs
+        self.assertEqual(set(epochs), {('A', annotations_file), ('B', annotations_file),
+                                       ('B', epoch_encoder_file)})
+        np.testing.assert_array_equal(epochs['A', annotations_file].times, [3]*pq.s)
+        np.testing.assert_array_equal(epochs['B', annotations_file].durations, [1]*pq.s)
+        np.testing.assert_array_equal(epochs['B', annotations_file].labels, ['b,d'])
+
+    def test_mirrored_events_and_epochs(self):
+        """Test that events mirrored as epochs and vice versa share memory with the originals"""
+        blk = neo.Block()
+        seg = neo.Segment()
+        blk.segments.append(seg)
+        seg.events.append(neo.Event([1, 2, 3]*pq.s, labels=['a', 'b', 'c'], name='ev', file_origin='f'))
+        seg.epochs.append(neo.Epoch([4, 5]*pq.s, durations=[1, 2]*pq.s, labels=['d', 'e'], name='ep'))
+        seg.events[0].annotate(note='original')
+
+        blk = neurotic.load_dataset({}, blk=blk)
+        events = {ev.name: ev for ev in blk.segments[0].events}
+        epochs = {ep.name: ep for ep in blk.segments[0].epochs}
+        ev, ev_from_ep = events['ev'], events['ep']
+        ep, ep_from_ev = epochs['ep'], epochs['ev']
+
+        self.assertIsInstance(ep_from_ev, neo.Epoch)
+        self.assertIsNone(ep_from_ev.file_origin)
+        self.assertEqual(ep_from_ev.annotations, {})
+        self.assertTrue(np.shares_memory(ep_from_ev, ev))
+        self.assertIs(ep_from_ev.labels, ev.labels)
+        np.testing.assert_array_equal(ep_from_ev.times, [1, 2, 3]*pq.s)
+        np.testing.assert_array_equal(ep_from_ev.durations, [0, 0, 0]*pq.s)
+        self.assertEqual(ep_from_ev.durations.strides, (0,))
+        np.testing.assert_array_equal(ep_from_ev.time_slice(1.5*pq.s, 4*pq.s).labels, ['b', 'c'])
+
+        self.assertIsInstance(ev_from_ep, neo.Event)
+        self.assertTrue(np.shares_memory(ev_from_ep, ep))
+        self.assertIs(ev_from_ep.labels, ep.labels)
+        np.testing.assert_array_equal(ev_from_ep.times, [4, 5]*pq.s)
+
+        # annotating a mirror does not annotate the original
+        ep_from_ev.annotate(note='mirror')
+        self.assertEqual(ev.annotations['note'], 'original')
+
+    def test_detect_spikes(self):
+        """Test that spike detection matches taking the difference of peaks crossing each threshold"""
+        rng = np.random.RandomState(0)
+        x = np.round(rng.normal(0, 1, (20000, 1)), 1)  # rounding creates peaks with ties
+        sig = neo.AnalogSignal(x, units='mV', sampling_rate=10*pq.kHz, t_start=3*pq.s, name='ch0')
+        for amplitude in ([1000, 3000], [-3000, -1000], [0, 2000], [-2000, 0]):
+            discriminator = {'name': 'Unit', 'channel': 'ch0', 'units': 'uV', 'amplitude': amplitude}
+            min_threshold, max_threshold, sign = data._discriminator_thresholds(discriminator)
+            spikes_crossing_min = neurotic._elephant_tools.peak_detection(sig, min_threshold*pq.uV, sign, 'raw')
+            spikes_crossing_max = neurotic._elephant_tools.peak_detection(sig, max_threshold*pq.uV, sign, 'raw')
+            if sign == 'above':
+                expected = np.setdiff1d(spikes_crossing_min, spikes_crossing_max)
+            else:
+                expected = np.setdiff1d(spikes_crossing_max, spikes_crossing_min)
+
+            st = data._detect_spikes(sig, discriminator, [])
+            self.assertGreater(len(st), 0)
+            np.testing.assert_array_equal(st.magnitude, expected)
+
+    def test_discriminators_on_same_channel(self):
+        """Test that discriminators sharing a channel scan it only once"""
+        self.metadata['amplitude_discriminators'] = [
+            {'name': 'Unit 1', 'channel': 'ch0', 'units': 'dimensionless', 'amplitude': [10, 50]},
+            {'name': 'Unit 2', 'channel': 'ch0', 'units': 'dimensionless', 'amplitude': [2, 10]},
+            {'name': 'Unit 3', 'channel': 'ch0', 'units': 'dimensionless', 'amplitude': [-50, -2]},
+            {'name': 'Unit 4', 'channel': 'ch1', 'units': 'dimensionless', 'amplitude': [-50, -10]},
+            {'name': 'Unit 5', 'channel': 'ch1', 'units': 'dimensionless', 'amplitude': [-10, -3]},
+        ]
+        with mock.patch.object(data, '_threshold_crossings', wraps=data._threshold_crossings) as threshold_crossings:
+            blk = neurotic.load_dataset(self.metadata)
+            self.assertEqual(threshold_crossings.call_count, 3)  # once per channel and sign
+
+        sigs = blk.segments[0].analogsignals
+        for discriminator, st in zip(self.metadata['amplitude_discriminators'], blk.segments[0].spiketrains):
+            sig = sigs[int(discriminator['channel'][-1])]
+            expected = data._detect_spikes(sig, discriminator, [])
+            self.assertGreater(len(st), 0)
+            np.testing.assert_array_equal(st.magnitude, expected.magnitude)
+
+    def test_in_intervals(self):
+        """Test that times are located within overlapping, unsorted intervals"""
+        rng = np.random.RandomState(0)
+        starts = np.round(rng.uniform(0, 100, 50))
+        stops = starts + np.round(rng.uniform(-2, 10, 50))  # some empty intervals
+        times = np.round(rng.uniform(-10, 120, 1000))       # some times on interval edges
+        expected = np.any([(start <= times) & (times < stop) for start, stop in zip(starts, stops)], axis=0)
+        np.testing.assert_array_equal(data._in_intervals(times, starts, stops), expected)
+        np.testing.assert_array_equal(data._in_intervals(times, [], []), np.zeros(len(times), dtype=bool))
+
+    def test_discriminator_epochs(self):
+        """Test that spikes are restricted to epochs"""
+        sig = neurotic.load_dataset(self.metadata).segments[0].analogsignals[0]
+        discriminator = {'name': 'Unit 1', 'channel': 'ch0', 'units': 'dimensionless', 'amplitude': [10, 50]}
+        all_spikes = data._detect_spikes(sig, discriminator, []).magnitude
+
+        discriminator['epoch'] = 'Ep'
+        epochs = [neo.Epoch([0.1, 0.15, 3]*pq.s, durations=[0.3, 0.1, 2]*pq.s, name='Ep')]
+        st = data._detect_spikes(sig, discriminator, epochs)
+        expected = all_spikes[((0.1 <= all_spikes) & (all_spikes < 0.4)) | ((3 <= all_spikes) & (all_spikes < 5))]
+        self.assertGreater(len(st), 0)
+        np.testing.assert_array_equal(st.magnitude, expected)
+
+    def test_find_bursts(self):
+        """Test that bursts are found using frequency thresholds"""
+        # isi:             0.5   0.05  0.05  0.2   0.5   0.01  0.5   0.05  0.05
+        times = np.array([0, 0.5, 0.55, 0.6, 0.8, 1.3, 1.31, 1.81, 1.86, 1.91])
+        st = neo.SpikeTrain(times*pq.s, t_stop=2*pq.s)
+        bursts = data._find_bursts(st, 15*pq.Hz, 3*pq.Hz)
+        np.testing.assert_allclose(bursts.times.magnitude, [0.5, 1.3, 1.81])
+        np.testing.assert_allclose(bursts.durations.magnitude, [0.3, 0.01, 0.1])
+        np.testing.assert_array_equal(bursts.array_annotations['spikes'], [4, 2, 3])
+
+        # sharing the instantaneous firing frequency should not change results
+        bursts2 = data._find_bursts(st, 15*pq.Hz, 3*pq.Hz, data._spiketrain_iff(st))
+        np.testing.assert_array_equal(bursts.times.magnitude, bursts2.times.magnitude)
+
+        # no bursts
+        self.assertEqual(len(data._find_bursts(st, 200*pq.Hz, 3*pq.Hz)), 0)
+        self.assertEqual(len(data._find_bursts(st[:1], 15*pq.Hz, 3*pq.Hz)), 0)
+
+    def test_instantaneous_rate(self):
+        """Test that firing rates match convolving spike counts with the kernel"""
+        rng = np.random.RandomState(0)
+        times = np.sort(rng.uniform(0, 10, 200))
+        times[:2] = [0, 10]  # spikes on both edges
+        st = neo.SpikeTrain(times*pq.s, t_stop=10*pq.s)
+        sampling_period = 0.01*pq.s
+        kernel = neurotic._elephant_tools.GaussianKernel(0.1*pq.s)
+        rate = neurotic._elephant_tools.instantaneous_rate(st, sampling_period, kernel)
+
+        counts = np.zeros(1001)
+        for t in times:
+            counts[int(t/0.01)] += 1
+        t_arr = np.arange(-50, 51) * sampling_period  # default cutoff of 5 sigma
+        kernel_values = kernel(t_arr).rescale(pq.Hz).magnitude
+        expected = np.convolve(counts, kernel_values, 'full')
+        median_index = kernel.median_index(t_arr)
+        expected = expected[median_index:-(len(kernel_values) - median_index)]
+        self.assertEqual(rate.shape, (len(expected), 1))
+        np.testing.assert_allclose(rate.magnitude[:, 0], expected.clip(0), rtol=1e-9, atol=1e-9)
+
+    def test_causal_kernels(self):
+        """Test that causal kernels applied recursively match convolution with the untruncated kernel"""
+        rng = np.random.RandomState(0)
+        st = neo.SpikeTrain(np.sort(rng.uniform(0, 10, 100))*pq.s, t_stop=10*pq.s)
+        sampling_period = 0.003*pq.s
+        counts = np.bincount((st.magnitude/0.003).astype(int), minlength=3334)
+        for kernel in [neurotic._elephant_tools.CausalAlphaKernel(0.1*pq.s),
+                       neurotic._elephant_tools.CausalExponentialKernel(0.1*pq.s)]:
+            rate = neurotic._elephant_tools.instantaneous_rate(st, sampling_period, kernel)
+
+            # the kernel is sampled on the same grid used for convolution,
+            # which is offset from the spike times when the cutoff is not a
+            # multiple of the sampling period
+            offset = -5*0.1/0.003 % 1
+            kernel_values = kernel((np.arange(3334) + offset)*sampling_period).rescale('Hz').magnitude
+            expected = np.convolve(counts, kernel_values)[:3333]
+            self.assertEqual(rate.shape, (3333, 1))
+            np.testing.assert_allclose(rate.magnitude[:, 0], expected, rtol=0, atol=1e-12*expected.max())
+
+    def test_firing_rates(self):
+        """Test that firing rates computed together match computing them separately"""
+        self.metadata['amplitude_discriminators'] = [
+            {'name': 'Unit 1', 'channel': 'ch0', 'units': 'dimensionless', 'amplitude': [10, 50]},
+            {'name': 'Unit 2', 'channel': 'ch0', 'units': 'dimensionless', 'amplitude': [2, 10]},
+            {'name': 'Unit 3', 'channel': 'ch1', 'units': 'dimensionless', 'amplitude': [-50, -10]},
+        ]
+        self.metadata['firing_rates'] = [
+            {'name': 'Unit 3', 'kernel': 'CausalAlphaKernel', 'sigma': 0.1},
+            {'name': 'Unit 1', 'kernel': 'GaussianKernel', 'sigma': 0.05},
+            {'name': 'Unit 2', 'kernel': 'CausalAlphaKernel', 'sigma': 0.1},
+        ]
+        blk_serial = neurotic.load_dataset(self.metadata, max_workers=1)
+        blk = neurotic.load_dataset(self.metadata, max_workers=4)
+        firing_rates_sig, = blk.segments[0].annotations['firing_rates_sigs']
+        self.assertEqual(list(firing_rates_sig.array_annotations['channel_names']), ['Unit 1', 'Unit 2', 'Unit 3'])
+        np.testing.assert_array_equal(firing_rates_sig.magnitude,
+                                      blk_serial.segments[0].annotations['firing_rates_sigs'][0].magnitude)
+
+        for j, st in enumerate(blk.segments[0].spiketrains):
+            firing_rate = next(f for f in self.metadata['firing_rates'] if f['name'] == st.name)
+            expected = neurotic._elephant_tools.instantaneous_rate(
+                st, blk.segments[0].analogsignals[0].sampling_period,
+                getattr(neurotic._elephant_tools, firing_rate['kernel'])(firing_rate['sigma']*pq.s),
+                t_start=blk.segments[0].t_start, t_stop=blk.segments[0].t_stop)
+            firing_rate_sig = st.annotations['firing_rate_sig']
+            self.assertEqual(firing_rate_sig.name, st.name)
+            self.assertTrue(np.shares_memory(firing_rate_sig, firing_rates_sig[:, j]))
+            self.assertGreater(firing_rate_sig.magnitude.max(), 0)
+            np.testing.assert_array_equal(firing_rate_sig.magnitude, expected.magnitude)
+
+    def test_firing_rate_sampling_period(self):
+        """Test that firing rates are computed with their own sampling periods"""
+        self.metadata['amplitude_discriminators'] = [
+            {'name': 'Unit 1', 'channel': 'ch0', 'units': 'dimensionless', 'amplitude': [10, 50]},
+            {'name': 'Unit 2', 'channel': 'ch1', 'units': 'dimensionless', 'amplitude': [-50, -10]},
+        ]
+        self.metadata['firing_rates'] = [
+            {'name': 'Unit 1', 'kernel': 'CausalAlphaKernel', 'sigma': 0.1, 'sampling_period': 0.01},
+            {'name': 'Unit 2', 'kernel': 'GaussianKernel', 'sigma': 0.05, 'sampling_period': 'auto'},
+        ]
+        blk = neurotic.load_dataset(self.metadata)
+        sigs = blk.segments[0].annotations['firing_rates_sigs']
+        self.assertEqual([sig.sampling_period.rescale('s') for sig in sigs], [0.01*pq.s, 0.005*pq.s])
+
+        for st, sig in zip(blk.segments[0].spiketrains, sigs):
+            firing_rate = next(f for f in self.metadata['firing_rates'] if f['name'] == st.name)
+            expected = neurotic._elephant_tools.instantaneous_rate(
+                st, sig.sampling_period,
+                getattr(neurotic._elephant_tools, firing_rate['kernel'])(firing_rate['sigma']*pq.s),
+                t_start=blk.segments[0].t_start, t_stop=blk.segments[0].t_stop)
+            self.assertEqual(len(st.annotations['firing_rate_sig']), round(5*pq.s/sig.sampling_period))
+            np.testing.assert_array_equal(st.annotations['firing_rate_sig'].magnitude, expected.magnitude)
+
+        # an 'auto' sampling period is never finer than that of the signals
+        self.assertEqual(data._firing_rate_sampling_period(
+            {'kernel': 'GaussianKernel', 'sigma': 0.0001, 'sampling_period': 'auto'}, 0.001*pq.s), 0.001)
+
+    def test_auto_kernel(self):
+        """Test that firing rates can use automatically chosen kernels"""
+        self.metadata['amplitude_discriminators'] = [
+            {'name': 'Unit 1', 'channel': 'ch0', 'units': 'dimensionless', 'amplitude': [10, 50]},
+        ]
+        self.metadata['firing_rates'] = [
+            {'name': 'Unit 1', 'kernel': 'auto'},
+        ]
+        blk = neurotic.load_dataset(self.metadata)
+        st = blk.segments[0].spiketrains[0]
+        expected = neurotic._elephant_tools.instantaneous_rate(
+            st, blk.segments[0].analogsignals[0].sampling_period, 'auto',
+            t_start=blk.segments[0].t_start, t_stop=blk.segments[0].t_stop)
+        self.assertEqual(st.annotations['firing_rate_kernel'], 'GaussianKernel')
+        np.testing.assert_array_equal(st.annotations['firing_rate_sig'].magnitude, expected.magnitude)
+
+    def test_sskernel_bootstrap(self):
+        """Test that bootstrap confidence intervals are reproducible with a seed"""
+        rng = np.random.RandomState(0)
+        spiketimes = np.sort(rng.uniform(0, 100, 500))
+        result1 = neurotic._elephant_tools.sskernel(spiketimes, bootstrap=True, n_bootstrap=250, seed=1)
+        result2 = neurotic._elephant_tools.sskernel(spiketimes, bootstrap=True, n_bootstrap=250, seed=1)
+        self.assertEqual(result1['yb'].shape, (250, len(result1['t'])))
+        np.testing.assert_array_equal(result1['confb95'][0], result2['confb95'][0])
+        self.assertTrue(np.all(result1['confb95'][0] <= result1['confb95'][1]))
+
+        # candidate bandwidths are evaluated together
+        w = np.linspace(0.5, 5, 10)
+        result = neurotic._elephant_tools.sskernel(spiketimes, w=w)
+        for k, w_ in enumerate(w):
+            # padding for the FFTs depends on the widest kernel, so results
+            # differ very slightly from evaluating each bandwidth alone
+            self.assertAlmostEqual(result['C'][k], neurotic._elephant_tools.sskernel(spiketimes, w=[w_])['C'][0],
+                                   delta=1e-5*abs(result['C'][k]))
+        self.assertEqual(result['optw'], w[np.argmin(result['C'])])
+
+    def test_detect_spikes_in_chunks(self):
+        """Test that detecting spikes in chunks matches detecting them all at once"""
+        self.metadata['amplitude_discriminators'] = [
+            {'name': 'Unit 1', 'channel': 'ch0', 'units': 'dimensionless', 'amplitude': [10, 50]},
+            {'name': 'Unit 2', 'channel': 'ch0', 'units': 'dimensionless', 'amplitude': [2, 50]},
+            {'name': 'Unit 3', 'channel': 'ch0', 'units': 'dimensionless', 'amplitude': [-50, -2]},
+        ]
+        blk = neurotic.load_dataset(self.metadata)
+        sig = blk.segments[0].analogsignals[0]
+
+        # use chunks small enough that many crossings span multiple chunks
+        chunks = list(data._detect_spikes_in_chunks(
+            lambda i_start, i_stop: sig[i_start:i_stop, 0].as_quantity(), len(sig),
+            sig.t_start, sig.sampling_rate, sig.name, self.metadata['amplitude_discriminators'],
+            blk.segments[0].epochs, chunk_size=97))
+        self.assertEqual(chunks[-1][0], len(sig))
+        for i, st in enumerate(blk.segments[0].spiketrains):
+            times = np.concatenate([spiketrains[i].times.magnitude for _, spiketrains in chunks])
+            self.assertGreater(len(st), 0)
+            np.testing.assert_allclose(times, st.times.magnitude, rtol=0, atol=1e-9)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,13 +3,19 @@
 Tests for the GUI
 """
 
+import os
 import pkg_resources
 import tempfile
 import shutil
 import gc
 import unittest
+from unittest import mock
 
-from ephyviewer import QT, mkQApp, MainViewer
+import numpy as np
+import quantities as pq
+import neo
+from ephyviewer import QT, mkQApp, MainViewer, InMemoryEpochSource
+from ephyviewer.traceviewer import DataGrabber
 import neurotic
 
 import logging
@@ -86,5 +92,363 @@ class GUITestCase(unittest.TestCase):
         # close thread properly
         win.close()
 
+    def test_lazy_filters(self):
+        """Test that signals are filtered on demand with lazy loading"""
+        rng = np.random.RandomState(0)
+        data_file = os.path.join(self.temp_dir.name, 'data.raw')
+        rng.normal(0, 1000, (100000, 2)).astype('int16').tofile(data_file)
+        metadata = {
+            'data_file': data_file,
+            'io_class': 'RawBinarySignalIO',
+            'io_args': {
+                'dtype': 'int16',
+                'sampling_rate': 10000,
+                'nb_channel': 2,
+                'signal_gain': 0.01,
+            },
+            'filters': [
+                {'channel': 'ch0', 'highpass': 10},
+                {'channel': 'ch0', 'lowpass': 1000},
+            ],
+        }
+
+        blk_lazy = neurotic.load_dataset(metadata=metadata, lazy=True)
+        ephyviewer_config = neurotic.EphyviewerConfigurator(metadata, blk_lazy,
+                                                            lazy=True)
+        app = mkQApp()
+        win = ephyviewer_config.create_ephyviewer_window()
+        source = win.viewers['Signals']['widget'].source
+        self.assertIsInstance(source, neurotic.FilteredAnalogSignalFromNeoRawIOSource)
+        self.assertEqual(source.pad, neurotic._elephant_tools.sos_decay_length(
+            neurotic._elephant_tools.butter_design(highpass_freq=10, fs=10000),
+            neurotic.gui.datasources._transient_tolerance))
+
+        # padding is limited for filters with very low cutoff frequencies
+        slow_source = neurotic.FilteredAnalogSignalFromNeoRawIOSource(
+            source.neorawio, source.channel_indexes, filters={0: [{'highpass': 0.01}]})
+        self.assertEqual(slow_source.pad, neurotic.gui.datasources._max_pad)
+
+        # compare a window spanning multiple blocks to signals filtered all at
+        # once
+        blk = neurotic.load_dataset(metadata=metadata, lazy=False)
+        sigs = [sig.magnitude[:, 0] for sig in blk.segments[0].analogsignals]
+        i_start, i_stop = 30000, 70000
+        chunk = source.get_chunk(i_start, i_stop) * source.get_gains() + source.get_offsets()
+        self.assertGreater(len(source._blocks), 1)
+        np.testing.assert_allclose(chunk[:, 0], sigs[0][i_start:i_stop],
+                                   rtol=0, atol=1e-4*np.abs(sigs[0]).max())
+        np.testing.assert_allclose(chunk[:, 1], sigs[1][i_start:i_stop],
+                                   rtol=0, atol=1e-4*np.abs(sigs[1]).max())
+
+        # filtered blocks should be reused
+        blocks = dict(source._blocks)
+        source.get_chunk(i_start+100, i_stop-100)
+        self.assertEqual(blocks.keys(), source._blocks.keys())
+        for k in blocks:
+            self.assertIs(blocks[k], source._blocks[k])
+
+        # close thread properly
+        win.close()
+        del source, win, ephyviewer_config, blk_lazy
+
+    def test_minmax_pyramid(self):
+        """Test that zoomed out signals read from min/max pyramids match decimating every sample"""
+        rng = np.random.RandomState(0)
+        data = rng.normal(0, 100, (1000000, 2))
+        data[np.arange(500, len(data), 700), 0] += 3000
+        data_file = os.path.join(self.temp_dir.name, 'data.raw')
+        data.astype('int16').tofile(data_file)
+        metadata = {
+            'data_file': data_file,
+            'io_class': 'RawBinarySignalIO',
+            'io_args': {
+                'dtype': 'int16',
+                'sampling_rate': 10000,
+                'nb_channel': 2,
+                'signal_gain': 0.01,
+            },
+            'amplitude_discriminators': [
+                {'name': 'Unit 1', 'channel': 'ch0', 'units': 'dimensionless', 'amplitude': [10, 50]},
+            ],
+        }
+
+        blk = neurotic.load_dataset(metadata=metadata, lazy=False)
+        ephyviewer_config = neurotic.EphyviewerConfigurator(metadata, blk,
+                                                            lazy=False)
+        app = mkQApp()
+        win = ephyviewer_config.create_ephyviewer_window()
+        trace_view = win.viewers['Signals']['widget']
+        self.assertIsInstance(trace_view, neurotic.MinMaxPyramidTraceViewer)
+
+        # signals should be read from the AnalogSignals without copying them
+        sigs = [sig.magnitude for sig in blk.segments[0].analogsignals]
+        for arr, sig in zip(trace_view.source.signals.arrays, sigs):
+            self.assertTrue(np.shares_memory(arr, sig))
+        np.testing.assert_array_equal(trace_view.source.get_chunk(1000, 3000),
+                                      np.concatenate(sigs, axis=1)[1000:3000])
+
+        # a window of 19 s is decimated by a ratio of 64, a multiple of the
+        # factors of the first two levels of the pyramid
+        args = (0, 10, 29, np.array([2., 3.]), np.array([1., -1.]), np.array([0, 1]), 'min_max')
+        plain_grabber = DataGrabber(source=trace_view.source, viewer=trace_view)
+        _, _, _, _, curves, times, _, scatter = trace_view.datagrabber.get_data(*args)
+        _, _, _, _, expected_curves, expected_times, _, expected_scatter = plain_grabber.get_data(*args)
+        for c in [0, 1]:
+            np.testing.assert_array_equal(curves[c], expected_curves[c])
+        np.testing.assert_array_equal(times, expected_times)
+        np.testing.assert_array_equal(scatter['Unit 1'], expected_scatter['Unit 1'])
+        self.assertGreater(len(scatter['Unit 1'][0]), 0)
+
+        # a window of 25 s is decimated by the same ratio of 84 as the
+        # superclass, combining the blocks of 64 samples of the second level
+        # of the pyramid that start within each decimated block
+        args = (0, 10, 35, np.array([2., 3.]), np.array([1., -1.]), np.array([0, 1]), 'min_max')
+        _, _, _, _, curves, times, _, _ = trace_view.datagrabber.get_data(*args)
+        _, _, _, _, expected_curves, expected_times, _, _ = plain_grabber.get_data(*args)
+        np.testing.assert_array_equal(times, expected_times)
+        i_start = 100000 - 100000 % 84
+        block_starts = -(-(i_start + 84 * np.arange(len(times) // 2 + 1)) // 64) * 64
+        stacked = np.concatenate(sigs, axis=1)
+        for c, gain, offset in [(0, 2., 1.), (1, 3., -1.)]:
+            self.assertEqual(len(curves[c]), len(expected_curves[c]))
+            blocks = [stacked[i:j, c] for i, j in zip(block_starts[:-1], block_starts[1:])]
+            np.testing.assert_allclose(curves[c][::2], [b.max() * gain + offset for b in blocks], rtol=1e-6)
+            np.testing.assert_allclose(curves[c][1::2], [b.min() * gain + offset for b in blocks], rtol=1e-6)
+
+        # close thread properly
+        win.close()
+
+    def test_epoch_source_with_density(self):
+        """Test that epochs found by binary search match those found by the superclass"""
+        rng = np.random.RandomState(0)
+        times = rng.uniform(0, 100, 1000)
+        durations = rng.exponential(1, 1000)
+        durations[::10] = 0
+        labels = np.arange(1000).astype(str)
+        epoch = neo.Epoch(times*pq.s, durations=durations*pq.s, labels=labels, name='ep')
+        source = neurotic.NeoEpochSourceWithDensity([epoch])
+        plain_source = InMemoryEpochSource([{'name': 'ep', 'time': times, 'duration': durations, 'label': labels}])
+        for t_start, t_stop in [(-10, 5), (20, 20.5), (times[3], times[3]), (40, 70), (99, 120), (150, 160)]:
+            ep_times, ep_durations, ep_labels = source.get_chunk_by_time(0, t_start, t_stop)
+            expected_times, expected_durations, expected_labels = plain_source.get_chunk_by_time(0, t_start, t_stop)
+            self.assertTrue(np.all(np.diff(ep_times) >= 0))
+            self.assertEqual(sorted(ep_labels), sorted(expected_labels))
+            np.testing.assert_array_equal(ep_times, np.sort(expected_times))
+
+        # dense channels are summarized by their density when zoomed out
+        source = neurotic.NeoEpochSourceWithDensity([epoch], density_threshold=999, density_span=10)
+        self.assertEqual(source.dense_channels(), [0])
+        self.assertEqual(len(source.get_chunk_by_time(0, 40, 50)[0]), 0)
+        self.assertGreater(len(source.get_chunk_by_time(0, 40, 49)[0]), 0)
+        density = source.get_density(0.5)
+        self.assertEqual(density.shape, (int((source.t_stop - source.t_start) // 0.5) + 1, 1))
+        counts, _ = np.histogram(times, bins=source.t_start + 0.5*np.arange(len(density) + 1))
+        np.testing.assert_array_equal(density[:, 0], counts / 0.5)
+
+    def test_event_density(self):
+        """Test that channels with many events are displayed as a density trace"""
+        blk = neo.Block()
+        blk.segments.append(neo.Segment())
+        blk.segments[0].events.append(neo.Event(np.arange(0, 100, 0.05)*pq.s, labels=np.full(2000, 'TTL'), name='Dense'))
+        blk.segments[0].events.append(neo.Event([1, 2, 3]*pq.s, labels=['a', 'b', 'c'], name='Sparse'))
+        blk = neurotic.load_dataset(metadata={}, blk=blk)
+        app = mkQApp()
+        with mock.patch.object(neurotic.gui.config, '_event_density_threshold', 1000):
+            ephyviewer_config = neurotic.EphyviewerConfigurator({}, blk)
+            self.assertTrue(ephyviewer_config.is_shown('event_density'))
+            win = ephyviewer_config.create_ephyviewer_window()
+
+        density_view = win.viewers['Event density']['widget']
+        self.assertEqual(density_view.source.nb_channel, 1)
+        self.assertEqual(density_view.source.get_channel_name(0), 'Dense')
+        np.testing.assert_allclose(density_view.source.get_chunk()[:, 0].sum() * neurotic.gui.config._event_density_bin_duration, 2000)
+
+        epoch_source = win.viewers['Epochs']['widget'].source
+        dense, sparse = [[ep['name'] for ep in epoch_source.all].index(name) for name in ['Dense', 'Sparse']]
+        self.assertEqual(len(epoch_source.get_chunk_by_time(dense, 0, 40)[0]), 0)
+        self.assertEqual(len(epoch_source.get_chunk_by_time(dense, 0, 5)[0]), 101)
+        self.assertEqual(len(epoch_source.get_chunk_by_time(sparse, 0, 40)[0]), 3)
+
+        # the event list formats entries only when they are displayed
+        event_list = win.viewers['Events']['widget']
+        event_list.combo.setCurrentIndex([ev['name'] for ev in event_list.source.all].index('Dense'))
+        model = event_list.list_widget.model()
+        self.assertEqual(model.rowCount(), 2000)
+        self.assertEqual(model.data(model.index(20)), '20 : 1.000 TTL')
+        with mock.patch.object(event_list, 'time_changed') as time_changed:
+            event_list.list_widget.setCurrentIndex(model.index(20))
+            event_list.select_event()
+            time_changed.emit.assert_called_once_with(1.0)
+
+        # switching channels reuses the same model
+        event_list.combo.setCurrentIndex([ev['name'] for ev in event_list.source.all].index('Sparse'))
+        self.assertIs(event_list.list_widget.model(), model)
+        self.assertEqual(model.rowCount(), 3)
+
+        # close thread properly
+        win.close()
+
+    def test_spike_sample_indexes(self):
+        """Test that spikes are mapped to the samples they fall on"""
+        sig = neo.AnalogSignal(np.zeros((50000, 1)), units='mV', sampling_rate=10*pq.kHz, t_start=3*pq.s)
+        expected = np.arange(500, 50000, 700)
+        times = sig.times[expected].rescale('ms').magnitude
+        off_sample = times[:5] + 0.03
+        out_of_range = [2900, 8000]
+        duplicate = times[:1]
+        st = neo.SpikeTrain(np.sort(np.concatenate([times, off_sample, out_of_range, duplicate]))*pq.ms,
+                            t_start=0*pq.ms, t_stop=10000*pq.ms)
+        indexes = neurotic.gui.config._spike_sample_indexes(st, sig)
+        np.testing.assert_array_equal(indexes, expected)
+
+    def test_neo_epoch_to_dataframe(self):
+        """Test that epochs are converted to a sorted dataframe"""
+        epochs = [
+            neo.Epoch([3, 1]*pq.s, durations=[1, 2]*pq.s, labels=['c', 'a'], name='B'),
+            neo.Epoch([2000]*pq.ms, durations=[500]*pq.ms, labels=['b'], name='A'),
+            neo.Epoch([]*pq.s, durations=[]*pq.s, labels=[], name='empty'),
+            neo.Epoch([0]*pq.s, durations=[1]*pq.s, labels=['(from epoch encoder file)'], name='encoded'),
+        ]
+        df = neurotic.gui.config._neo_epoch_to_dataframe(epochs, exclude_epoch_encoder_epochs=True)
+        self.assertEqual(list(df.columns), ['Start (s)', 'End (s)', 'Duration (s)', 'Type', 'Label'])
+        np.testing.assert_array_equal(df['Start (s)'], [1, 2, 3])
+        np.testing.assert_array_equal(df['End (s)'], [3, 2.5, 4])
+        np.testing.assert_array_equal(df['Duration (s)'], [2, 0.5, 1])
+        self.assertEqual(list(df['Type']), ['B', 'A', 'B'])
+        self.assertEqual(list(df['Label']), ['a', 'b', 'c'])
+        self.assertEqual(df['Type'].dtype, 'category')
+
+        df = neurotic.gui.config._neo_epoch_to_dataframe([])
+        self.assertEqual(len(df), 0)
+
+    def test_lazy_data_frame(self):
+        """Test that the table of epochs is filled only once it is shown"""
+        blk = neo.Block()
+        blk.segments.append(neo.Segment())
+        blk.segments[0].epochs.append(neo.Epoch([1, 2, 3]*pq.s, durations=[1, 1, 1]*pq.s,
+                                                labels=['a', 'b', 'c'], name='Epoch'))
+        blk = neurotic.load_dataset(metadata={}, blk=blk)
+        ephyviewer_config = neurotic.EphyviewerConfigurator({}, blk)
+        ephyviewer_config.show('data_frame')
+        app = mkQApp()
+        with mock.patch.object(neurotic.gui.config, '_neo_epoch_to_dataframe',
+                               wraps=neurotic.gui.config._neo_epoch_to_dataframe) as to_dataframe:
+            win = ephyviewer_config.create_ephyviewer_window()
+            to_dataframe.assert_not_called()
+
+            win.show()
+            app.processEvents()
+            to_dataframe.assert_called_once()
+        table = win.viewers['Table']['widget'].qtable
+        self.assertEqual(table.rowCount(), 3)
+        self.assertEqual([table.item(r, 4).text() for r in range(3)], ['a', 'b', 'c'])
+
+        # close thread properly
+        win.close()
+
+    def test_lazy_spike_detection(self):
+        """Test that spikes are detected in the background with lazy loading"""
+        rng = np.random.RandomState(0)
+        data = rng.normal(0, 100, (50000, 1))
+        data[np.arange(500, 50000, 700)] += 3000
+        data_file = os.path.join(self.temp_dir.name, 'data.raw')
+        data.astype('int16').tofile(data_file)
+        metadata = {
+            'data_file': data_file,
+            'io_class': 'RawBinarySignalIO',
+            'io_args': {
+                'dtype': 'int16',
+                'sampling_rate': 10000,
+                'nb_channel': 1,
+                'signal_gain': 0.01,
+            },
+            'filters': [
+                {'channel': 'ch0', 'highpass': 10},
+            ],
+            'amplitude_discriminators': [
+                {'name': 'Unit 1', 'channel': 'ch0', 'units': 'dimensionless', 'amplitude': [10, 50]},
+            ],
+        }
+
+        blk = neurotic.load_dataset(metadata=metadata, lazy=False)
+        st = blk.segments[0].spiketrains[0]
+        self.assertGreater(len(st), 0)
+
+        blk_lazy = neurotic.load_dataset(metadata=metadata, lazy=True)
+        self.assertEqual(len(blk_lazy.segments[0].spiketrains), 0)
+        ephyviewer_config = neurotic.EphyviewerConfigurator(metadata, blk_lazy,
+                                                            lazy=True)
+        ephyviewer_config.show_all()
+        app = mkQApp()
+        win = ephyviewer_config.create_ephyviewer_window()
+        spike_source = win.viewers['Spike trains']['widget'].source
+        signal_source = win.viewers['Signals']['widget'].source
+        self.assertEqual(spike_source.nb_channel, 1)
+        self.assertTrue(signal_source.with_scatter)
+
+        # wait for spikes to be added to the window
+        for i in range(100):
+            app.processEvents()
+            if len(spike_source.all[0]['time']) == len(st):
+                break
+            QT.QThread.msleep(100)
+        np.testing.assert_allclose(spike_source.all[0]['time'], st.times.rescale('s').magnitude,
+                                   rtol=0, atol=1e-9)
+        np.testing.assert_array_equal(signal_source.scatter_indexes['Unit 1'],
+                                      np.arange(500, 50000, 700))
+
+        # close thread properly
+        win.close()
+        del spike_source, signal_source, win, ephyviewer_config, blk_lazy
+
+    def test_lazy_rauc(self):
+        """Test that RAUC is calculated in the background with lazy loading"""
+        rng = np.random.RandomState(0)
+        data_file = os.path.join(self.temp_dir.name, 'data.raw')
+        (rng.normal(0, 1000, (100000, 2)) + 300).astype('int16').tofile(data_file)
+        metadata = {
+            'data_file': data_file,
+            'io_class': 'RawBinarySignalIO',
+            'io_args': {
+                'dtype': 'int16',
+                'sampling_rate': 10000,
+                'nb_channel': 2,
+                'signal_gain': 0.01,
+            },
+            'filters': [
+                {'channel': 'ch0', 'lowpass': 1000},
+            ],
+            'rauc_baseline': 'median',
+            'rauc_bin_duration': 0.1,
+        }
+
+        blk = neurotic.load_dataset(metadata=metadata, lazy=False)
+
+        blk_lazy = neurotic.load_dataset(metadata=metadata, lazy=True)
+        self.assertNotIn('rauc_sig', blk_lazy.segments[0].analogsignals[0].annotations)
+        ephyviewer_config = neurotic.EphyviewerConfigurator(metadata, blk_lazy,
+                                                            lazy=True)
+        self.assertTrue(ephyviewer_config.is_enabled('traces_rauc'))
+        ephyviewer_config.show_all()
+        app = mkQApp()
+        win = ephyviewer_config.create_ephyviewer_window()
+        rauc_source = win.viewers['Integrated signals (RAUC)']['widget'].source
+
+        # wait for RAUC to be calculated
+        for i in range(100):
+            app.processEvents()
+            if not np.isnan(rauc_source.signals).any():
+                break
+            QT.QThread.msleep(100)
+        for sig, rauc in zip(blk.segments[0].analogsignals, rauc_source.signals.T):
+            rauc_sig = sig.annotations['rauc_sig']
+            self.assertEqual(rauc_source.sample_rate, rauc_sig.sampling_rate.rescale('Hz').magnitude)
+            self.assertEqual(rauc_source.t_start, rauc_sig.t_start.rescale('s').magnitude)
+            np.testing.assert_allclose(rauc, rauc_sig.rescale('s').magnitude[:, 0], rtol=1e-6)
+
+        # close thread properly
+        win.close()
+        del rauc_source, win, ephyviewer_config, blk_lazy
+
 if __name__ == '__main__':
     unittest.main()